@@ -1,17 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from logging import getLogger
-from time import sleep
+from threading import BoundedSemaphore
 
-from canvasapi import Canvas
-from canvasapi.exceptions import CanvasException
+from canvasapi.exceptions import CanvasException, ResourceDoesNotExist
 from canvasapi.tab import Tab
-
-from config.config import PROD_KEY, PROD_URL, TEST_KEY, TEST_URL
-from course.models import SIS_PREFIX, CanvasSite, Course, Request, User
+from canvasapi.user import User as CanvasUser
+from django.db import connection
+
+from canvas.client import get_client
+from canvas.sis_import import EnrollmentBatch, poll_enrollment_import
+from canvas.user_cache import MISSING, get_user_cache
+from config.config import (
+    CANVAS_ENROLLMENT_MODE,
+    CANVAS_PROVISIONING_MAX_CONCURRENCY,
+    CANVAS_PROVISIONING_WORKERS,
+    PROD_KEY,
+    PROD_URL,
+    TEST_KEY,
+    TEST_URL,
+)
+from course.models import (
+    SIS_PREFIX,
+    CanvasSite,
+    Course,
+    EnrollmentImport,
+    Request,
+    User,
+)
 from course.serializers import RequestSerializer
 from course.terms import USE_BANNER
 
 MAIN_ACCOUNT_ID = 96678
 logger = getLogger(__name__)
+PROVISIONING_SLOTS = BoundedSemaphore(CANVAS_PROVISIONING_MAX_CONCURRENCY)
+MIGRATION_IN_FLIGHT_STATES = ["queued", "running"]
+ZOOM_EVENT_WORKERS = 4
+ZOOM_EVENT_CANCEL_REASON = (
+    "Zoom event was copied from a previous term and is no longer relevant"
+)
 LPS_ONLINE_ACCOUNT_ID = 132413
 LIBRARIAN_ROLE_ID = "1383"
 ENROLLMENT_TYPES = {
@@ -27,7 +54,9 @@ ENROLLMENT_TYPES = {
 
 
 def get_canvas(test=False):
-    return Canvas(TEST_URL if test else PROD_URL, TEST_KEY if test else PROD_KEY)
+    if test:
+        return get_client("test", TEST_URL, TEST_KEY)
+    return get_client("prod", PROD_URL, PROD_KEY)
 
 
 def get_canvas_account(account_id, test=False):
@@ -44,6 +73,7 @@ def create_canvas_user(penn_key, penn_id, email, full_name, test=False):
         if not account:
             return None
         user = account.create_user(pseudonym, user={"name": full_name})
+        get_user_cache(test).set(penn_key, user.id)
         user.edit(user={"email": email})
         return user
     except CanvasException as error:
@@ -55,16 +85,39 @@ def create_canvas_user(penn_key, penn_id, email, full_name, test=False):
 
 def get_user_by_sis(login_id, test=False):
     try:
-        return get_canvas(test).get_user(login_id, "sis_login_id")
+        user = get_canvas(test).get_user(login_id, "sis_login_id")
+        get_user_cache(test).set(login_id, user.id)
+        return user
+    except ResourceDoesNotExist:
+        get_user_cache(test).set(login_id, None)
+        return None
     except CanvasException:
         return None
 
 
+def get_canvas_user_id(login_id, test=False):
+    canvas_user_id = get_user_cache(test).get(login_id)
+    if canvas_user_id is MISSING:
+        user = get_user_by_sis(login_id, test=test)
+        canvas_user_id = user.id if user else None
+    return canvas_user_id
+
+
+def forget_canvas_user(login_id, test=False):
+    get_user_cache(test).delete(login_id)
+
+
 def get_user_courses(login_id):
     user = get_user_by_sis(login_id)
     return user.get_courses(enrollment_type="teacher") if user else []
 
 
+def get_user_courses_by_canvas_id(canvas_user_id, canvas=None):
+    canvas = canvas or get_canvas()
+    user = CanvasUser(canvas._Canvas__requester, {"id": canvas_user_id})
+    return user.get_courses(enrollment_type="teacher")
+
+
 def get_term_id(account_id, sis_term_id, test=False):
     try:
         account = get_canvas_account(account_id, test=test)
@@ -180,6 +233,7 @@ def handle_sections(
     additional_sections,
     sections,
     test,
+    enrollments=None,
 ):
     if sections:
         sections = [section.course_code for section in sections]
@@ -208,13 +262,14 @@ def handle_sections(
         )[1]
     for section in additional_sections:
         for user in section["instructors"]:
-            enroll_user(
+            add_enrollment(
                 request,
                 canvas_course,
-                section["course_section"].id,
+                section["course_section"],
                 user,
                 "instructor",
                 test,
+                enrollments,
             )
 
 
@@ -230,7 +285,7 @@ def enroll_user(request, canvas_course, section, user, role, test):
         penn_id = crf_user.profile.penn_id
         email = crf_user.email
         full_name = f"{crf_user.first_name} {crf_user.last_name}"
-    canvas_user = get_user_by_sis(username, test=test)
+    canvas_user = get_canvas_user_id(username, test=test)
     if canvas_user is None:
         try:
             canvas_user = create_canvas_user(
@@ -255,6 +310,7 @@ def enroll_user(request, canvas_course, section, user, role, test):
                 enrollment=enrollment,
             )
         except Exception as error:
+            forget_canvas_user(username, test)
             add_request_process_notes(f"failed to add user: {user} ({error})", request)
     else:
         try:
@@ -264,11 +320,76 @@ def enroll_user(request, canvas_course, section, user, role, test):
                 enrollment=enrollment,
             )
         except Exception as error:
+            forget_canvas_user(username, test)
             add_request_process_notes(
                 f"failed to add user: {username} ({error})", request
             )
 
 
+def add_enrollment(request, canvas_course, section, user, role, test, enrollments=None):
+    if enrollments is None:
+        section_id = section.id if section else canvas_course.id
+        enroll_user(request, canvas_course, section_id, user, role, test)
+        return
+    try:
+        enrollments.add(
+            request,
+            user,
+            ENROLLMENT_TYPES[role],
+            role_id=LIBRARIAN_ROLE_ID if role in ("LIB", "librarian") else None,
+            section_id=getattr(section, "sis_section_id", None),
+            course_id=canvas_course.sis_course_id,
+        )
+    except Exception as error:
+        add_request_process_notes(f"failed to add user: {user} ({error})", request)
+
+
+def import_enrollments(enrollments, test):
+    account = get_canvas_account(MAIN_ACCOUNT_ID, test=test)
+    try:
+        return enrollments.submit(account, test)
+    except Exception as error:
+        logger.error(f"- ERROR: Failed to import enrollments ({error})")
+        requests = {
+            request.pk: request for request, enrollment in enrollments.enrollments
+        }
+        for request in requests.values():
+            add_request_process_notes(f"enrollment import failed ({error})", request)
+        return None
+
+
+def poll_enrollment_imports(test=None):
+    """
+    Check every unfinished enrollment SIS import once, on the Canvas instance
+    it was started on (only `test`'s instance if given), adding the errors
+    and warnings of those that finished to the affected requests' process
+    notes.
+    """
+    instances = [False, True] if test is None else [test]
+    for instance_test in instances:
+        enrollment_imports = list(
+            EnrollmentImport.objects.filter(finished__isnull=True, test=instance_test)
+        )
+        if not enrollment_imports:
+            continue
+        account = get_canvas_account(MAIN_ACCOUNT_ID, test=instance_test)
+        for enrollment_import in enrollment_imports:
+            try:
+                notes = poll_enrollment_import(enrollment_import, account)
+            except Exception as error:
+                logger.error(
+                    "- ERROR: Failed to check SIS import"
+                    f" {enrollment_import.import_id} ({error})"
+                )
+                continue
+            if not notes:
+                continue
+            requests = Request.objects.in_bulk(list(notes))
+            for request_pk, messages in notes.items():
+                if request_pk in requests:
+                    add_request_process_notes(", ".join(messages), requests[request_pk])
+
+
 def set_reserves(request, canvas_course):
     try:
         tab = Tab(
@@ -288,28 +409,41 @@ def set_reserves(request, canvas_course):
         add_request_process_notes("failed to try to configure ARES", request)
 
 
-def delete_zoom_events(canvas_course, test):
+def is_zoom_event(event):
+    return any(
+        value and "zoom" in value.lower()
+        for value in (event.location_name, event.description, event.title)
+    )
+
+
+def delete_zoom_event(event):
+    try:
+        event.delete(cancel_reason=ZOOM_EVENT_CANCEL_REASON)
+        logger.info(f"\t- Event '{event.title.encode('ascii', 'ignore')}' deleted.")
+        return True
+    except Exception as error:
+        logger.error(f"\t- ERROR: Failed to delete event {event.id} ({error})")
+        return False
+
+
+def delete_zoom_events(canvas_course, test, max_workers=ZOOM_EVENT_WORKERS):
+    """
+    Delete the Zoom events copied into `canvas_course`, using the event
+    objects from the listing itself. Matches are collected before deleting
+    so that removing events does not shift the pages still to be read.
+    """
     logger.info("\t* Deleting Zoom events...")
     canvas = get_canvas(test)
-    course_string = f"course_{canvas_course.id}"
-    events = canvas.get_calendar_events(context_codes=[course_string], all_events=True)
-    zoom_events = list()
-    for event in events:
-        if (
-            (event.location_name and "zoom" in event.location_name.lower())
-            or (event.description and "zoom" in event.description.lower())
-            or (event.title and "zoom" in event.title.lower())
-        ):
-            zoom_events.append(event.id)
-    for event_id in zoom_events:
-        event = canvas.get_calendar_event(event_id)
-        deleted = event.delete(
-            cancel_reason=(
-                "Zoom event was copied from a previous term and is no longer relevant"
-            )
-        )
-        deleted = deleted.title.encode("ascii", "ignore")
-        logger.info(f"\t- Event '{deleted}' deleted.")
+    events = canvas.get_calendar_events(
+        context_codes=[f"course_{canvas_course.id}"], all_events=True, per_page=100
+    )
+    zoom_events = [event for event in events if is_zoom_event(event)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        deleted = sum(executor.map(delete_zoom_event, zoom_events))
+    logger.info(
+        f"\t- Deleted {deleted} of {len(zoom_events)} Zoom events from {canvas_course}."
+    )
+    return deleted, len(zoom_events)
 
 
 def delete_announcements(canvas_course):
@@ -324,7 +458,11 @@ def delete_announcements(canvas_course):
         logger.info(f"\t- Announcement '{title}' deleted.")
 
 
-def migrate_course(canvas_course, serialized, test):
+def migrate_course(request, canvas_course, serialized, test=False):
+    """
+    Start copying `copy_from_course` into `canvas_course` without waiting for
+    it: poll_content_migrations tracks the copy and finishes the site.
+    """
     try:
         exclude_announcements = serialized.data.get("exclude_announcements", None)
         source_course_id = serialized.data["copy_from_course"]
@@ -338,20 +476,74 @@ def migrate_course(canvas_course, serialized, test):
             migration_type="course_copy_importer",
             settings={"source_course_id": source_course_id},
         )
-        while (
-            content_migration.get_progress().workflow_state == "queued"
-            or content_migration.get_progress().workflow_state == "running"
-        ):
-            logger.info("\t* Migration running...")
-            sleep(8)
-        logger.info("\t- MIGRATION COMPLETE")
-        delete_zoom_events(canvas_course, test)
-        if exclude_announcements:
-            delete_announcements(canvas_course)
+        request.migration_progress_id = content_migration.progress_url.split("/")[-1]
+        request.migration_state = "queued"
+        request.migration_completion = 0
+        request.migration_test = test
+        Request.objects.filter(pk=request.pk).update(
+            migration_progress_id=request.migration_progress_id,
+            migration_state=request.migration_state,
+            migration_completion=request.migration_completion,
+            migration_test=request.migration_test,
+        )
     except Exception as error:
         logger.error(error)
 
 
+def finish_content_migration(request, canvas, test):
+    canvas_course = canvas.get_course(request.canvas_instance.canvas_id)
+    delete_zoom_events(canvas_course, test)
+    if request.exclude_announcements:
+        delete_announcements(canvas_course)
+
+
+def get_in_flight_migrations(test):
+    return Request.objects.filter(
+        migration_state__in=MIGRATION_IN_FLIGHT_STATES,
+        migration_test=test,
+        canvas_instance__isnull=False,
+    ).select_related("canvas_instance")
+
+
+def poll_content_migration(request, canvas, test):
+    try:
+        progress = canvas.get_progress(request.migration_progress_id)
+        state = progress.workflow_state
+        completion = int(progress.completion or 0)
+        if state == "completed":
+            logger.info(f"MIGRATION COMPLETE for {request.canvas_instance}")
+            finish_content_migration(request, canvas, test)
+        elif state == "failed":
+            logger.error(f"MIGRATION FAILED for {request.canvas_instance}")
+            add_request_process_notes("content migration failed", request)
+        Request.objects.filter(pk=request.pk).update(
+            migration_state=state, migration_completion=completion
+        )
+    except Exception as error:
+        logger.error(
+            "- ERROR: Failed to check content migration for"
+            f" {request.canvas_instance} ({error})"
+        )
+
+
+def poll_content_migrations(test=None):
+    """
+    Check every in-flight content migration once, on the Canvas instance it
+    was started on (only `test`'s instance if given), recording its state on
+    the Request and running the post-copy cleanup for those that completed.
+    Requests whose Canvas site has not been recorded yet are left for the
+    next pass.
+    """
+    instances = [False, True] if test is None else [test]
+    for instance_test in instances:
+        requests = list(get_in_flight_migrations(instance_test))
+        if not requests:
+            continue
+        canvas = get_canvas(instance_test)
+        for request in requests:
+            poll_content_migration(request, canvas, instance_test)
+
+
 def add_site_owners(canvas_course, canvas_site):
     instructors = canvas_course.get_enrollments(type="TeacherEnrollment")._elements
     for instructor in instructors:
@@ -362,125 +554,199 @@ def add_site_owners(canvas_course, canvas_site):
             logger.error(f"Failed to add {instructor} to site owners ({error})")
 
 
-def create_canvas_sites(requested_courses=None, sections=None, test=False):
+def claim_request(request):
+    """
+    Move `request` from APPROVED to IN_PROCESS with a single conditional
+    UPDATE, so that only one worker can ever claim it.
+    """
+    claimed = Request.objects.filter(pk=request.pk, status="APPROVED").update(
+        status="IN_PROCESS"
+    )
+    if claimed:
+        request.status = "IN_PROCESS"
+    return bool(claimed)
+
+
+def create_canvas_site(request, sections=None, test=False, enrollments=None):
+    course_requested = request.course_requested
+    sis_prefix = ""
+    if USE_BANNER and not (
+        course_requested.course_term.isnumeric()
+        or len(course_requested.course_number) == 4
+    ):
+        sis_prefix = "SRS"
+        logger.warning(f"Old style course code: {course_requested}")
+    serialized = RequestSerializer(request)
+    additional_sections = list()
+    logger.info(f"Creating Canvas site for {course_requested}...")
+    account = get_school_account(request, course_requested, test)
+    if not account:
+        return False
+    section_code = get_section_code(request, course_requested)
+    if not section_code:
+        return False
+    name = (
+        f"{section_code} {request.title_override[:45]}"
+        if request.title_override
+        else f"{section_code} {course_requested.course_name}"
+    )
+    section_name = (
+        f"{section_code}{request.title_override[:45]}"
+        if request.title_override
+        else f"{section_code} {course_requested.course_name}"
+    )
+    sis_course_id = (
+        f"{sis_prefix or SIS_PREFIX}_{course_requested.sis_format_primary()}"
+    )
+    term_id = get_term_id(
+        MAIN_ACCOUNT_ID,
+        f"{course_requested.year}{course_requested.course_term}",
+        test=test,
+    )
+    course = {
+        "name": name,
+        "sis_course_id": sis_course_id,
+        "course_code": sis_course_id,
+        "term_id": term_id,
+    }
+    already_exists, canvas_course = get_canvas_course(
+        request, account, course, sis_course_id, test
+    )
+    if not canvas_course:
+        return False
+    set_storage_quota(request, canvas_course)
+    if not already_exists:
+        created_section, additional_sections = create_section(
+            request,
+            course_requested,
+            canvas_course,
+            section_name,
+            sis_course_id,
+            additional_sections,
+        )
+        if created_section == "already exists":
+            return True
+    course_title = (
+        request.title_override
+        if request.title_override
+        else course_requested.course_name
+    )
+    handle_sections(
+        request,
+        serialized,
+        canvas_course,
+        course_title,
+        additional_sections,
+        sections,
+        test,
+        enrollments,
+    )
+    section = next((section for section in canvas_course.get_sections()), None)
+    for enrollment in serialized.data["additional_enrollments"]:
+        add_enrollment(
+            request,
+            canvas_course,
+            section,
+            enrollment["user"],
+            enrollment["role"],
+            test,
+            enrollments,
+        )
+    if serialized.data["reserves"]:
+        set_reserves(request, canvas_course)
+    if serialized.data["copy_from_course"]:
+        migrate_course(request, canvas_course, serialized, test)
+    canvas_site = CanvasSite.objects.update_or_create(
+        canvas_id=canvas_course.id,
+        defaults={
+            "request_instance": request,
+            "name": canvas_course.name,
+            "sis_course_id": canvas_course.sis_course_id,
+            "workflow_state": canvas_course.workflow_state,
+        },
+    )[0]
+    request.canvas_instance = canvas_site
+    add_site_owners(canvas_course, canvas_site)
+    request.status = "COMPLETED"
+    request.save()
+    logger.info(
+        f"UPDATED Canvas site: {canvas_course}"
+        if already_exists
+        else f"CREATED Canvas site: {canvas_site}."
+    )
+    return False
+
+
+def provision_request(request, sections=None, test=False, enrollments=None):
+    with PROVISIONING_SLOTS:
+        try:
+            if not claim_request(request):
+                status = (
+                    Request.objects.filter(pk=request.pk)
+                    .values_list("status", flat=True)
+                    .first()
+                )
+                logger.warning(
+                    f"Skipping {request.course_requested}: not APPROVED (status"
+                    f" {status}) or already claimed."
+                )
+                return False
+            return create_canvas_site(request, sections, test, enrollments)
+        except Exception as error:
+            logger.error(
+                "- ERROR: Failed to create Canvas site for"
+                f" {request.course_requested} ({error})"
+            )
+            return False
+        finally:
+            connection.close()
+
+
+def create_canvas_sites(
+    requested_courses=None,
+    sections=None,
+    test=False,
+    max_workers=CANVAS_PROVISIONING_WORKERS,
+    enrollment_mode=CANVAS_ENROLLMENT_MODE,
+):
+    """
+    Provision Canvas sites for `requested_courses` (every APPROVED request by
+    default) from a pool of `max_workers` threads. Each request is claimed
+    before any work is done, and PROVISIONING_SLOTS caps how many requests
+    the whole process provisions at once. With the "sis_import"
+    `enrollment_mode`, every request's enrollments are collected and imported
+    together once all sites exist, and poll_enrollment_imports reports the
+    outcome. Returns True if any request's section already existed in Canvas.
+    """
     logger.info("Creating Canvas sites for requested courses...")
     if requested_courses is None:
-        requested_courses = Request.objects.filter(status="APPROVED")
+        requested_courses = Request.objects.filter(status="APPROVED").select_related(
+            "course_requested"
+        )
+    requested_courses = list(requested_courses or [])
     if not requested_courses:
         logger.info("SUMMARY")
         logger.info("- No requested courses found.")
         logger.info("FINISHED")
         return
-    section_already_exists = False
-    for request in requested_courses:
-        course_requested = request.course_requested
-        sis_prefix = ""
-        if USE_BANNER and not (
-            course_requested.course_term.isnumeric()
-            or len(course_requested.course_number) == 4
-        ):
-            sis_prefix = "SRS"
-            logger.warning(f"Old style course code: {course_requested}")
-        request.status = "IN_PROCESS"
-        request.save()
-        serialized = RequestSerializer(request)
-        additional_sections = list()
-        logger.info(f"Creating Canvas site for {course_requested}...")
-        account = get_school_account(request, course_requested, test)
-        if not account:
-            continue
-        section_code = get_section_code(request, course_requested)
-        if not section_code:
-            continue
-        name = (
-            f"{section_code} {request.title_override[:45]}"
-            if request.title_override
-            else f"{section_code} {course_requested.course_name}"
-        )
-        section_name = (
-            f"{section_code}{request.title_override[:45]}"
-            if request.title_override
-            else f"{section_code} {course_requested.course_name}"
-        )
-        sis_course_id = (
-            f"{sis_prefix or SIS_PREFIX}_{course_requested.sis_format_primary()}"
-        )
-        term_id = get_term_id(
-            MAIN_ACCOUNT_ID,
-            f"{course_requested.year}{course_requested.course_term}",
-            test=test,
-        )
-        course = {
-            "name": name,
-            "sis_course_id": sis_course_id,
-            "course_code": sis_course_id,
-            "term_id": term_id,
-        }
-        already_exists, canvas_course = get_canvas_course(
-            request, account, course, sis_course_id, test
-        )
-        if not canvas_course:
-            continue
-        set_storage_quota(request, canvas_course)
-        if not already_exists:
-            created_section, additional_sections = create_section(
-                request,
-                course_requested,
-                canvas_course,
-                section_name,
-                sis_course_id,
-                additional_sections,
-            )
-            if created_section == "already exists":
-                section_already_exists = True
-                continue
-        course_title = (
-            request.title_override
-            if request.title_override
-            else course_requested.course_name
-        )
-        handle_sections(
-            request,
-            serialized,
-            canvas_course,
-            course_title,
-            additional_sections,
-            sections,
-            test,
-        )
-        section = next(
-            (section for section in canvas_course.get_sections()), canvas_course
-        ).id
-        for enrollment in serialized.data["additional_enrollments"]:
-            enroll_user(
-                request,
-                canvas_course,
-                section,
-                enrollment["user"],
-                enrollment["role"],
-                test,
+    enrollments = (
+        EnrollmentBatch(partial(get_canvas_user_id, test=test))
+        if enrollment_mode == "sis_import"
+        else None
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(
+                partial(
+                    provision_request,
+                    sections=sections,
+                    test=test,
+                    enrollments=enrollments,
+                ),
+                requested_courses,
             )
-        if serialized.data["reserves"]:
-            set_reserves(request, canvas_course)
-        if serialized.data["copy_from_course"]:
-            migrate_course(canvas_course, serialized, test)
-        canvas_site = CanvasSite.objects.update_or_create(
-            canvas_id=canvas_course.id,
-            defaults={
-                "request_instance": request,
-                "name": canvas_course.name,
-                "sis_course_id": canvas_course.sis_course_id,
-                "workflow_state": canvas_course.workflow_state,
-            },
-        )[0]
-        request.canvas_instance = canvas_site
-        add_site_owners(canvas_course, canvas_site)
-        request.status = "COMPLETED"
-        request.save()
-        logger.info(
-            f"UPDATED Canvas site: {canvas_course}"
-            if already_exists
-            else f"CREATED Canvas site: {canvas_site}."
         )
+    if enrollments:
+        import_enrollments(enrollments, test)
     logger.info("FINISHED")
-    return True if section_already_exists else False
+    return any(results)
@@ -1,16 +1,43 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from csv import DictReader
+from io import StringIO
+from json import dumps
 from os import path, remove
+from time import monotonic, sleep
 
+from canvasapi.course import Course as CanvasCourse
 from canvasapi.exceptions import CanvasException
+from canvasapi.util import combine_kwargs
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 
-from canvas.api import create_canvas_sites, get_canvas
+from canvas.api import (
+    MAIN_ACCOUNT_ID,
+    create_canvas_sites,
+    get_canvas,
+    get_canvas_account,
+)
 from config.config import USERNAME
-from course.models import SIS_PREFIX, Course, Request, School, User
+from course.models import (
+    SIS_PREFIX,
+    BulkCreationItem,
+    BulkCreationRun,
+    Course,
+    Request,
+    School,
+    User,
+    exclude_hidden,
+)
 from course.terms import split_year_and_term
 from course.utils import DATA_DIRECTORY_NAME, get_data_directory
 
 OWNER = User.objects.get(username=USERNAME)
 LOG_PATH = "/home/django/crf2/data/bulk_creation_log.csv"
+REPORT_FINISHED_STATES = {"complete", "error", "deleted"}
+REPORT_POLL_INTERVAL = 10
+REPORT_TIMEOUT = 900
+TOOL_WORKERS = 8
 
 
 def print_item(index, total, message):
@@ -27,7 +54,6 @@ def get_courses(
         "year": year,
         "course_term": term,
         "requested": requested,
-        "course_schools__visible": True,
     }
     if not requested:
         filter_dict["requested_override"] = False
@@ -36,7 +62,7 @@ def get_courses(
     if school_abbreviation:
         school = School.objects.get(abbreviation=school_abbreviation)
         filter_dict["course_schools"] = school
-    courses = Course.objects.filter(**filter_dict)
+    courses = exclude_hidden(Course.objects.filter(**filter_dict), subjects=False)
     total = len(courses)
     print(f"FOUND {total} {requested_display.upper()} COURSES.")
     return list(courses)
@@ -44,6 +70,7 @@ def get_courses(
 
 def group_sections(year_and_term, school):
     courses = get_courses(year_and_term, school)
+    prefetch_related_objects(courses, "sections")
     all_sections = set()
     SECTIONS = dict()
     print(") Consolidating sections into a single course number...")
@@ -62,11 +89,12 @@ def group_sections(year_and_term, school):
     return list(SECTIONS)
 
 
-def remove_courses_with_site(courses):
+def remove_courses_with_site(courses, test=False):
     print(") Removing courses with a pre-existing Canvas site...")
+    site_index = get_site_index(test)
 
     def should_request_with_remove(sis_id, course, index):
-        should = should_request(sis_id)
+        should = should_request(sis_id, test=test, site_index=site_index)
         if not should:
             message = (
                 f"Canvas site ALREADY EXISTS for {course.course_code}. Removing from"
@@ -104,11 +132,14 @@ def write_courses(year_and_term, school_abbreviation):
     4. Unrequested unique course numbers consolidated with no Canvas site
     """
     unrequested_courses = get_courses(year_and_term, school_abbreviation)
+    site_index = get_site_index()
     print(") Checking unrequested courses for existing sites..")
     siteless_unrequested_courses = [
         course
         for course in unrequested_courses
-        if should_request(f"{SIS_PREFIX}_{course.sis_format_primary()}")
+        if should_request(
+            f"{SIS_PREFIX}_{course.sis_format_primary()}", site_index=site_index
+        )
     ]
     print(f"FOUND {len(siteless_unrequested_courses)} SITELESS UNREQUESTED COURSES.")
     consolidated_sections = group_sections(year_and_term, school_abbreviation)
@@ -116,7 +147,9 @@ def write_courses(year_and_term, school_abbreviation):
     siteless_consolidated_courses = [
         course
         for course in consolidated_sections
-        if should_request(f"{SIS_PREFIX}_{course.sis_format_primary()}")
+        if should_request(
+            f"{SIS_PREFIX}_{course.sis_format_primary()}", site_index=site_index
+        )
     ]
     print(f"FOUND {len(siteless_consolidated_courses)} SITELESS CONSOLIDATED COURSES.")
     DATA_DIRECTORY = get_data_directory(DATA_DIRECTORY_NAME)
@@ -233,7 +266,56 @@ def write_request_statuses(year_and_term, school_abbreviation, verbose=True):
     print("FINISHED")
 
 
-def should_request(sis_id, test=False):
+def get_provisioning_report(account, term_id=None, timeout=REPORT_TIMEOUT):
+    report_path = f"accounts/{account.id}/reports/provisioning_csv"
+    parameters = {"sections": "true"}
+    if term_id:
+        parameters["enrollment_term_id"] = term_id
+    report = account._requester.request(
+        "POST", report_path, _kwargs=combine_kwargs(parameters=parameters)
+    ).json()
+    deadline = monotonic() + timeout
+    while report.get("status") not in REPORT_FINISHED_STATES:
+        if monotonic() > deadline:
+            raise TimeoutError(f"provisioning report {report['id']} timed out")
+        sleep(REPORT_POLL_INTERVAL)
+        report = account._requester.request(
+            "GET", f"{report_path}/{report['id']}"
+        ).json()
+    if report["status"] != "complete":
+        raise RuntimeError(f"provisioning report {report['id']} {report['status']}")
+    response = account._requester._session.get(report["attachment"]["url"])
+    response.raise_for_status()
+    return DictReader(StringIO(response.content.decode("utf-8")))
+
+
+def get_site_index(test=False):
+    """
+    The SIS ids of every Canvas section in the account, across all terms
+    (sections can be moved to another term), read from one provisioning
+    report.
+
+    Returns None if the report could not be generated, in which case
+    should_request falls back to looking up each section.
+    """
+    print(") Indexing Canvas sections...")
+    try:
+        account = get_canvas_account(MAIN_ACCOUNT_ID, test=test)
+        site_index = {
+            row["section_id"]
+            for row in get_provisioning_report(account)
+            if row["section_id"]
+        }
+        print(f"FOUND {len(site_index)} CANVAS SECTIONS.")
+        return site_index
+    except Exception as error:
+        print(f"- ERROR: Failed to index Canvas sections ({error})")
+        return None
+
+
+def should_request(sis_id, test=False, site_index=None):
+    if site_index is not None:
+        return sis_id not in site_index
     try:
         canvas = get_canvas(test)
         canvas.get_section(sis_id, use_sis_id=True)
@@ -259,8 +341,6 @@ def request_course(course, reserves, status="APPROVED", verbose=True):
         )[0]
         request.status = status
         request.save()
-        if isinstance(course, Course):
-            course.save()
         if verbose:
             print("\t* Request created.")
         return [request]
@@ -270,22 +350,60 @@ def request_course(course, reserves, status="APPROVED", verbose=True):
 
 
 def enable_tools(canvas_id, tools, label, test):
+    """
+    Enable `tools` (tab labels, or tab ids if not `label`) on one site,
+    listing its tabs once. Returns {tool: result}.
+    """
+    try:
+        canvas_site = CanvasCourse(
+            get_canvas(test)._Canvas__requester, {"id": canvas_id}
+        )
+        tabs = {tab.label if label else tab.id: tab for tab in canvas_site.get_tabs()}
+    except Exception as error:
+        print(f"\t* ERROR: Failed to list tabs for {canvas_id} ({error}).")
+        return {tool: "failed" for tool in tools}
+    results = dict()
     for tool in tools:
-        try:
-            canvas = get_canvas(test)
-            canvas_site = canvas.get_course(canvas_id)
-            tabs = canvas_site.get_tabs()
-            if label:
-                tool_tab = next((tab for tab in tabs if tab.label == tool), None)
-            else:
-                tool_tab = next((tab for tab in tabs if tab.id == tool), None)
-            if tool_tab and tool_tab.visibility != "public":
+        tool_tab = tabs.get(tool)
+        if not tool_tab:
+            results[tool] = "not found"
+        elif tool_tab.visibility == "public":
+            print(f"\t* {tool_tab.label} already enabled for course.")
+            results[tool] = "already enabled"
+        else:
+            try:
                 tool_tab.update(hidden=False, position=3)
                 print(f"\t* Enabled {tool_tab.label}.")
-            elif tool_tab:
-                print(f"\t* {tool_tab.label} already enabled for course.")
-        except Exception as error:
-            print(f"\t* ERROR: Failed to enable {tool} ({error}).")
+                results[tool] = "enabled"
+            except Exception as error:
+                print(f"\t* ERROR: Failed to enable {tool} ({error}).")
+                results[tool] = "failed"
+    return results
+
+
+def enable_tools_for_sites(
+    canvas_ids, tools, label=True, test=False, max_workers=TOOL_WORKERS
+):
+    """
+    Run enable_tools for many sites from a bounded pool of threads.
+    Returns {canvas id: {tool: result}} and prints a count of each result.
+    """
+    print(f") Enabling {len(tools)} tools for {len(canvas_ids)} sites...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(
+            zip(
+                canvas_ids,
+                executor.map(
+                    lambda canvas_id: enable_tools(canvas_id, tools, label, test),
+                    canvas_ids,
+                ),
+            )
+        )
+    counts = Counter(
+        result for site_results in results.values() for result in site_results.values()
+    )
+    print(f"FINISHED: {dict(counts)}")
+    return results
 
 
 def publish_site(canvas_id, test):
@@ -311,6 +429,133 @@ def read_course_list_from_csv(csv_path):
         return courses
 
 
+def create_bulk_creation_run(
+    courses,
+    year_and_term,
+    school,
+    include_sections,
+    reserves,
+    tools,
+    label,
+    publish,
+    test,
+):
+    run = BulkCreationRun.objects.create(
+        year_and_term=year_and_term or "",
+        school=school if isinstance(school, str) else ",".join(school or []),
+        include_sections=include_sections,
+        reserves=reserves,
+        tools=dumps(tools or []),
+        label=label,
+        publish=publish,
+        test=test,
+    )
+    BulkCreationItem.objects.bulk_create(
+        [
+            BulkCreationItem(run=run, index=index, course=course)
+            for index, course in enumerate(courses)
+        ],
+        batch_size=500,
+    )
+    print(f"CREATED bulk creation run {run.pk} for {len(courses)} courses.")
+    return run
+
+
+def create_item_site(run, item):
+    course = item.course
+    course_request = request_course(course, run.reserves)
+    sections = None if not run.include_sections else list(course.sections.all())
+    creation_error = create_canvas_sites(
+        course_request, sections=sections, test=run.test
+    )
+    if creation_error:
+        print("\t> Aborting... (SITE ALREADY EXISTS)")
+        if course_request:
+            course_request[0].status = "COMPLETED"
+            course_request[0].save()
+        return BulkCreationItem.EXISTS, None, ""
+    request = Request.objects.get(course_requested=course)
+    if request.status != "COMPLETED":
+        print(f"\t* ERROR: Request incomplete. ({request.process_notes})")
+        return BulkCreationItem.FAILED, None, request.process_notes
+    canvas_id = request.canvas_instance.canvas_id
+    print(f"\t* Course created: ({canvas_id})")
+    if run.publish:
+        publish_site(canvas_id, run.test)
+    return BulkCreationItem.COMPLETED, canvas_id, ""
+
+
+def process_bulk_creation_run(run, start=None, stop=None):
+    """
+    Create sites for the items of `run` that are not done yet, saving each
+    item's state as soon as it is processed, then enable the run's tools on
+    the sites created in this pass (see enable_tools_for_sites), recording
+    each site's results in its item's notes. `start` and `stop` limit the run
+    to a range of item indexes, so several workers can share one run (see
+    get_shards).
+    """
+    items = run.items.exclude(state__in=BulkCreationItem.DONE_STATES).select_related(
+        "course"
+    )
+    if start is not None:
+        items = items.filter(index__gte=start)
+    if stop is not None:
+        items = items.filter(index__lt=stop)
+    total = run.items.count()
+    print(f") Processing courses for bulk creation run {run.pk}...")
+    completed_items = list()
+    for item in items:
+        print_item(item.index, total, item.course)
+        try:
+            item.state, item.canvas_id, item.notes = create_item_site(run, item)
+        except Exception as error:
+            print(f"\t* ERROR: Failed to create site ({error}).")
+            item.state = BulkCreationItem.FAILED
+            item.notes = str(error)
+        item.save()
+        if item.state == BulkCreationItem.COMPLETED:
+            completed_items.append(item)
+        print("\tCOMPLETE")
+    tools = run.get_tools()
+    if tools and completed_items:
+        results = enable_tools_for_sites(
+            [item.canvas_id for item in completed_items], tools, run.label, run.test
+        )
+        for item in completed_items:
+            item.notes = ", ".join(
+                f"{tool}: {result}" for tool, result in results[item.canvas_id].items()
+            )
+            item.save()
+    if not run.items.exclude(state__in=BulkCreationItem.DONE_STATES).exists():
+        run.finished = timezone.now()
+        run.save()
+    print("FINISHED")
+    return run
+
+
+def resume_bulk_creation_run(run_id=None, start=None, stop=None):
+    """
+    Continue run `run_id` (the most recent unfinished run by default),
+    skipping items that are already done and retrying failed ones.
+    """
+    runs = BulkCreationRun.objects.all()
+    run = runs.get(pk=run_id) if run_id else runs.filter(finished__isnull=True).first()
+    if not run:
+        print("No unfinished bulk creation run found.")
+        return None
+    return process_bulk_creation_run(run, start, stop)
+
+
+def get_shards(run, shard_count):
+    """
+    Split `run` into `shard_count` (start, stop) index ranges, one for each
+    worker calling resume_bulk_creation_run.
+    """
+    total = run.items.count()
+    size = -(-total // shard_count)
+    return [(start, min(start + size, total)) for start in range(0, total, size or 1)]
+
+
 def bulk_create_canvas_sites(
     year_and_term=None,
     courses=[],
@@ -325,7 +570,13 @@ def bulk_create_canvas_sites(
     label=True,
     publish=False,
     test=False,
+    process=True,
 ):
+    """
+    Record a bulk creation run for the courses and process it. With
+    `process=False` the run is only recorded, to be shared between workers
+    with get_shards and resume_bulk_creation_run.
+    """
     if type(tools) == dict and label:
         tools = [tool for tool in tools.values()]
     elif type(tools) == dict:
@@ -352,35 +603,17 @@ def bulk_create_canvas_sites(
 
         courses = [get_course_object_or_empty(course) for course in courses]
         courses = [course for course in courses if course]
-    print(") Processing courses...")
-    for index, course in enumerate(courses):
-        print_item(index, len(courses), course)
-        try:
-            course_request = request_course(course, reserves)
-            sections = None if not include_sections else list(course.sections.all())
-            creation_error = create_canvas_sites(
-                course_request, sections=sections, test=test
-            )
-            if creation_error:
-                print("\t> Aborting... (SITE ALREADY EXISTS)")
-                if course_request:
-                    course_request[0].status = "COMPLETED"
-                    course_request[0].save = "COMPLETED"
-                course.save()
-                continue
-            request = Request.objects.get(course_requested=course)
-            if request.status == "COMPLETED":
-                print(f"\t* Course created: ({request.canvas_instance.canvas_id})")
-            else:
-                print(f"\t* ERROR: Request incomplete. ({request.process_notes})")
-                continue
-            if tools or publish:
-                canvas_id = request.canvas_instance.canvas_id
-                if tools:
-                    enable_tools(canvas_id, tools, label, test)
-                if publish:
-                    publish_site(canvas_id, test)
-        except Exception as error:
-            print(f"\t* ERROR: Failed to create site ({error}).")
-        print("\tCOMPLETE")
-    print("FINISHED")
+    run = create_bulk_creation_run(
+        courses,
+        year_and_term,
+        school,
+        include_sections,
+        reserves,
+        tools,
+        label,
+        publish,
+        test,
+    )
+    if process:
+        process_bulk_creation_run(run)
+    return run
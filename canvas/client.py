@@ -0,0 +1,123 @@
+from collections import Counter
+from logging import getLogger
+from threading import Lock
+from time import sleep
+
+from canvasapi import Canvas
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = getLogger(__name__)
+POOL_SIZE = 16
+RETRIES = 5
+CONNECT_RETRIES = 1
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+THROTTLE_RETRIES = 5
+RATE_LIMIT_THRESHOLD = 200.0
+CLIENTS = dict()
+CLIENTS_LOCK = Lock()
+METRICS = Counter()
+METRICS_LOCK = Lock()
+
+
+def count(metric):
+    with METRICS_LOCK:
+        METRICS[metric] += 1
+
+
+def get_client_metrics():
+    with METRICS_LOCK:
+        return dict(METRICS)
+
+
+def get_backoff(attempt):
+    return BACKOFF_FACTOR * 2**attempt
+
+
+def is_throttled(response):
+    return response.status_code == 429 or (
+        response.status_code == 403 and b"Rate Limit Exceeded" in response.content
+    )
+
+
+def get_retry_after(response, attempt):
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return get_backoff(attempt)
+
+
+def get_rate_limit_remaining(response):
+    try:
+        return float(response.headers["X-Rate-Limit-Remaining"])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_throttle_hook(session):
+    """
+    Response hook that resends throttled requests (429, or Canvas's 403 "Rate
+    Limit Exceeded") with exponential backoff, and slows down once
+    X-Rate-Limit-Remaining falls below RATE_LIMIT_THRESHOLD.
+
+    Throttled requests were never processed by Canvas, so unlike the 5xx
+    retries mounted on the adapter, these are safe to resend for any method.
+    """
+
+    def throttle(response, *args, **kwargs):
+        count("requests")
+        attempt = 0
+        while is_throttled(response) and attempt < THROTTLE_RETRIES:
+            count("throttled")
+            delay = get_retry_after(response, attempt)
+            logger.warning(
+                f"- Canvas throttled {response.request.method} {response.request.url};"
+                f" retrying in {delay}s..."
+            )
+            sleep(delay)
+            attempt += 1
+            response.close()
+            adapter = session.get_adapter(response.request.url)
+            response = adapter.send(response.request, **kwargs)
+            count("requests")
+        remaining = get_rate_limit_remaining(response)
+        if remaining is not None and remaining < RATE_LIMIT_THRESHOLD:
+            count("slowed")
+            sleep(BACKOFF_FACTOR * (1 - max(remaining, 0) / RATE_LIMIT_THRESHOLD))
+        return response
+
+    return throttle
+
+
+def configure_session(session):
+    retry = Retry(
+        total=RETRIES,
+        connect=CONNECT_RETRIES,
+        read=0,
+        status=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(get_throttle_hook(session))
+    return session
+
+
+def get_client(name, url, key):
+    """
+    Return the process-wide Canvas client registered as `name`, creating it
+    on first use. Clients share one keep-alive session per instance, so
+    repeated calls reuse pooled connections instead of opening new ones.
+    """
+    with CLIENTS_LOCK:
+        if name not in CLIENTS:
+            canvas = Canvas(url, key)
+            configure_session(canvas._Canvas__requester._session)
+            CLIENTS[name] = canvas
+        return CLIENTS[name]
@@ -0,0 +1,204 @@
+from csv import DictWriter
+from io import BytesIO, StringIO
+from json import dumps
+from logging import getLogger
+from threading import Lock
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from django.utils import timezone
+
+from course.models import EnrollmentImport, User
+
+logger = getLogger(__name__)
+SIS_IMPORT_ROLES = {
+    "TeacherEnrollment": "teacher",
+    "TaEnrollment": "ta",
+    "DesignerEnrollment": "designer",
+    "StudentEnrollment": "student",
+    "ObserverEnrollment": "observer",
+}
+SIS_IMPORT_FINISHED_STATES = {
+    "imported",
+    "imported_with_messages",
+    "failed",
+    "failed_with_messages",
+    "aborted",
+}
+USER_FIELDS = ["user_id", "login_id", "first_name", "last_name", "email", "status"]
+ENROLLMENT_FIELDS = ["course_id", "section_id", "user_id", "role", "role_id", "status"]
+
+
+def get_csv(rows, fields):
+    output = StringIO()
+    writer = DictWriter(output, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+class EnrollmentBatch:
+    """
+    Enrollments collected while provisioning a batch of requests, submitted
+    to Canvas as a single SIS import (users.csv and enrollments.csv) instead
+    of one enrollment call per user.
+
+    Only users without a Canvas account get a users.csv row, so the import
+    never overwrites the name or email of an existing user.
+    `get_canvas_user_id` looks a login id up in Canvas (None when missing).
+    """
+
+    def __init__(self, get_canvas_user_id=None):
+        self.get_canvas_user_id = get_canvas_user_id
+        self.lock = Lock()
+        self.users = dict()
+        self.enrollments = list()
+
+    def __len__(self):
+        return len(self.enrollments)
+
+    def add(
+        self,
+        request,
+        user,
+        enrollment_type,
+        role_id=None,
+        section_id=None,
+        course_id=None,
+    ):
+        if not isinstance(user, User):
+            user = User.objects.select_related("profile").get(username=user)
+        penn_id = user.profile.penn_id
+        enrollment = {
+            "course_id": "" if section_id else course_id,
+            "section_id": section_id or "",
+            "user_id": penn_id,
+            "role": "" if role_id else SIS_IMPORT_ROLES[enrollment_type],
+            "role_id": role_id or "",
+            "status": "active",
+        }
+        with self.lock:
+            is_new_user = penn_id not in self.users
+        user_row = self.get_user_row(user) if is_new_user else None
+        with self.lock:
+            if is_new_user:
+                self.users.setdefault(penn_id, user_row)
+            self.enrollments.append((request, enrollment))
+
+    def get_user_row(self, user):
+        if user.profile.canvas_id or (
+            self.get_canvas_user_id and self.get_canvas_user_id(user.username)
+        ):
+            return None
+        return {
+            "user_id": user.profile.penn_id,
+            "login_id": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+            "status": "active",
+        }
+
+    def get_attachment(self):
+        users = [user for user in self.users.values() if user]
+        attachment = BytesIO()
+        with ZipFile(attachment, "w", ZIP_DEFLATED) as archive:
+            if users:
+                archive.writestr("users.csv", get_csv(users, USER_FIELDS))
+            archive.writestr(
+                "enrollments.csv",
+                get_csv(
+                    [enrollment for request, enrollment in self.enrollments],
+                    ENROLLMENT_FIELDS,
+                ),
+            )
+        attachment.name = "enrollments.zip"
+        attachment.seek(0)
+        return attachment
+
+    def get_rows(self):
+        return [
+            [
+                request.pk,
+                enrollment["user_id"],
+                enrollment["section_id"] or enrollment["course_id"],
+            ]
+            for request, enrollment in self.enrollments
+        ]
+
+    def submit(self, account, test=False):
+        """
+        Start importing the batch into `account` (never in batch mode, so
+        nothing else is removed) without waiting for Canvas to process it.
+        The import is recorded as an EnrollmentImport for
+        poll_enrollment_import to pick up.
+
+        Returns the SIS import id.
+        """
+        logger.info(f") Importing {len(self)} enrollments as a SIS import...")
+        sis_import = account.create_sis_import(
+            self.get_attachment(), import_type="instructure_csv", extension="zip"
+        )
+        EnrollmentImport.objects.create(
+            import_id=sis_import.id,
+            test=test,
+            workflow_state=sis_import.workflow_state,
+            enrollments=dumps(self.get_rows()),
+        )
+        logger.info(f"SIS import {sis_import.id} {sis_import.workflow_state}")
+        return sis_import.id
+
+
+def get_request_pks(rows, message):
+    """
+    The requests whose enrollments `message` mentions, matched on the Penn id
+    and the section or course id of each row.
+    """
+    return {
+        request_pk
+        for request_pk, user_id, sis_id in rows
+        if user_id in message and sis_id in message
+    } or {request_pk for request_pk, user_id, sis_id in rows if user_id in message}
+
+
+def get_messages(sis_import):
+    messages = [
+        message
+        for file_name, message in getattr(sis_import, "processing_errors", None)
+        or list()
+    ] + [
+        message
+        for file_name, message in getattr(sis_import, "processing_warnings", None)
+        or list()
+    ]
+    state = sis_import.workflow_state
+    if state.startswith("failed") or state == "aborted":
+        messages.append(f"SIS import {sis_import.id} {state}")
+    return messages
+
+
+def poll_enrollment_import(enrollment_import, account):
+    """
+    Check `enrollment_import` once, recording its state and marking it
+    finished once Canvas is done with it.
+
+    Returns {request pk: list of messages} for the requests whose enrollments
+    produced errors or warnings, or None while the import is still running.
+    """
+    sis_import = account.get_sis_import(enrollment_import.import_id)
+    state = sis_import.workflow_state
+    enrollment_import.workflow_state = state
+    if state not in SIS_IMPORT_FINISHED_STATES:
+        enrollment_import.save()
+        return None
+    logger.info(f"SIS import {sis_import.id} finished as {state}")
+    rows = enrollment_import.get_enrollments()
+    notes = dict()
+    for message in get_messages(sis_import):
+        request_pks = get_request_pks(rows, message) or {
+            request_pk for request_pk, user_id, sis_id in rows
+        }
+        for request_pk in request_pks:
+            notes.setdefault(request_pk, list()).append(message)
+    enrollment_import.finished = timezone.now()
+    enrollment_import.save()
+    return notes
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.core.cache import cache
+
+MISSING = object()
+NOT_FOUND = ""
+TTL = 60 * 60 * 24
+NEGATIVE_TTL = 60 * 60
+MAX_SIZE = 10000
+
+
+class CanvasUserCache:
+    """
+    Pennkey to Canvas user id, kept in a bounded in-process LRU in front of
+    the Django cache so lookups are shared between runs and processes.
+
+    Users that were not found are cached too (for NEGATIVE_TTL seconds) so
+    repeated lookups of a missing account do not each reach Canvas. `get`
+    returns MISSING when nothing is cached and None for a cached miss.
+    """
+
+    def __init__(self, name, ttl=TTL, negative_ttl=NEGATIVE_TTL, max_size=MAX_SIZE):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get_key(self, login_id):
+        return f"canvas_user:{self.name}:{login_id}"
+
+    def get(self, login_id):
+        with self.lock:
+            entry = self.entries.get(login_id)
+            if entry and entry[1] > monotonic():
+                self.entries.move_to_end(login_id)
+                return entry[0]
+            self.entries.pop(login_id, None)
+        canvas_user_id = cache.get(self.get_key(login_id))
+        if canvas_user_id is None:
+            return MISSING
+        canvas_user_id = canvas_user_id or None
+        self.remember(login_id, canvas_user_id)
+        return canvas_user_id
+
+    def remember(self, login_id, canvas_user_id):
+        ttl = self.ttl if canvas_user_id else self.negative_ttl
+        with self.lock:
+            self.entries[login_id] = (canvas_user_id, monotonic() + ttl)
+            self.entries.move_to_end(login_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return ttl
+
+    def set(self, login_id, canvas_user_id):
+        ttl = self.remember(login_id, canvas_user_id)
+        cache.set(self.get_key(login_id), canvas_user_id or NOT_FOUND, ttl)
+
+    def delete(self, login_id):
+        with self.lock:
+            self.entries.pop(login_id, None)
+        cache.delete(self.get_key(login_id))
+
+
+USER_CACHES = {"prod": CanvasUserCache("prod"), "test": CanvasUserCache("test")}
+
+
+def get_user_cache(test=False):
+    return USER_CACHES["test" if test else "prod"]
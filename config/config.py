@@ -22,4 +22,23 @@ PROD_URL, PROD_KEY, TEST_URL, TEST_KEY = get_config_section_values("canvas")
     DATA_WAREHOUSE_PASSWORD,
     DATA_WAREHOUSE_SERVICE,
 ) = get_config_section_values("data_warehouse")
+DATA_WAREHOUSE_POOL_SECTION = "data_warehouse_pool"
+DATA_WAREHOUSE_POOL_MIN = config.getint(DATA_WAREHOUSE_POOL_SECTION, "min", fallback=1)
+DATA_WAREHOUSE_POOL_MAX = config.getint(DATA_WAREHOUSE_POOL_SECTION, "max", fallback=4)
+DATA_WAREHOUSE_POOL_TIMEOUT = config.getint(
+    DATA_WAREHOUSE_POOL_SECTION, "timeout", fallback=30
+)
+DATA_WAREHOUSE_POOL_PING_INTERVAL = config.getint(
+    DATA_WAREHOUSE_POOL_SECTION, "ping_interval", fallback=60
+)
+CANVAS_PROVISIONING_SECTION = "canvas_provisioning"
+CANVAS_PROVISIONING_WORKERS = config.getint(
+    CANVAS_PROVISIONING_SECTION, "workers", fallback=4
+)
+CANVAS_PROVISIONING_MAX_CONCURRENCY = config.getint(
+    CANVAS_PROVISIONING_SECTION, "max_concurrency", fallback=8
+)
+CANVAS_ENROLLMENT_MODE = config.get(
+    CANVAS_PROVISIONING_SECTION, "enrollment_mode", fallback="api"
+)
 LIB_DIR = config.get("cx_oracle", "lib_dir")
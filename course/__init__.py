@@ -4,6 +4,8 @@ from django.dispatch import receiver
 
 from .celery import app as celery_app
 
+default_app_config = "course.apps.CourseAppConfig"
+
 
 @receiver(user_logged_in)
 def on_login(sender, user, request, **kwargs):
@@ -17,8 +17,11 @@ from .models import (
     Activity,
     AdditionalEnrollment,
     AutoAdd,
+    BulkCreationItem,
+    BulkCreationRun,
     CanvasSite,
     Course,
+    EnrollmentImport,
     Notice,
     PageContent,
     Profile,
@@ -29,6 +32,7 @@ from .models import (
     UpdateLog,
     User,
 )
+from .resolvers import resolve_requested
 
 
 class AdditionalEnrollmentInline(admin.StackedInline):
@@ -137,6 +141,10 @@ class CourseAdmin(admin.ModelAdmin):
         obj.owner = request.user
         obj.save()
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        resolve_requested([form.instance.course_code])
+
 
 class RequestAdmin(admin.ModelAdmin):
     list_display = [
@@ -329,6 +337,9 @@ admin.site.register(Activity)
 admin.site.register(Subject)
 admin.site.register(AutoAdd, AutoAddAdmin)
 admin.site.register(UpdateLog)
+admin.site.register(BulkCreationRun)
+admin.site.register(BulkCreationItem)
+admin.site.register(EnrollmentImport)
 admin.site.register(PageContent)
 admin.site.register(CanvasSite, CanvasSiteAdmin)
 admin.site.register(RequestSummary, RequestSummaryAdmin)
@@ -4,3 +4,6 @@ from django.utils.translation import ugettext_lazy as _  # noqa
 
 class CourseAppConfig(AppConfig):
     name = "course"
+
+    def ready(self):
+        from . import signals  # noqa
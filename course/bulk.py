@@ -0,0 +1,128 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Value, When
+
+BULK_BATCH_SIZE = 500
+
+
+def get_batches(items, batch_size=BULK_BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), batch_size):
+        end = start + batch_size
+        yield items[start:end]
+
+
+def bulk_update(model, objects, fields, batch_size=BULK_BATCH_SIZE):
+    """
+    Write `fields` of already-saved `objects` with one UPDATE per batch.
+
+    Stands in for QuerySet.bulk_update, which only exists from Django 2.2.
+    """
+    fields = [model._meta.get_field(field) for field in fields]
+    updated = 0
+    for batch in get_batches(objects, batch_size):
+        values = {
+            field.attname: Case(
+                *[
+                    When(
+                        pk=instance.pk,
+                        then=Value(
+                            getattr(instance, field.attname), output_field=field
+                        ),
+                    )
+                    for instance in batch
+                ],
+                output_field=field,
+            )
+            for field in fields
+        }
+        updated += model.objects.filter(
+            pk__in=[instance.pk for instance in batch]
+        ).update(**values)
+    return updated
+
+
+def bulk_create_or_get(model, objects, lookup_fields, batch_size=BULK_BATCH_SIZE):
+    """
+    Insert `objects` in bulk; if another process inserted some of them first,
+    fall back to get_or_create on `lookup_fields` for each one.
+
+    Stands in for bulk_create's ignore_conflicts, which only exists from
+    Django 2.2.
+    """
+    try:
+        with transaction.atomic():
+            return model.objects.bulk_create(objects, batch_size=batch_size)
+    except IntegrityError:
+        created = list()
+        for instance in objects:
+            lookup = {field: getattr(instance, field) for field in lookup_fields}
+            defaults = {
+                field.attname: getattr(instance, field.attname)
+                for field in model._meta.concrete_fields
+                if not field.primary_key and field.attname not in lookup
+            }
+            instance, was_created = model.objects.get_or_create(
+                defaults=defaults, **lookup
+            )
+            if was_created:
+                created.append(instance)
+        return created
+
+
+def get_many_to_many_rows(model, field_name, source_pks, batch_size):
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    existing = {source_pk: dict() for source_pk in source_pks}
+    for batch in get_batches(source_pks, batch_size):
+        for row_id, source_pk, target_pk in through.objects.filter(
+            **{f"{source}__in": batch}
+        ).values_list("id", source, target):
+            existing[source_pk][target_pk] = row_id
+    return through, source, target, existing
+
+
+def bulk_set_many_to_many(model, field_name, values, batch_size=BULK_BATCH_SIZE):
+    """
+    Make `values` ({source pk: set of target pks}) the complete contents of the
+    many-to-many `field_name` for each source pk, by inserting and deleting
+    only the through-table rows that differ.
+
+    Symmetrical relations are not mirrored: include both directions in `values`.
+    """
+    through, source, target, existing = get_many_to_many_rows(
+        model, field_name, values, batch_size
+    )
+    additions = [
+        through(**{source: source_pk, target: target_pk})
+        for source_pk, target_pks in values.items()
+        for target_pk in set(target_pks) - set(existing[source_pk])
+    ]
+    removals = [
+        row_id
+        for source_pk, target_pks in values.items()
+        for target_pk, row_id in existing[source_pk].items()
+        if target_pk not in target_pks
+    ]
+    through.objects.bulk_create(additions, batch_size=batch_size)
+    for batch in get_batches(removals, batch_size):
+        through.objects.filter(id__in=batch).delete()
+    return len(additions), len(removals)
+
+
+def bulk_add_many_to_many(model, field_name, values, batch_size=BULK_BATCH_SIZE):
+    """
+    Like bulk_set_many_to_many, but only inserts the missing rows: existing
+    relations not present in `values` are kept.
+    """
+    through, source, target, existing = get_many_to_many_rows(
+        model, field_name, values, batch_size
+    )
+    additions = [
+        through(**{source: source_pk, target: target_pk})
+        for source_pk, target_pks in values.items()
+        for target_pk in set(target_pks) - set(existing[source_pk])
+    ]
+    through.objects.bulk_create(additions, batch_size=batch_size)
+    return len(additions)
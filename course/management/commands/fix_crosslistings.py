@@ -1,6 +1,8 @@
 import csv
 import sys
+from collections import defaultdict
 
+from course.bulk import bulk_add_many_to_many, bulk_update, get_batches
 from course.models import Course
 from open_data.open_data import OpenData
 
@@ -43,38 +45,41 @@ def find_crosslistings(year_term):
 
 
 def fix_crosslistings(courses, year_and_term):
+    pairs = [
+        (f"{section}{year_and_term}", f"{primary}{year_and_term}")
+        for section, primary in courses
+    ]
+    crf_courses = dict()
+    for batch in get_batches({course_code for pair in pairs for course_code in pair}):
+        crf_courses.update(Course.objects.in_bulk(batch))
+    changed_courses = dict()
+    crosslistings = defaultdict(set)
+
     with open("crosslisting_check.csv", mode="w") as check:
         check = csv.writer(check, delimiter=",", quotechar='"')
 
-        for course in courses:
-            section = f"{course[0]}{year_and_term}"
-            primary = f"{course[1]}{year_and_term}"
-
-            try:
-                crf_course = Course.objects.get(course_code=section)
-            except Exception:
-                crf_course = None
-            try:
-                crf_primary = Course.objects.get(course_code=primary)
-            except Exception:
-                crf_primary = None
+        for section, primary in pairs:
+            crf_course = crf_courses.get(section)
+            crf_primary = crf_courses.get(primary)
 
             if crf_course and crf_primary:
                 crf_course.primary_crosslist = primary
+                changed_courses[section] = crf_course
 
                 if crf_course.requested or crf_primary.requested:
                     check.writerow(["needs_review", section, primary])
                 elif not crf_course.requested and not crf_primary.requested:
                     print("adding", section, primary)
-                    crf_course.crosslisted.add(crf_primary)
+                    crosslistings[section].add(primary)
+                    crosslistings[primary].add(section)
                     check.writerow(["added_cx", section, primary])
-                crf_course.save()
             else:
                 if crf_course:
-                    crf_course.crosslist_primary = crf_primary
-                    crf_course.save()
                     print(primary, " doesnt exits")
                 elif crf_primary:
                     print(section, " doesnt exits")
                 else:
                     check.writerow(["neither exist", section, primary])
+
+    bulk_update(Course, changed_courses.values(), ["primary_crosslist"])
+    bulk_add_many_to_many(Course, "crosslisted", crosslistings)
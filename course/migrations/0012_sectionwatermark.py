@@ -0,0 +1,26 @@
+# Generated by Django 2.1.2 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0011_auto_20220314_0831"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SectionWatermark",
+            fields=[
+                (
+                    "course_code",
+                    models.CharField(max_length=150, primary_key=True, serialize=False),
+                ),
+                ("year_and_term", models.CharField(db_index=True, max_length=6)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("reconciled", models.DateTimeField()),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
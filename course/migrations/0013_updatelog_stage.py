@@ -0,0 +1,27 @@
+# Generated by Django 2.1.2 on 2026-10-17 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0012_sectionwatermark"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="updatelog",
+            options={"ordering": ["-created"]},
+        ),
+        migrations.AddField(
+            model_name="updatelog",
+            name="stage",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="updatelog",
+            name="term",
+            field=models.CharField(blank=True, default="", max_length=6),
+        ),
+    ]
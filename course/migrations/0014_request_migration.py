@@ -0,0 +1,28 @@
+# Generated by Django 2.1.2 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0013_updatelog_stage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="request",
+            name="migration_progress_id",
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name="request",
+            name="migration_state",
+            field=models.CharField(blank=True, default="", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="request",
+            name="migration_completion",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 2.1.2 on 2026-10-17 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0014_request_migration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BulkCreationRun",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                (
+                    "year_and_term",
+                    models.CharField(blank=True, default="", max_length=6),
+                ),
+                ("school", models.CharField(blank=True, default="", max_length=100)),
+                ("include_sections", models.BooleanField(default=False)),
+                ("reserves", models.BooleanField(default=True)),
+                ("tools", models.TextField(blank=True, default="[]")),
+                ("label", models.BooleanField(default=True)),
+                ("publish", models.BooleanField(default=False)),
+                ("test", models.BooleanField(default=False)),
+            ],
+            options={"ordering": ["-created"]},
+        ),
+        migrations.CreateModel(
+            name="BulkCreationItem",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.IntegerField()),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("COMPLETED", "Completed"),
+                            ("EXISTS", "Site already exists"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "canvas_id",
+                    models.CharField(blank=True, max_length=10, null=True),
+                ),
+                ("notes", models.TextField(blank=True, default="")),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bulk_creation_items",
+                        to="course.Course",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="course.BulkCreationRun",
+                    ),
+                ),
+            ],
+            options={"ordering": ["run", "index"]},
+        ),
+        migrations.AlterUniqueTogether(
+            name="bulkcreationitem",
+            unique_together={("run", "index")},
+        ),
+    ]
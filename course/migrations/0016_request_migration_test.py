@@ -0,0 +1,18 @@
+# Generated by Django 2.1.2 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0015_bulkcreationrun_bulkcreationitem"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="request",
+            name="migration_test",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.1.2 on 2026-10-17 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0016_request_migration_test"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EnrollmentImport",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                ("import_id", models.CharField(max_length=20)),
+                ("test", models.BooleanField(default=False)),
+                (
+                    "workflow_state",
+                    models.CharField(blank=True, default="", max_length=30),
+                ),
+                ("enrollments", models.TextField(blank=True, default="[]")),
+            ],
+            options={"ordering": ["-created"]},
+        ),
+    ]
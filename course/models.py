@@ -1,8 +1,11 @@
+from json import loads
 from logging import getLogger
 
 from bleach import clean
 from bleach_allowlist import markdown_attrs, markdown_tags
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models import (
     CASCADE,
     SET_NULL,
@@ -16,15 +19,26 @@ from django.db.models import (
     Model,
     OneToOneField,
     Q,
+    QuerySet,
     TextField,
 )
 from django.utils.safestring import mark_safe
 from markdown import markdown
 
+from .bulk import get_batches
 from .terms import FALL, SPRING, SUMMER, USE_BANNER
 
 logger = getLogger(__name__)
 SIS_PREFIX = "BAN" if USE_BANNER else "SRS"
+HIDDEN_SCHOOLS_KEY = "hidden_schools"
+HIDDEN_SUBJECTS_KEY = "hidden_subjects"
+HIDDEN_TTL = 60 * 5
+REQUESTED = (
+    Q(requested_override=True)
+    | Q(request__isnull=False)
+    | Q(multisection_request__isnull=False)
+    | Q(crosslisted_request__isnull=False)
+)
 
 
 class Profile(Model):
@@ -45,7 +59,20 @@ class Activity(Model):
         return f"{self.name} ({self.abbr})"
 
 
-class School(Model):
+class VisibilityMixin:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_visible = dict(zip(field_names, values)).get("visible")
+        return instance
+
+    def is_visibility_changed(self):
+        return self._state.adding or self.visible != getattr(
+            self, "saved_visible", None
+        )
+
+
+class School(VisibilityMixin, Model):
     name = CharField(max_length=50, unique=True)
     abbreviation = CharField(max_length=10, unique=True, primary_key=True)
     visible = BooleanField(default=True)
@@ -65,14 +92,17 @@ class School(Model):
         return Subject.objects.filter(schools=self)
 
     def save(self, *args, **kwargs):
-        for subject in self.get_subjects():
-            subject.visible = self.visible
-            subject.save()
-
+        visibility_changed = self.is_visibility_changed()
         super().save(*args, **kwargs)
+        if visibility_changed:
+            self.get_subjects().exclude(visible=self.visible).update(
+                visible=self.visible
+            )
+            clear_hidden_cache()
+            self.saved_visible = self.visible
 
 
-class Subject(Model):
+class Subject(VisibilityMixin, Model):
     name = CharField(max_length=50)
     abbreviation = CharField(max_length=10, unique=True, primary_key=True)
     visible = BooleanField(default=True)
@@ -86,6 +116,44 @@ class Subject(Model):
     def __str__(self):
         return f"{self.name} ({self.abbreviation})"
 
+    def save(self, *args, **kwargs):
+        visibility_changed = self.is_visibility_changed()
+        super().save(*args, **kwargs)
+        if visibility_changed:
+            clear_hidden_cache()
+            self.saved_visible = self.visible
+
+
+def get_hidden(model, key):
+    hidden = cache.get(key)
+    if hidden is None:
+        hidden = set(model.objects.filter(visible=False).values_list("pk", flat=True))
+        cache.set(key, hidden, HIDDEN_TTL)
+    return hidden
+
+
+def get_hidden_schools():
+    return get_hidden(School, HIDDEN_SCHOOLS_KEY)
+
+
+def get_hidden_subjects():
+    return get_hidden(Subject, HIDDEN_SUBJECTS_KEY)
+
+
+def clear_hidden_cache():
+    cache.delete_many([HIDDEN_SCHOOLS_KEY, HIDDEN_SUBJECTS_KEY])
+
+
+def exclude_hidden(courses, subjects=True):
+    """
+    Leave out the courses of hidden schools (and subjects) using the cached
+    sets of hidden primary keys rather than joining either table.
+    """
+    courses = courses.exclude(course_schools__in=get_hidden_schools())
+    if subjects:
+        courses = courses.exclude(course_subject__in=get_hidden_subjects())
+    return courses
+
 
 class CanvasSite(Model):
     canvas_id = CharField(max_length=10, blank=False, default=None, primary_key=True)
@@ -189,6 +257,13 @@ class Course(Model):
                 request or self.multisection_request or self.crosslisted_request
             )
 
+    def is_linked_to_request(self):
+        return bool(
+            self.requested_override
+            or self.multisection_request_id
+            or self.crosslisted_request_id
+        )
+
     def set_requested(self, requested):
         self.requested = requested
         self.save()
@@ -200,48 +275,36 @@ class Course(Model):
             & Q(course_section=self.course_section)
             & Q(course_term=self.course_term)
             & Q(year=self.year)
-        )
-        for course in cross_courses:
-            self.crosslisted.add(course)
-            self.save()
+        ).exclude(course_code=self.course_code)
+        self.crosslisted.add(*cross_courses)
 
-    def update_crosslists(self):
-        cross_courses = Course.objects.filter(
-            Q(course_primary_subject=self.course_primary_subject)
-            & Q(course_number=self.course_number)
-            & Q(course_section=self.course_section)
-            & Q(course_term=self.course_term)
-            & Q(year=self.year)
-        )
-        for course in cross_courses:
-            course.requested_override = self.requested_override
+    @staticmethod
+    def get_course_code(subject, course_number, course_section, year, course_term):
+        return f"{subject}{course_number}{course_section}{year}{course_term}"
+
+    @staticmethod
+    def is_section(course_section):
         try:
-            request = Request.objects.get(course_requested=self.course_code)
-        except Exception:
-            request = None
-        if request:
-            for course in cross_courses:
-                course.crosslisted_request = request
+            section = int(course_section)
+        except ValueError:
+            return True
+        return not 300 <= section < 400
 
     def save(self, *args, **kwargs):
-        self.course_code = (
-            f"{self.course_subject.abbreviation}"
-            f"{self.course_number}"
-            f"{self.course_section}"
-            f"{self.year}"
-            f"{self.course_term}"
+        self.course_code = self.get_course_code(
+            self.course_subject.abbreviation,
+            self.course_number,
+            self.course_section,
+            self.year,
+            self.course_term,
         )
-        if self._state.adding is True:
-            super().save(*args, **kwargs)
-        else:
-            self.sections.set(self.find_sections())
-            self.requested = self.get_requested()
-            self.update_crosslists()
-            super().save(*args, **kwargs)
+        if self.is_linked_to_request():
+            self.requested = True
+        super().save(*args, **kwargs)
 
     def get_request(self):
         try:
-            return Request.objects.get(course_requested=self.course_code)
+            return self.request
         except Exception as error:
             if self.multisection_request:
                 request = self.multisection_request
@@ -273,22 +336,15 @@ class Course(Model):
         return f"{self.year}{self.course_term}"
 
     def find_sections(self):
-        courses = list(
-            Course.objects.filter(
-                Q(course_subject=self.course_subject)
-                & Q(course_number=self.course_number)
-                & Q(course_term=self.course_term)
-                & Q(year=self.year)
-            ).exclude(course_code=self.course_code)
-        )
-        for course in courses:
-            try:
-                section = int(course.course_section)
-            except Exception:
-                continue
-            if section >= 300 and section < 400:
-                courses.remove(course)
-        return courses
+        if not self.is_section(self.course_section):
+            return list()
+        courses = Course.objects.filter(
+            Q(course_subject=self.course_subject)
+            & Q(course_number=self.course_number)
+            & Q(course_term=self.course_term)
+            & Q(year=self.year)
+        ).exclude(course_code=self.course_code)
+        return [course for course in courses if self.is_section(course.course_section)]
 
     def sis_format(self):
         return (
@@ -348,6 +404,30 @@ class Notice(Model):
         )
 
 
+class RequestQuerySet(QuerySet):
+    def delete(self):
+        """
+        Delete the requests and un-request the courses they covered with a few
+        set-based UPDATEs per batch, in one transaction.
+        """
+        with transaction.atomic():
+            request_pks = list(self.values_list("pk", flat=True))
+            course_codes = set(request_pks)
+            for batch in get_batches(request_pks):
+                sections = Course.objects.filter(multisection_request__in=batch)
+                crosslistings = Course.objects.filter(crosslisted_request__in=batch)
+                course_codes.update(sections.values_list("course_code", flat=True))
+                course_codes.update(crosslistings.values_list("course_code", flat=True))
+                sections.update(multisection_request=None)
+                crosslistings.update(crosslisted_request=None)
+            deleted = super().delete()
+            for batch in get_batches(course_codes):
+                Course.objects.filter(course_code__in=batch, requested=True).exclude(
+                    REQUESTED
+                ).update(requested=False)
+        return deleted
+
+
 class Request(Model):
     REQUEST_PROCESS_CHOICES = (
         ("COMPLETED", "Completed"),
@@ -380,6 +460,11 @@ class Request(Model):
     updated = DateTimeField(auto_now=True)
     owner = ForeignKey("auth.User", related_name="requests", on_delete=CASCADE)
     masquerade = CharField(max_length=20, null=True)
+    migration_progress_id = CharField(max_length=20, null=True, blank=True)
+    migration_state = CharField(max_length=20, blank=True, default="")
+    migration_completion = IntegerField(null=True, blank=True)
+    migration_test = BooleanField(default=False)
+    objects = RequestQuerySet.as_manager()
 
     class Meta:
         ordering = ["-status", "-created"]
@@ -388,40 +473,7 @@ class Request(Model):
         super(Request, self).save(*args, **kwargs)
 
     def delete(self):
-        course = Course.objects.get(course_code=self.course_requested.course_code)
-        multi_section_courses = Course.objects.filter(
-            multisection_request=course.course_code
-        )
-        crosslisted_courses = Course.objects.filter(
-            crosslisted_request=course.course_code
-        )
-
-        if crosslisted_courses:
-            for crosslisted_course in crosslisted_courses:
-                crosslisted_course.crosslisted_request = None
-                crosslisted_course.requested = False
-                crosslisted_course.save()
-
-        if multi_section_courses:
-            for multi_section_course in multi_section_courses:
-                multi_section_course.multisection_request = None
-                multi_section_course.requested = False
-                multi_section_course.save()
-
-        super(Request, self).delete()
-        course.requested = False
-        course.save()
-
-        if crosslisted_courses:
-            for crosslisted_course in crosslisted_courses:
-                if course != crosslisted_course:
-                    crosslisted_course.requested = False
-                    crosslisted_course.save()
-
-        if multi_section_courses:
-            for multi_section_course in multi_section_courses:
-                multi_section_course.requested = False
-                multi_section_course.save()
+        return Request.objects.filter(pk=self.pk).delete()
 
 
 class AdditionalEnrollment(Model):
@@ -472,6 +524,98 @@ class UpdateLog(Model):
     created = DateTimeField(auto_now_add=True, null=True, blank=True)
     finished = DateTimeField(null=True, blank=True)
     process = CharField(max_length=10, choices=MANAGER_CHOICES)
+    stage = CharField(max_length=50, blank=True, default="")
+    term = CharField(max_length=6, blank=True, default="")
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.stage} {self.term}".strip() or str(self.pk)
+
+    def get_duration(self):
+        return self.finished - self.created if self.finished else None
+
+
+class SectionWatermark(Model):
+    course_code = CharField(max_length=150, primary_key=True)
+    year_and_term = CharField(max_length=6, db_index=True)
+    content_hash = CharField(max_length=64)
+    reconciled = DateTimeField()
+    updated = DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.course_code
+
+
+class BulkCreationRun(Model):
+    created = DateTimeField(auto_now_add=True)
+    updated = DateTimeField(auto_now=True)
+    finished = DateTimeField(null=True, blank=True)
+    year_and_term = CharField(max_length=6, blank=True, default="")
+    school = CharField(max_length=100, blank=True, default="")
+    include_sections = BooleanField(default=False)
+    reserves = BooleanField(default=True)
+    tools = TextField(blank=True, default="[]")
+    label = BooleanField(default=True)
+    publish = BooleanField(default=False)
+    test = BooleanField(default=False)
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.pk}: {self.school} {self.year_and_term}".strip()
+
+    def get_tools(self):
+        return loads(self.tools)
+
+
+class BulkCreationItem(Model):
+    PENDING = "PENDING"
+    COMPLETED = "COMPLETED"
+    EXISTS = "EXISTS"
+    FAILED = "FAILED"
+    STATE_CHOICES = (
+        (PENDING, "Pending"),
+        (COMPLETED, "Completed"),
+        (EXISTS, "Site already exists"),
+        (FAILED, "Failed"),
+    )
+    DONE_STATES = [COMPLETED, EXISTS]
+    run = ForeignKey(BulkCreationRun, related_name="items", on_delete=CASCADE)
+    index = IntegerField()
+    course = ForeignKey(Course, related_name="bulk_creation_items", on_delete=CASCADE)
+    state = CharField(max_length=20, choices=STATE_CHOICES, default=PENDING)
+    canvas_id = CharField(max_length=10, null=True, blank=True)
+    notes = TextField(blank=True, default="")
+    updated = DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["run", "index"]
+        unique_together = ("run", "index")
+
+    def __str__(self):
+        return f"{self.run_id}/{self.index}: {self.course_id} ({self.state})"
+
+
+class EnrollmentImport(Model):
+    created = DateTimeField(auto_now_add=True)
+    updated = DateTimeField(auto_now=True)
+    finished = DateTimeField(null=True, blank=True)
+    import_id = CharField(max_length=20)
+    test = BooleanField(default=False)
+    workflow_state = CharField(max_length=30, blank=True, default="")
+    enrollments = TextField(blank=True, default="[]")
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.import_id} ({self.workflow_state})"
+
+    def get_enrollments(self):
+        return loads(self.enrollments)
 
 
 class PageContent(Model):
@@ -0,0 +1,292 @@
+from collections import defaultdict
+from functools import reduce
+from logging import getLogger
+from operator import or_
+
+from django.db.models import Q
+
+from .bulk import (
+    BULK_BATCH_SIZE,
+    bulk_set_many_to_many,
+    get_batches,
+    get_many_to_many_rows,
+)
+from .models import REQUESTED, Course
+from .terms import split_year_and_term
+
+logger = getLogger(__name__)
+SECTION_KEY_BATCH_SIZE = 200
+SECTION_FIELDS = [
+    "course_code",
+    "course_subject",
+    "course_number",
+    "course_section",
+    "year",
+    "course_term",
+]
+CROSSLIST_FIELDS = SECTION_FIELDS + ["course_primary_subject", "primary_crosslist"]
+
+
+def resolve_requested(course_codes):
+    """
+    Recompute `requested` for `course_codes` with one UPDATE per direction per
+    batch, touching only the courses whose flag is wrong.
+
+    A course is requested when it has its own request, is a section or
+    crosslisting of another request, or has `requested_override` set.
+    """
+    updated = 0
+    for batch in get_batches(course_codes):
+        courses = Course.objects.filter(course_code__in=batch)
+        updated += courses.filter(REQUESTED, requested=False).update(requested=True)
+        updated += (
+            courses.filter(requested=True).exclude(REQUESTED).update(requested=False)
+        )
+    return updated
+
+
+def get_request_course_codes(request):
+    return {request.course_requested_id} | set(
+        Course.objects.filter(
+            Q(multisection_request=request) | Q(crosslisted_request=request)
+        ).values_list("course_code", flat=True)
+    )
+
+
+def resolve_request(request):
+    """
+    Point the crosslistings of `request`'s course at it and recompute
+    `requested` for every course the request covers.
+    """
+    course_code = request.course_requested_id
+    Course.objects.filter(
+        crosslisted__course_code=course_code, crosslisted_request__isnull=True
+    ).exclude(course_code=course_code).update(crosslisted_request=request)
+    return resolve_requested(get_request_course_codes(request))
+
+
+def get_section_key(course):
+    return (
+        course.course_subject_id,
+        course.course_number,
+        course.year,
+        course.course_term,
+    )
+
+
+def get_sections(groups):
+    """
+    {course code: section course codes} for `groups` of courses sharing a
+    subject, number and term. 300-level sections are nobody's sections.
+    """
+    sections = dict()
+    for group in groups:
+        members = {
+            course.course_code
+            for course in group
+            if Course.is_section(course.course_section)
+        }
+        for course in group:
+            sections[course.course_code] = (
+                members - {course.course_code}
+                if course.course_code in members
+                else set()
+            )
+    return sections
+
+
+def write_sections(sections):
+    added, removed = bulk_set_many_to_many(Course, "sections", sections)
+    logger.info(
+        f"- Updated sections for {len(sections)} courses ({added} added,"
+        f" {removed} removed)"
+    )
+    return added, removed
+
+
+def resolve_sections(courses):
+    """
+    Regroup the sections of every subject, number and term one of `courses`
+    belongs to, writing only the through-table rows that differ.
+    """
+    keys = {get_section_key(course) for course in courses}
+    groups = defaultdict(list)
+    for batch in get_batches(keys, SECTION_KEY_BATCH_SIZE):
+        candidates = Course.objects.filter(
+            reduce(
+                or_,
+                (
+                    Q(
+                        course_subject=subject,
+                        course_number=number,
+                        year=year,
+                        course_term=term,
+                    )
+                    for subject, number, year, term in batch
+                ),
+            )
+        ).only(*SECTION_FIELDS)
+        for course in candidates:
+            groups[get_section_key(course)].append(course)
+    return write_sections(get_sections(groups.values()))
+
+
+def resolve_term_sections(year_and_term):
+    """
+    Regroup the sections of every course in a term from one query, writing
+    only the through-table rows that differ.
+    """
+    year, term = split_year_and_term(year_and_term)
+    groups = defaultdict(list)
+    for course in Course.objects.filter(year=year, course_term=term).only(
+        *SECTION_FIELDS
+    ):
+        groups[get_section_key(course)].append(course)
+    return write_sections(get_sections(groups.values()))
+
+
+class CrosslistFamilies:
+    """
+    Union-find over course codes and the keys that tie crosslisted courses
+    together, so each family is found in one pass however it was linked.
+    """
+
+    def __init__(self):
+        self.parents = dict()
+
+    def find(self, key):
+        root = self.parents.setdefault(key, key)
+        while root != self.parents[root]:
+            root = self.parents[root]
+        while key != root:
+            self.parents[key], key = root, self.parents[key]
+        return root
+
+    def union(self, key, *keys):
+        root = self.find(key)
+        for other in keys:
+            other_root = self.find(other)
+            if other_root != root:
+                self.parents[other_root] = root
+
+    def get_families(self, course_codes):
+        families = defaultdict(set)
+        for course_code in course_codes:
+            families[self.find(course_code)].add(course_code)
+        return [family for family in families.values() if len(family) > 1]
+
+
+def get_primary_course_code(course):
+    primary_crosslist = course.primary_crosslist.replace(" ", "")
+    if not primary_crosslist:
+        return None
+    year_and_term = course.get_year_and_term()
+    if year_and_term in primary_crosslist and len(primary_crosslist) > 9:
+        primary_crosslist = primary_crosslist.replace(year_and_term, "")
+    return f"{primary_crosslist}{year_and_term}"
+
+
+def get_crosslist_key(course):
+    return (
+        course.course_primary_subject_id,
+        course.course_number,
+        course.course_section,
+        course.year,
+        course.course_term,
+    )
+
+
+def write_crosslistings(courses):
+    """
+    Crosslist every member of each family among `courses` with every other
+    member (and not with itself). Courses sharing a primary subject, number
+    and section, courses and their primary crosslist, and courses already
+    crosslisted with each other form one family. Crosslistings with courses
+    outside `courses` are left alone.
+    """
+    families = CrosslistFamilies()
+    for course in courses:
+        families.union(course.course_code, get_crosslist_key(course))
+    course_codes = {course.course_code for course in courses}
+    for course in courses:
+        primary_course_code = get_primary_course_code(course)
+        if primary_course_code in course_codes:
+            families.union(course.course_code, primary_course_code)
+    existing = get_many_to_many_rows(
+        Course, "crosslisted", course_codes, BULK_BATCH_SIZE
+    )[3]
+    for course_code, crosslisted in existing.items():
+        families.union(
+            course_code, *(code for code in crosslisted if code in course_codes)
+        )
+    crosslistings = {
+        course_code: {
+            code for code in existing[course_code] if code not in course_codes
+        }
+        for course_code in course_codes
+    }
+    for family in families.get_families(course_codes):
+        for course_code in family:
+            crosslistings[course_code].update(family - {course_code})
+    added, removed = bulk_set_many_to_many(Course, "crosslisted", crosslistings)
+    logger.info(
+        f"- Updated crosslistings for {len(crosslistings)} courses ({added} added,"
+        f" {removed} removed)"
+    )
+    return added, removed
+
+
+def resolve_term_crosslistings(year_and_term):
+    """
+    Complete the crosslistings of every course in a term in one pass (see
+    write_crosslistings).
+    """
+    year, term = split_year_and_term(year_and_term)
+    return write_crosslistings(
+        list(Course.objects.filter(year=year, course_term=term).only(*CROSSLIST_FIELDS))
+    )
+
+
+def resolve_crosslistings(courses):
+    """
+    Complete the crosslistings of the families `courses` belong to, loading
+    only `courses`, the courses that share their keys or primary crosslists,
+    and the courses they are already crosslisted with.
+    """
+    keys = {get_crosslist_key(course) for course in courses}
+    course_codes = {course.course_code for course in courses}
+    linked_codes = course_codes | {
+        get_primary_course_code(course) for course in courses
+    } - {None}
+    primary_crosslists = linked_codes | {
+        course.course_code[: -len(course.get_year_and_term())] for course in courses
+    }
+    related = dict()
+    for batch in get_batches(keys, SECTION_KEY_BATCH_SIZE):
+        for course in Course.objects.filter(
+            reduce(
+                or_,
+                (
+                    Q(
+                        course_primary_subject=subject,
+                        course_number=number,
+                        course_section=section,
+                        year=year,
+                        course_term=term,
+                    )
+                    for subject, number, section, year, term in batch
+                ),
+            )
+        ).only(*CROSSLIST_FIELDS):
+            related[course.course_code] = course
+    for batch in get_batches(linked_codes):
+        for course in Course.objects.filter(
+            Q(course_code__in=batch) | Q(crosslisted__course_code__in=batch)
+        ).only(*CROSSLIST_FIELDS):
+            related[course.course_code] = course
+    for batch in get_batches(primary_crosslists):
+        for course in Course.objects.filter(primary_crosslist__in=batch).only(
+            *CROSSLIST_FIELDS
+        ):
+            related[course.course_code] = course
+    return write_crosslistings(list(related.values()))
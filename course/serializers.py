@@ -1,5 +1,6 @@
 import collections
 
+from django.db.models import Prefetch
 from rest_framework.serializers import (
     BooleanField,
     CharField,
@@ -29,6 +30,35 @@ from .models import (
     UpdateLog,
     User,
 )
+from .resolvers import resolve_requested
+
+COURSE_SELECT_RELATED = [
+    "owner",
+    "course_schools",
+    "course_subject",
+    "course_activity",
+    "multisection_request",
+    "crosslisted_request",
+]
+COURSE_PREFETCH_RELATED = ["instructors", "crosslisted"]
+COURSE_SUMMARY_FIELDS = [
+    "course_subject",
+    "course_number",
+    "course_section",
+    "year",
+    "course_term",
+    "course_name",
+]
+
+
+def get_course_relations(relations, prefix=""):
+    return [f"{prefix}{relation}" for relation in relations]
+
+
+def get_sections_prefetch(prefix=""):
+    return Prefetch(
+        f"{prefix}sections", queryset=Course.objects.select_related("course_activity")
+    )
 
 
 class DynamicFieldsModelSerializer(ModelSerializer):
@@ -76,10 +106,18 @@ class CourseSerializer(DynamicFieldsModelSerializer):
         fields = "__all__"
         read_only_fields = ("sections",)
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related(
+            *get_course_relations(COURSE_SELECT_RELATED), "request"
+        ).prefetch_related(
+            *get_course_relations(COURSE_PREFETCH_RELATED), get_sections_prefetch()
+        )
+
     def get_associated_request(self, obj):
         request = obj.get_request()
 
-        return request.course_requested.course_code if request else None
+        return request.pk if request else None
 
     def get_sections(self, obj):
         return [
@@ -100,6 +138,13 @@ class CourseSerializer(DynamicFieldsModelSerializer):
 
         return course
 
+    @staticmethod
+    def resolve_crosslisted_requested(instance):
+        resolve_requested(
+            [instance.course_code]
+            + [course.course_code for course in instance.crosslisted.all()]
+        )
+
     def update(self, instance, validated_data):
         if len(validated_data) == 1 and "crosslisted" in validated_data.keys():
             instance.crosslisted.set(
@@ -114,6 +159,7 @@ class CourseSerializer(DynamicFieldsModelSerializer):
                 new = list(current) + list(crosslistings)
                 course.crosslisted.set(new)
                 course.requested = validated_data.get("requested", instance.requested)
+            self.resolve_crosslisted_requested(instance)
 
             return instance
         else:
@@ -139,6 +185,7 @@ class CourseSerializer(DynamicFieldsModelSerializer):
                 new = list(current) + list(crosslistings)
                 course.crosslisted.set(new)
                 course.requested = validated_data.get("requested", instance.requested)
+            self.resolve_crosslisted_requested(instance)
 
             return instance
 
@@ -250,6 +297,27 @@ class RequestSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Request
         fields = "__all__"
+        read_only_fields = [
+            "migration_progress_id",
+            "migration_state",
+            "migration_completion",
+            "migration_test",
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related(
+            "owner",
+            "canvas_instance",
+            *get_course_relations(COURSE_SELECT_RELATED, "course_requested__"),
+        ).prefetch_related(
+            "additional_enrollments__user",
+            "additional_sections",
+            "canvas_instance__owners",
+            "canvas_instance__added_permissions",
+            *get_course_relations(COURSE_PREFETCH_RELATED, "course_requested__"),
+            get_sections_prefetch("course_requested__"),
+        )
 
     def to_internal_value(self, data):
         def check_for_crf_account(enrollments):
@@ -353,20 +421,53 @@ class RequestSerializer(DynamicFieldsModelSerializer):
                 )
         add_sections_data = validated_data.get("additional_sections")
         c_data = instance.additional_sections.all()
+        removed_sections = list()
         if add_sections_data or instance.additional_sections.all():
             for course in c_data:
                 course.multisection_request = None
                 course.requested = False
                 course.save()
+                removed_sections.append(course.course_code)
             instance.additional_sections.clear()
             for section_data in add_sections_data:
                 section = Course.objects.get(course_code=section_data.course_code)
                 section.multisection_request = instance
                 section.save()
         instance.save()
+        resolve_requested(removed_sections)
         return instance
 
 
+class RequestListSerializer(DynamicFieldsModelSerializer):
+    """
+    The request queue's columns, with only the course fields the list shows.
+    RequestViewSet.list switches to RequestSerializer for ?expand=course_info.
+    """
+
+    owner = ReadOnlyField(source="owner.username")
+    masquerade = ReadOnlyField()
+    course_requested = SlugRelatedField(read_only=True, slug_field="course_code")
+    course_info = CourseSerializer(
+        source="course_requested", read_only=True, fields=COURSE_SUMMARY_FIELDS
+    )
+    created = DateTimeField(format="%I:%M%p %b,%d %Y", read_only=True)
+
+    class Meta:
+        model = Request
+        fields = [
+            "course_info",
+            "owner",
+            "masquerade",
+            "created",
+            "status",
+            "course_requested",
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related("owner", "course_requested__course_subject")
+
+
 class SubjectSerializer(ModelSerializer):
     class Meta:
         model = Subject
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Request
+from .resolvers import resolve_request
+
+
+@receiver(post_save, sender=Request)
+def on_request_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        resolve_request(instance)
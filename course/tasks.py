@@ -1,7 +1,15 @@
-from celery import task
+from contextlib import contextmanager
+
+from celery import chain, chord, task
 from celery.utils.log import get_task_logger
+from django.utils import timezone
 
-from canvas.api import create_canvas_sites
+from canvas.api import (
+    create_canvas_sites,
+    poll_content_migrations,
+    poll_enrollment_imports,
+)
+from canvas.client import get_client_metrics
 from course.management.commands.add_courses import get_open_data_courses
 from course.terms import (
     CURRENT_YEAR_AND_TERM,
@@ -14,9 +22,10 @@ from data_warehouse.data_warehouse import (
     get_data_warehouse_instructors,
     get_data_warehouse_schools,
     get_data_warehouse_subjects,
+    get_session_pool,
 )
 
-from .models import Request
+from .models import Request, UpdateLog
 from .utils import sync_crf_canvas_sites, update_all_users_courses
 
 LOGGER = get_task_logger(__name__)
@@ -30,31 +39,81 @@ def get_args(use_logger: bool, term=None) -> list:
     return args
 
 
+@contextmanager
+def log_stage(stage, term=""):
+    update_log = UpdateLog.objects.create(stage=stage, term=term)
+    try:
+        yield update_log
+    finally:
+        update_log.finished = timezone.now()
+        update_log.save()
+        LOGGER.info(f"FINISHED {update_log} in {update_log.get_duration()}")
+
+
+def is_old_term(term):
+    return any(character.isalpha() for character in term)
+
+
 @task
-def sync_all(terms=TERMS, use_logger=True):
-    if isinstance(terms, str):
-        terms = [terms]
-    for term in terms:
-        old_term = next((character for character in term if character.isalpha()), None)
-        args = get_args(use_logger, term)
-        if old_term:
-            get_open_data_courses(*args)
+def sync_schools_and_subjects():
+    with log_stage("schools_and_subjects"):
         get_data_warehouse_schools()
         get_data_warehouse_subjects()
-        get_data_warehouse_courses(*args)
-        if old_term:
+
+
+@task
+def sync_term_courses(term, use_logger=True, incremental=True):
+    args = get_args(use_logger, term)
+    with log_stage("courses", term):
+        if is_old_term(term):
+            get_open_data_courses(*args)
+        get_data_warehouse_courses(*args, incremental=incremental)
+    if is_old_term(term):
+        with log_stage("instructors", term):
             get_data_warehouse_instructors(*args)
+        with log_stage("canceled_courses", term):
             delete_data_warehouse_canceled_courses(term)
-        sync_crf_canvas_sites(*args)
-    args = get_args(use_logger)
-    update_all_users_courses(*args)
-    delete_canceled_requests()
+
+
+@task
+def sync_term_canvas_sites(term, use_logger=True):
+    with log_stage("canvas_sites", term):
+        sync_crf_canvas_sites(*get_args(use_logger, term))
+
+
+@task
+def finish_sync(use_logger=True, incremental=True):
+    with log_stage("users_courses"):
+        update_all_users_courses(*get_args(use_logger), incremental=incremental)
+    with log_stage("canceled_requests"):
+        delete_canceled_requests()
+    if use_logger:
+        LOGGER.info(f"Data Warehouse session pool: {get_session_pool().metrics()}")
+        LOGGER.info(f"Canvas requests: {get_client_metrics()}")
+
+
+@task
+def sync_all(terms=TERMS, use_logger=True, incremental=True):
+    """
+    Schools and subjects are synced first; then every term's courses and
+    Canvas sites are synced concurrently, and users' Canvas courses and
+    canceled requests are handled once all of those have finished.
+    """
+    if isinstance(terms, str):
+        terms = [terms]
+    term_syncs = [
+        sync_term_courses.si(term, use_logger, incremental) for term in terms
+    ] + [sync_term_canvas_sites.si(term, use_logger) for term in terms]
+    return chain(
+        sync_schools_and_subjects.si(),
+        chord(term_syncs, finish_sync.si(use_logger, incremental)),
+    ).apply_async()
 
 
 @task
 def delete_canceled_requests():
-    for request in Request.objects.filter(status="CANCELED"):
-        request.delete()
+    deleted = Request.objects.filter(status="CANCELED").delete()[1]
+    LOGGER.info(f"Deleted {deleted.get(Request._meta.label, 0)} canceled requests")
 
 
 @task
@@ -62,6 +121,16 @@ def process_approved_sites():
     create_canvas_sites()
 
 
+@task
+def track_content_migrations():
+    poll_content_migrations()
+
+
+@task
+def track_enrollment_imports():
+    poll_enrollment_imports()
+
+
 @task
 def sync_sites():
     sync_crf_canvas_sites(CURRENT_YEAR_AND_TERM)
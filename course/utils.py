@@ -1,15 +1,31 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from logging import getLogger
 from os import mkdir
 from pathlib import Path
 
+from django.db import transaction
 from django.db.models import Q
 
-from canvas.api import get_canvas, get_user_courses
+from canvas.api import (
+    MAIN_ACCOUNT_ID,
+    forget_canvas_user,
+    get_canvas,
+    get_canvas_account,
+    get_canvas_user_id,
+    get_term_id,
+    get_user_courses_by_canvas_id,
+)
 from course.terms import split_year_and_term
 
-from .models import CanvasSite, Request, User
+from .bulk import BULK_BATCH_SIZE, bulk_add_many_to_many, bulk_update, get_batches
+from .models import CanvasSite, Profile, UpdateLog, User
 
 DATA_DIRECTORY_NAME = "data"
+CANVAS_SYNC_WORKERS = 4
+USERS_COURSES_WORKERS = 8
+CANVAS_SITE_FIELDS = ["workflow_state", "sis_course_id", "name"]
 logger = getLogger(__name__)
 
 
@@ -20,63 +36,235 @@ def get_data_directory(data_directory_name):
     return data_directory_parent
 
 
+def get_term_canvas_courses(year_and_term):
+    term_id = get_term_id(MAIN_ACCOUNT_ID, year_and_term)
+    account = get_canvas_account(MAIN_ACCOUNT_ID)
+    if not term_id or not account:
+        return dict()
+    courses = account.get_courses(
+        enrollment_term_id=term_id, state=["all"], per_page=100
+    )
+    return {str(course.id): course for course in courses}
+
+
+def get_canvas_course_or_none(canvas, canvas_id):
+    try:
+        return canvas.get_course(canvas_id)
+    except Exception:
+        return None
+
+
+def get_canvas_courses(canvas_ids, max_workers=CANVAS_SYNC_WORKERS):
+    canvas = get_canvas()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        courses = executor.map(partial(get_canvas_course_or_none, canvas), canvas_ids)
+        return dict(zip(canvas_ids, courses))
+
+
 def sync_crf_canvas_sites(year_and_term, logger=logger):
     year, term = split_year_and_term(year_and_term)
     logger.info(f"Updating site info for {term} courses...")
-    canvas_sites = Request.objects.filter(~Q(canvas_instance__isnull=True)).filter(
-        status="COMPLETED",
-        course_requested__year=year,
-        course_requested__course_term=term,
+    canvas_sites = list(
+        CanvasSite.objects.filter(
+            canvas__status="COMPLETED",
+            canvas__course_requested__year=year,
+            canvas__course_requested__course_term=term,
+        ).distinct()
     )
-    canvas = get_canvas()
-    for canvas_site in canvas_sites:
-        crf_canvas_site = canvas_site.canvas_instance
-        try:
-            site = canvas.get_course(crf_canvas_site.canvas_id)
-            if site.name != crf_canvas_site.name:
-                logger.info(
-                    f"Changing name for {crf_canvas_site.sis_course_id} from"
-                    f" {crf_canvas_site.name} to {site.name}"
-                )
-                crf_canvas_site.name = site.name
-                crf_canvas_site.save()
-            if site.workflow_state != crf_canvas_site.workflow_state:
-                logger.info(
-                    f"Changing workflow_state for {crf_canvas_site.sis_course_id} from"
-                    f" {crf_canvas_site.workflow_state} to {site.workflow_state}"
-                )
-                crf_canvas_site.workflow_state = site.workflow_state
-                crf_canvas_site.save()
-            logger.info(f"SYNCED Canvas site for {crf_canvas_site.sis_course_id}")
-        except Exception:
+    try:
+        canvas_courses = get_term_canvas_courses(year_and_term)
+    except Exception as error:
+        logger.warning(f"Failed to list Canvas courses for {year_and_term} ({error})")
+        canvas_courses = dict()
+    missing = [
+        canvas_site.canvas_id
+        for canvas_site in canvas_sites
+        if canvas_site.canvas_id not in canvas_courses
+    ]
+    if missing:
+        logger.info(f") Fetching {len(missing)} sites not listed for the term...")
+        canvas_courses.update(get_canvas_courses(missing))
+    changed_sites = list()
+    for crf_canvas_site in canvas_sites:
+        site = canvas_courses.get(crf_canvas_site.canvas_id)
+        if not site:
             logger.warning(
                 f"Canvas site {crf_canvas_site.sis_course_id} not found. Removing from"
                 " the CRF..."
             )
-            crf_canvas_site.workflow_state = "deleted"
-            crf_canvas_site.save()
+            name, workflow_state = crf_canvas_site.name, "deleted"
+        else:
+            name, workflow_state = site.name, site.workflow_state
+        if name != crf_canvas_site.name:
+            logger.info(
+                f"Changing name for {crf_canvas_site.sis_course_id} from"
+                f" {crf_canvas_site.name} to {name}"
+            )
+        if workflow_state != crf_canvas_site.workflow_state:
+            logger.info(
+                f"Changing workflow_state for {crf_canvas_site.sis_course_id} from"
+                f" {crf_canvas_site.workflow_state} to {workflow_state}"
+            )
+        if (name, workflow_state) != (
+            crf_canvas_site.name,
+            crf_canvas_site.workflow_state,
+        ):
+            crf_canvas_site.name = name
+            crf_canvas_site.workflow_state = workflow_state
+            changed_sites.append(crf_canvas_site)
+    bulk_update(CanvasSite, changed_sites, ["name", "workflow_state"])
+    logger.info(
+        f"SYNCED {len(canvas_sites)} Canvas sites ({len(changed_sites)} changed)"
+    )
     logger.info("FINISHED")
 
 
-def update_user_courses(penn_key, logger=logger):
-    canvas_courses = get_user_courses(penn_key)
-    for canvas_course in canvas_courses:
-        try:
-            course, created = CanvasSite.objects.update_or_create(
-                canvas_id=str(canvas_course.id),
-                defaults={
-                    "workflow_state": canvas_course.workflow_state,
-                    "sis_course_id": canvas_course.sis_course_id,
-                    "name": canvas_course.name,
-                },
+def get_last_users_courses_sync():
+    update_log = UpdateLog.objects.filter(
+        stage="users_courses", finished__isnull=False
+    ).first()
+    return update_log.created if update_log else None
+
+
+def get_users_to_sync(since=None):
+    users = User.objects.all()
+    if since:
+        users = users.filter(
+            Q(canvas_sites__isnull=False)
+            | Q(courses__isnull=False)
+            | Q(date_joined__gte=since)
+        ).distinct()
+    return list(
+        users.values_list("id", "username", "profile__id", "profile__canvas_id")
+    )
+
+
+def get_canvas_teacher_courses(canvas, username, canvas_user_id=None, logger=logger):
+    try:
+        if canvas_user_id:
+            try:
+                courses = get_user_courses_by_canvas_id(canvas_user_id, canvas)
+                return canvas_user_id, get_canvas_site_values(courses)
+            except Exception:
+                logger.warning(f"- Cached Canvas id for {username} is stale...")
+                forget_canvas_user(username)
+        canvas_user_id = get_canvas_user_id(username)
+        if not canvas_user_id:
+            return None, list()
+        canvas_user_id = str(canvas_user_id)
+        courses = get_user_courses_by_canvas_id(canvas_user_id, canvas)
+        return canvas_user_id, get_canvas_site_values(courses)
+    except Exception as error:
+        logger.error(f"- ERROR: Failed to list Canvas courses for {username} ({error})")
+        return None, None
+
+
+def get_canvas_site_values(canvas_courses):
+    return [
+        {
+            "canvas_id": str(canvas_course.id),
+            "workflow_state": canvas_course.workflow_state,
+            "sis_course_id": canvas_course.sis_course_id,
+            "name": canvas_course.name,
+        }
+        for canvas_course in canvas_courses
+    ]
+
+
+def write_users_courses(users_courses):
+    """
+    Upsert the CanvasSite rows in `users_courses` ({user pk: list of site
+    values}) and add each user as an owner of their sites.
+    """
+    sites = {
+        values["canvas_id"]: values
+        for courses in users_courses.values()
+        for values in courses
+    }
+    existing = CanvasSite.objects.in_bulk(list(sites))
+    new_sites = list()
+    changed_sites = list()
+    for canvas_id, values in sites.items():
+        canvas_site = existing.get(canvas_id)
+        if not canvas_site:
+            new_sites.append(CanvasSite(**values))
+        elif any(
+            getattr(canvas_site, field) != value for field, value in values.items()
+        ):
+            for field, value in values.items():
+                setattr(canvas_site, field, value)
+            changed_sites.append(canvas_site)
+    owners = defaultdict(set)
+    for user_pk, courses in users_courses.items():
+        for values in courses:
+            owners[values["canvas_id"]].add(user_pk)
+    with transaction.atomic():
+        CanvasSite.objects.bulk_create(new_sites, batch_size=BULK_BATCH_SIZE)
+        bulk_update(CanvasSite, changed_sites, CANVAS_SITE_FIELDS)
+        added_owners = bulk_add_many_to_many(CanvasSite, "owners", owners)
+    return len(new_sites), len(changed_sites), added_owners
+
+
+def update_users_courses(users, logger=logger, max_workers=USERS_COURSES_WORKERS):
+    """
+    Import the Canvas sites that `users` ((pk, username, profile pk, cached
+    Canvas id) tuples) teach. Canvas is queried from a bounded pool of
+    workers; the database is written from this thread, one batch at a time.
+    Canvas ids found by login id are kept on the user's Profile so later runs
+    can skip that lookup.
+    """
+    canvas = get_canvas()
+    totals = [0, 0, 0]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch in get_batches(users):
+            results = executor.map(
+                partial(get_canvas_teacher_courses, canvas, logger=logger),
+                [user[1] for user in batch],
+                [user[3] for user in batch],
             )
-            course.owners.add(User.objects.get(username=penn_key))
-            logger.info(f"{'CREATED' if created else 'UPDATED'} {course}.")
-        except Exception as error:
-            logger.error(f"FAILED to add course {canvas_course} ({error}).")
+            users_courses = dict()
+            profiles = list()
+            for user, (canvas_user_id, courses) in zip(batch, results):
+                user_pk, username, profile_pk, cached_id = user
+                if courses is None:
+                    continue
+                users_courses[user_pk] = courses
+                if profile_pk and canvas_user_id and canvas_user_id != cached_id:
+                    profiles.append(Profile(pk=profile_pk, canvas_id=canvas_user_id))
+            try:
+                counts = write_users_courses(users_courses)
+                totals = [total + count for total, count in zip(totals, counts)]
+            except Exception as error:
+                logger.error(f"- ERROR: Failed to write users' Canvas sites ({error})")
+            try:
+                bulk_update(Profile, profiles, ["canvas_id"])
+            except Exception as error:
+                logger.warning(f"- Failed to cache Canvas user ids ({error})")
+    created, updated, added_owners = totals
+    logger.info(
+        f"CREATED {created} and UPDATED {updated} Canvas sites; ADDED"
+        f" {added_owners} owners"
+    )
 
 
-def update_all_users_courses(logger=logger):
-    for user in User.objects.all():
-        logger.info(f") Adding courses for {user.username}...")
-        update_user_courses(user.username, logger=logger)
+def update_user_courses(penn_key, logger=logger):
+    update_users_courses(
+        User.objects.filter(username=penn_key).values_list(
+            "id", "username", "profile__id", "profile__canvas_id"
+        ),
+        logger=logger,
+    )
+
+
+def update_all_users_courses(logger=logger, incremental=True):
+    """
+    With `incremental`, users who owned no Canvas sites and taught no CRF
+    courses as of the last run are skipped, unless they joined since then.
+    """
+    since = get_last_users_courses_sync() if incremental else None
+    users = get_users_to_sync(since)
+    logger.info(
+        f") Adding courses for {len(users)} users"
+        f"{f' (changed since {since})' if since else ''}..."
+    )
+    update_users_courses(users, logger=logger)
@@ -53,12 +53,14 @@ from .models import (
     Subject,
     UpdateLog,
     User,
+    exclude_hidden,
 )
 from .serializers import (
     AutoAddSerializer,
     CanvasSiteSerializer,
     CourseSerializer,
     NoticeSerializer,
+    RequestListSerializer,
     RequestSerializer,
     SchoolSerializer,
     SubjectSerializer,
@@ -96,6 +98,11 @@ def get_search_term(request):
     return search_term
 
 
+def get_expand(request):
+    expand = request.GET.get("expand", "")
+    return {field.strip() for field in expand.split(",") if field.strip()}
+
+
 def emergency_redirect(request):
     return redirect("/")
 
@@ -173,15 +180,11 @@ class CourseViewSet(MixedPermissionModelViewSet, ModelViewSet):
         Course.objects.filter(
             course_term__in=[CURRENT_TERM, NEXT_TERM],
             year=CURRENT_YEAR,
-            course_subject__visible=True,
-            course_schools__visible=True,
         )
         if CURRENT_TERM != FALL
         else Course.objects.filter(
             Q(course_term=NEXT_TERM, year=YEAR_PLUS_ONE)
             | Q(course_term=CURRENT_TERM, year=CURRENT_YEAR),
-            course_subject__visible=True,
-            course_schools__visible=True,
         )
     )
     serializer_class = CourseSerializer
@@ -196,6 +199,11 @@ class CourseViewSet(MixedPermissionModelViewSet, ModelViewSet):
         "delete": [IsAdminUser],
     }
 
+    def get_queryset(self):
+        return CourseSerializer.setup_eager_loading(
+            exclude_hidden(super().get_queryset())
+        )
+
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
@@ -314,14 +322,16 @@ class RequestViewSet(MixedPermissionModelViewSet, ModelViewSet):
         "delete": [IsAdminUser],
     }
 
-    def create(self, request):
-        def update_course(course):
-            course.save()
-            if course.crosslisted:
-                for crosslisted in course.crosslisted.all():
-                    crosslisted.request = course.request
-                    crosslisted.save()
+    def is_expanded(self):
+        return "course_info" in get_expand(self.request)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list" and not self.is_expanded():
+            return RequestListSerializer.setup_eager_loading(queryset)
+        return RequestSerializer.setup_eager_loading(queryset)
+
+    def create(self, request):
         try:
             masquerade = (
                 request.session["on_behalf_of"]
@@ -393,7 +403,6 @@ class RequestViewSet(MixedPermissionModelViewSet, ModelViewSet):
             self.perform_create(serializer)
             headers = self.get_success_headers(serializer.data)
             course = Course.objects.get(course_code=request.data["course_requested"])
-            update_course(course)
             prefix = (
                 f'"{self.request.user.get_username()}" requesting course "{course}"'
             )
@@ -435,9 +444,13 @@ class RequestViewSet(MixedPermissionModelViewSet, ModelViewSet):
         )
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(
+            serializer_class = (
+                RequestSerializer if self.is_expanded() else RequestListSerializer
+            )
+            serializer = serializer_class(
                 page,
                 many=True,
+                context=self.get_serializer_context(),
                 fields=[
                     "course_info",
                     "owner",
@@ -527,8 +540,6 @@ class RequestViewSet(MixedPermissionModelViewSet, ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        course = Course.objects.get(course_code=instance.course_requested)
-        course.save()
         self.perform_destroy(instance)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -784,7 +795,10 @@ class HomePage(UserPassesTestMixin, ModelViewSet):
     login_url = "/accounts/login/"
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = CourseSerializer
-    queryset = Course.objects.filter(course_schools__visible=True)
+    queryset = Course.objects.all()
+
+    def get_queryset(self):
+        return exclude_hidden(super().get_queryset())
 
     def test_func(self):
         user_name = self.request.user.get_username()
@@ -826,8 +840,6 @@ class HomePage(UserPassesTestMixin, ModelViewSet):
         courses = courses.filter(
             Q(course_term=NEXT_TERM, year=NEXT_YEAR)
             | Q(course_term=CURRENT_TERM, year=CURRENT_YEAR),
-            course_subject__visible=True,
-            course_schools__visible=True,
         )
         courses_count = courses.count()
         courses = courses[:15]
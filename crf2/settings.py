@@ -138,6 +138,14 @@ CELERY_BEAT_SCHEDULE = {
         "task": "course.tasks.create_canvas_sites",
         "schedule": crontab(minute="*/20"),
     },
+    "track_content_migrations": {
+        "task": "course.tasks.track_content_migrations",
+        "schedule": crontab(minute="*/2"),
+    },
+    "track_enrollment_imports": {
+        "task": "course.tasks.track_enrollment_imports",
+        "schedule": crontab(minute="*/2"),
+    },
 }
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 CRF_LOGGER = {
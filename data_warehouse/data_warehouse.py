@@ -1,79 +1,128 @@
-from configparser import ConfigParser
+from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime
-from functools import lru_cache
+from datetime import datetime, timedelta
+from hashlib import sha256
+from json import dumps
 from logging import getLogger
 from re import findall, search, sub
+from threading import Lock
 
 from cx_Oracle import connect
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
 
-from config.config import USERNAME
-from course.models import Activity, Course, Profile, School, Subject
+from config.config import (
+    DATA_WAREHOUSE_PASSWORD,
+    DATA_WAREHOUSE_POOL_MAX,
+    DATA_WAREHOUSE_POOL_MIN,
+    DATA_WAREHOUSE_POOL_PING_INTERVAL,
+    DATA_WAREHOUSE_POOL_TIMEOUT,
+    DATA_WAREHOUSE_SERVICE,
+    DATA_WAREHOUSE_USERNAME,
+    USERNAME,
+)
+from course.bulk import (
+    bulk_create_or_get,
+    bulk_set_many_to_many,
+    bulk_update,
+    get_batches,
+)
+from course.models import Activity, Course, Profile, School, SectionWatermark, Subject
+from course.resolvers import (
+    resolve_crosslistings,
+    resolve_sections,
+    resolve_term_crosslistings,
+    resolve_term_sections,
+)
 from course.terms import CURRENT_YEAR_AND_TERM, split_year_and_term
+from data_warehouse.session_pool import SessionPool
 from open_data.open_data import OpenData
 
 logger = getLogger(__name__)
+SESSION_POOL = None
+SESSION_POOL_LOCK = Lock()
 try:
     OWNER = User.objects.get(username=USERNAME)
 except Exception:
     OWNER = User.objects.create(username="admin")
 
 
+def connect_to_data_warehouse():
+    return connect(
+        DATA_WAREHOUSE_USERNAME, DATA_WAREHOUSE_PASSWORD, DATA_WAREHOUSE_SERVICE
+    )
+
+
+def get_session_pool():
+    global SESSION_POOL
+    with SESSION_POOL_LOCK:
+        if SESSION_POOL is None:
+            SESSION_POOL = SessionPool(
+                connect_to_data_warehouse,
+                min_size=DATA_WAREHOUSE_POOL_MIN,
+                max_size=DATA_WAREHOUSE_POOL_MAX,
+                timeout=DATA_WAREHOUSE_POOL_TIMEOUT,
+                ping_interval=DATA_WAREHOUSE_POOL_PING_INTERVAL,
+            )
+        return SESSION_POOL
+
+
 def get_cursor():
-    config = ConfigParser()
-    config.read("config/config.ini")
-    values = dict(config.items("data_warehouse"))
-    connection = connect(values["user"], values["password"], values["service"])
-    return connection.cursor()
+    return get_session_pool().cursor()
 
 
 def get_data_warehouse_schools():
     school_codes = {school.open_data_abbreviation for school in School.objects.all()}
-    cursor = get_cursor()
-    cursor.execute("SELECT legacy_school_code, school_desc_long FROM dwngss.v_school")
-    for abbreviation, name in cursor:
-        if abbreviation not in school_codes:
-            logger.info(f') Creating school "{name}"...')
-            School.objects.create(
-                abbreviation=abbreviation,
-                open_data_abbreviation=abbreviation,
-                name=name,
-            )
+    with get_cursor() as cursor:
+        cursor.execute(
+            "SELECT legacy_school_code, school_desc_long FROM dwngss.v_school"
+        )
+        for abbreviation, name in cursor:
+            if abbreviation not in school_codes:
+                logger.info(f') Creating school "{name}"...')
+                School.objects.create(
+                    abbreviation=abbreviation,
+                    open_data_abbreviation=abbreviation,
+                    name=name,
+                )
 
 
 def get_data_warehouse_school(school_code: str) -> str:
-    cursor = get_cursor()
-    cursor.execute(
-        "SELECT legacy_school_code  FROM dwngss.v_school WHERE school_code ="
-        " :school_code",
-        school_code=school_code,
-    )
-    legacy_school_code = ""
-    for value in cursor:
-        legacy_school_code = next((code for code in value), "")
-    return legacy_school_code
+    with get_cursor() as cursor:
+        cursor.execute(
+            "SELECT legacy_school_code  FROM dwngss.v_school WHERE school_code ="
+            " :school_code",
+            school_code=school_code,
+        )
+        legacy_school_code = ""
+        for value in cursor:
+            legacy_school_code = next((code for code in value), "")
+        return legacy_school_code
 
 
 def get_data_warehouse_subjects():
     subject_codes = {subject.abbreviation for subject in Subject.objects.all()}
-    cursor = get_cursor()
-    cursor.execute(
-        "SELECT subject_code, subject_desc_long, school_code FROM dwngss.v_subject"
-    )
-    for abbreviation, name, school_code in cursor:
-        if abbreviation not in subject_codes:
-            if name is None:
-                name = abbreviation
-            logger.info(f') Creating subject "{name}"...')
-            if school_code is not None:
-                legacy_school_code = get_data_warehouse_school(school_code)
-                school = School.objects.get(open_data_abbreviation=legacy_school_code)
-                Subject.objects.create(
-                    abbreviation=abbreviation, name=name, schools=school
-                )
-            else:
-                Subject.objects.create(abbreviation=abbreviation, name=name)
+    with get_cursor() as cursor:
+        cursor.execute(
+            "SELECT subject_code, subject_desc_long, school_code FROM dwngss.v_subject"
+        )
+        for abbreviation, name, school_code in cursor:
+            if abbreviation not in subject_codes:
+                if name is None:
+                    name = abbreviation
+                logger.info(f') Creating subject "{name}"...')
+                if school_code is not None:
+                    legacy_school_code = get_data_warehouse_school(school_code)
+                    school = School.objects.get(
+                        open_data_abbreviation=legacy_school_code
+                    )
+                    Subject.objects.create(
+                        abbreviation=abbreviation, name=name, schools=school
+                    )
+                else:
+                    Subject.objects.create(abbreviation=abbreviation, name=name)
 
 
 def get_banner_course(srs_course_id, search_term):
@@ -81,26 +130,26 @@ def get_banner_course(srs_course_id, search_term):
     subject = "".join(character for character in srs_course_id if character.isalpha())
     if len(subject) == 3:
         srs_course_id = srs_course_id.replace(subject, f"{subject} ")
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            banner.subject, banner.course_num, banner.section_num, banner.term
-        FROM
-            dwngss.xwalk_crse_number xwalk
-        JOIN
-            dwngss_ps.crse_section banner
-        ON xwalk.ngss_course_id=banner.course_id
-        WHERE
-            srs_course_id = :srs_course_id
-        """,
-        srs_course_id=srs_course_id,
-    )
-    results = list()
-    for subject, course_num, section_num, term in cursor:
-        if not search_term or term[-2:] == search_term:
-            results.append(f"{subject}-{course_num}-{section_num} {term}")
-    return results
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                banner.subject, banner.course_num, banner.section_num, banner.term
+            FROM
+                dwngss.xwalk_crse_number xwalk
+            JOIN
+                dwngss_ps.crse_section banner
+            ON xwalk.ngss_course_id=banner.course_id
+            WHERE
+                srs_course_id = :srs_course_id
+            """,
+            srs_course_id=srs_course_id,
+        )
+        results = list()
+        for subject, course_num, section_num, term in cursor:
+            if not search_term or term[-2:] == search_term:
+                results.append(f"{subject}-{course_num}-{section_num} {term}")
+        return results
 
 
 def capitalize_roman_numerals(title: str) -> str:
@@ -152,108 +201,108 @@ def format_title(title: str) -> str:
 
 
 def get_staff_account(penn_key=None, penn_id=None):
-    cursor = get_cursor()
     if not penn_key and not penn_id:
         logger.warning("Checking Data Warehouse: NO PENNKEY OR PENN ID PROVIDED.")
         return False
-    elif penn_key:
-        logger.info(f"Checking Data Warehouse for pennkey {penn_key}...")
+    with get_cursor() as cursor:
+        if penn_key:
+            logger.info(f"Checking Data Warehouse for pennkey {penn_key}...")
+            cursor.execute(
+                """
+                SELECT
+                    first_name, last_name, email_address, penn_id
+                FROM
+                    employee_general
+                WHERE
+                    pennkey = :pennkey
+                """,
+                pennkey=penn_key,
+            )
+            for first_name, last_name, email, dw_penn_id in cursor:
+                logger.info(
+                    f'FOUND "{penn_key}": {first_name} {last_name} ({dw_penn_id})'
+                    f" {email.strip() if email else email}"
+                )
+                return {
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "email": email,
+                    "penn_id": dw_penn_id,
+                }
+        elif penn_id:
+            logger.info(f"Checking Data Warehouse for penn id {penn_id}...")
+            cursor.execute(
+                """
+                SELECT
+                    first_name, last_name, email_address, pennkey
+                FROM
+                    employee_general
+                WHERE
+                    penn_id = :penn_id
+                """,
+                penn_id=penn_id,
+            )
+            for first_name, last_name, email, penn_key in cursor:
+                logger.info(
+                    f'FOUND "{penn_id}": {first_name} {last_name} ({penn_key})'
+                    f" {email.strip() if email else email}"
+                )
+                return {
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "email": email,
+                    "penn_key": penn_key,
+                }
+
+
+def get_penn_key_from_penn_id(penn_id):
+    with get_cursor() as cursor:
+        logger.info(f"Checking Data Warehouse for penn id {penn_id}...")
         cursor.execute(
             """
             SELECT
-                first_name, last_name, email_address, penn_id
+                first_name, last_name, pennkey
             FROM
                 employee_general
             WHERE
-                pennkey = :pennkey
+                penn_id = :penn_id
             """,
-            pennkey=penn_key,
+            penn_id=penn_id,
         )
-        for first_name, last_name, email, dw_penn_id in cursor:
+        for first_name, last_name, penn_key in cursor:
             logger.info(
-                f'FOUND "{penn_key}": {first_name} {last_name} ({dw_penn_id})'
-                f" {email.strip() if email else email}"
+                f'FOUND PennKey "{penn_key}" for {penn_id} ({first_name} {last_name})'
             )
-            return {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": email,
-                "penn_id": dw_penn_id,
-            }
-    elif penn_id:
-        logger.info(f"Checking Data Warehouse for penn id {penn_id}...")
+            return penn_key
+
+
+def get_student_account(penn_key):
+    with get_cursor() as cursor:
+        logger.info(f"Checking Data Warehouse for pennkey {penn_key}...")
         cursor.execute(
             """
             SELECT
-                first_name, last_name, email_address, pennkey
+                first_name, last_name, email_address, penn_id
             FROM
-                employee_general
+                person_all_v
             WHERE
-                penn_id = :penn_id
+                pennkey = :pennkey
             """,
-            penn_id=penn_id,
+            pennkey=penn_key,
         )
-        for first_name, last_name, email, penn_key in cursor:
+        for first_name, last_name, email, dw_penn_id in cursor:
             logger.info(
-                f'FOUND "{penn_id}": {first_name} {last_name} ({penn_key})'
+                f'FOUND "{penn_key}": {first_name} {last_name} ({dw_penn_id})'
                 f" {email.strip() if email else email}"
             )
             return {
                 "first_name": first_name,
                 "last_name": last_name,
                 "email": email,
-                "penn_key": penn_key,
+                "penn_id": dw_penn_id,
             }
 
 
-def get_penn_key_from_penn_id(penn_id):
-    cursor = get_cursor()
-    logger.info(f"Checking Data Warehouse for penn id {penn_id}...")
-    cursor.execute(
-        """
-        SELECT
-            first_name, last_name, pennkey
-        FROM
-            employee_general
-        WHERE
-            penn_id = :penn_id
-        """,
-        penn_id=penn_id,
-    )
-    for first_name, last_name, penn_key in cursor:
-        logger.info(
-            f'FOUND PennKey "{penn_key}" for {penn_id} ({first_name} {last_name})'
-        )
-        return penn_key
-
-
-def get_student_account(penn_key):
-    cursor = get_cursor()
-    logger.info(f"Checking Data Warehouse for pennkey {penn_key}...")
-    cursor.execute(
-        """
-        SELECT
-            first_name, last_name, email_address, penn_id
-        FROM
-            person_all_v
-        WHERE
-            pennkey = :pennkey
-        """,
-        pennkey=penn_key,
-    )
-    for first_name, last_name, email, dw_penn_id in cursor:
-        logger.info(
-            f'FOUND "{penn_key}": {first_name} {last_name} ({dw_penn_id})'
-            f" {email.strip() if email else email}"
-        )
-        return {
-            "first_name": first_name,
-            "last_name": last_name,
-            "email": email,
-            "penn_id": dw_penn_id,
-        }
-
-
 def get_user_by_pennkey(pennkey):
     if isinstance(pennkey, str):
         pennkey = pennkey.lower()
@@ -279,78 +328,78 @@ def get_user_by_pennkey(pennkey):
 
 
 def get_all_sections_by_subject(subject, term=CURRENT_YEAR_AND_TERM):
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            trim(subject),
-            course_num,
-            section_num,
-            term,
-            schedule_type,
-            school,
-            trim(title),
-            xlist_enrlmt,
-            xlist_family,
-            section_id,
-            section_status
-        FROM
-            dwngss_ps.crse_section
-        WHERE subject = :subject
-        AND term = :term
-        """,
-        subject=subject,
-        term=term,
-    )
-    for course in cursor:
-        print(course)
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                trim(subject),
+                course_num,
+                section_num,
+                term,
+                schedule_type,
+                school,
+                trim(title),
+                xlist_enrlmt,
+                xlist_family,
+                section_id,
+                section_status
+            FROM
+                dwngss_ps.crse_section
+            WHERE subject = :subject
+            AND term = :term
+            """,
+            subject=subject,
+            term=term,
+        )
+        for course in cursor:
+            print(course)
 
 
 def get_banner_sections(subject, course_number, term=CURRENT_YEAR_AND_TERM):
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            section_id || term,
-            trim(subject),
-            primary_subject,
-            course_num,
-            section_num,
-            term,
-            schedule_type,
-            school,
-            trim(title),
-            section_id,
-            primary_section_id || term,
-            section_status
-        FROM
-            dwngss_ps.crse_section
-        WHERE schedule_type NOT IN (
-            'MED',
-            'DIS',
-            'FLD',
-            'F01',
-            'F02',
-            'F03',
-            'F04',
-            'IND',
-            'I01',
-            'I02',
-            'I03',
-            'I04',
-            'MST',
-            'SRT'
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                section_id || term,
+                trim(subject),
+                primary_subject,
+                course_num,
+                section_num,
+                term,
+                schedule_type,
+                school,
+                trim(title),
+                section_id,
+                primary_section_id || term,
+                section_status
+            FROM
+                dwngss_ps.crse_section
+            WHERE schedule_type NOT IN (
+                'MED',
+                'DIS',
+                'FLD',
+                'F01',
+                'F02',
+                'F03',
+                'F04',
+                'IND',
+                'I01',
+                'I02',
+                'I03',
+                'I04',
+                'MST',
+                'SRT'
+            )
+            AND school NOT IN ('W', 'L')
+            AND subject = :subject
+            AND course_num = :course_number
+            AND term = :term
+            """,
+            subject=subject,
+            course_number=course_number,
+            term=term,
         )
-        AND school NOT IN ('W', 'L')
-        AND subject = :subject
-        AND course_num = :course_number
-        AND term = :term
-        """,
-        subject=subject,
-        course_number=course_number,
-        term=term,
-    )
-    return update_or_create_course(cursor)
+        return update_or_create_course(cursor)
 
 
 def get_course(section, term=None):
@@ -365,133 +414,133 @@ def get_course(section, term=None):
     if len(section) > 10:
         term = section[-5:]
         section = section[:-5]
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            cs.section_id || cs.term section,
-            cs.section_id,
-            cs.term,
-            cs.subject_area subject_id,
-            cs.tuition_school school_id,
-            cs.xlist,
-            cs.xlist_primary,
-            cs.activity,
-            cs.section_dept department,
-            cs.section_division division,
-            trim(cs.title) srs_title,
-            cs.status srs_status,
-            cs.schedule_revision,
-            cs.timetable_instructor
-        FROM dwadmin.course_section cs
-        WHERE
-            cs.activity IN (
-                'LEC',
-                'REC',
-                'LAB',
-                'SEM',
-                'CLN',
-                'CRT',
-                'PRE',
-                'STU',
-                'ONL',
-                'HYB'
-            )
-        AND cs.tuition_school NOT IN ('WH', 'LW')
-        AND cs.status in ('O')
-        AND cs.section_id = :section
-        """,
-        section=section,
-    )
-    results = list()
-    for (
-        course_code,
-        section_id,
-        course_term,
-        subject_area,
-        school,
-        xc,
-        xc_code,
-        activity,
-        section_dept,
-        section_division,
-        title,
-        status,
-        rev,
-        instructors,
-    ) in cursor:
-        if not term:
-            results.append(
-                [
-                    course_code,
-                    section_id,
-                    course_term,
-                    subject_area,
-                    school,
-                    xc,
-                    xc_code,
-                    activity,
-                    section_dept,
-                    section_division,
-                    title,
-                    status,
-                    rev,
-                    instructors,
-                ]
-            )
-        elif course_term == term:
-            results.append(
-                [
-                    course_code,
-                    section_id,
-                    course_term,
-                    subject_area,
-                    school,
-                    xc,
-                    xc_code,
-                    activity,
-                    section_dept,
-                    section_division,
-                    title,
-                    status,
-                    rev,
-                    instructors,
-                ]
-            )
-    return results
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                cs.section_id || cs.term section,
+                cs.section_id,
+                cs.term,
+                cs.subject_area subject_id,
+                cs.tuition_school school_id,
+                cs.xlist,
+                cs.xlist_primary,
+                cs.activity,
+                cs.section_dept department,
+                cs.section_division division,
+                trim(cs.title) srs_title,
+                cs.status srs_status,
+                cs.schedule_revision,
+                cs.timetable_instructor
+            FROM dwadmin.course_section cs
+            WHERE
+                cs.activity IN (
+                    'LEC',
+                    'REC',
+                    'LAB',
+                    'SEM',
+                    'CLN',
+                    'CRT',
+                    'PRE',
+                    'STU',
+                    'ONL',
+                    'HYB'
+                )
+            AND cs.tuition_school NOT IN ('WH', 'LW')
+            AND cs.status in ('O')
+            AND cs.section_id = :section
+            """,
+            section=section,
+        )
+        results = list()
+        for (
+            course_code,
+            section_id,
+            course_term,
+            subject_area,
+            school,
+            xc,
+            xc_code,
+            activity,
+            section_dept,
+            section_division,
+            title,
+            status,
+            rev,
+            instructors,
+        ) in cursor:
+            if not term:
+                results.append(
+                    [
+                        course_code,
+                        section_id,
+                        course_term,
+                        subject_area,
+                        school,
+                        xc,
+                        xc_code,
+                        activity,
+                        section_dept,
+                        section_division,
+                        title,
+                        status,
+                        rev,
+                        instructors,
+                    ]
+                )
+            elif course_term == term:
+                results.append(
+                    [
+                        course_code,
+                        section_id,
+                        course_term,
+                        subject_area,
+                        school,
+                        xc,
+                        xc_code,
+                        activity,
+                        section_dept,
+                        section_division,
+                        title,
+                        status,
+                        rev,
+                        instructors,
+                    ]
+                )
+        return results
 
 
 def get_instructor(pennkey, term=CURRENT_YEAR_AND_TERM):
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            e.FIRST_NAME,
-            e.LAST_NAME,
-            e.PENNKEY,
-            e.PENN_ID,
-            e.EMAIL_ADDRESS,
-            cs.Section_Id,
-            cs.term
-        FROM dwadmin.course_section_instructor cs
-        JOIN dwadmin.employee_general_v e
-        ON cs.Instructor_Penn_Id=e.PENN_ID
-        WHERE e.PENNKEY = :pennkey
-        AND cs.term = :term
-        """,
-        pennkey=pennkey,
-        term=term,
-    )
-    for first_name, last_name, pennkey, penn_id, email, section_id, term in cursor:
-        return {
-            "first name": first_name,
-            "last name": last_name,
-            "pennkey": pennkey,
-            "penn id": penn_id,
-            "email": email,
-            "section": section_id,
-            "term": term,
-        }
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                e.FIRST_NAME,
+                e.LAST_NAME,
+                e.PENNKEY,
+                e.PENN_ID,
+                e.EMAIL_ADDRESS,
+                cs.Section_Id,
+                cs.term
+            FROM dwadmin.course_section_instructor cs
+            JOIN dwadmin.employee_general_v e
+            ON cs.Instructor_Penn_Id=e.PENN_ID
+            WHERE e.PENNKEY = :pennkey
+            AND cs.term = :term
+            """,
+            pennkey=pennkey,
+            term=term,
+        )
+        for first_name, last_name, pennkey, penn_id, email, section_id, term in cursor:
+            return {
+                "first name": first_name,
+                "last name": last_name,
+                "pennkey": pennkey,
+                "penn id": penn_id,
+                "email": email,
+                "section": section_id,
+                "term": term,
+            }
 
 
 def pull_srs_courses(cursor, term, open_data):
@@ -526,6 +575,8 @@ def pull_srs_courses(cursor, term, open_data):
         """,
         term=term,
     )
+    reference_data = ReferenceData(open_data)
+    courses = list()
     for (
         course_code,
         term,
@@ -540,57 +591,27 @@ def pull_srs_courses(cursor, term, open_data):
         subject_area = subject_area.replace(" ", "")
         crosslist_code = crosslist_code.replace(" ", "") if crosslist_code else ""
         primary_crosslist = ""
-        try:
-            subject = Subject.objects.get(abbreviation=subject_area)
-        except Exception:
-            try:
-                school_code = open_data.get_school_by_subject(subject_area)
-                school = School.objects.get(open_data_abbreviation=school_code)
-                subject = Subject.objects.create(
-                    abbreviation=subject_area, name=subject_area, schools=school
-                )
-            except Exception as error:
-                subject = ""
-                logger.error(
-                    f"{course_code}: Subject {subject_area} not found ({error})"
-                )
+        subject = reference_data.get_subject(subject_area, course_code)
         if crosslist:
             if crosslist == "S":
                 primary_crosslist = f"{crosslist_code}{term}"
-            p_subj = crosslist_code[:-6]
-            try:
-                primary_subject = Subject.objects.get(abbreviation=p_subj)
-            except Exception:
-                try:
-                    school_code = open_data.get_school_by_subject(p_subj)
-                    school = School.objects.get(open_data_abbreviation=school_code)
-                    primary_subject = Subject.objects.create(
-                        abbreviation=p_subj, name=p_subj, schools=school
-                    )
-                except Exception as error:
-                    primary_subject = ""
-                    logger.error(f"{course_code}: Primary subject not found ({error})")
+            primary_subject = reference_data.get_subject(
+                crosslist_code[:-6], course_code, crosslist=True
+            )
         else:
             primary_subject = subject
         if primary_subject:
             school = primary_subject.schools
         else:
             school = ""
-        try:
-            activity = Activity.objects.get(abbr=activity)
-        except Exception:
-            try:
-                activity = Activity.objects.create(abbr=activity, name=activity)
-            except Exception:
-                activity = ""
-                logger.error(f"{course_code}: Activity not found")
+        activity = reference_data.get_activity(activity, course_code)
         course_number_and_section = course_code[:-5][-6:]
         course_number = course_number_and_section[:3]
         section_number = course_number_and_section[-3:]
         year = term[:4]
         try:
             title = format_title(title) if title else title
-            created = Course.objects.update_or_create(
+            course, created = Course.objects.update_or_create(
                 course_code=course_code,
                 defaults={
                     "owner": OWNER,
@@ -605,7 +626,8 @@ def pull_srs_courses(cursor, term, open_data):
                     "course_name": title,
                     "year": year,
                 },
-            )[1]
+            )
+            courses.append(course)
             logger.info(
                 f"- Added course {course_code}"
                 if created
@@ -615,85 +637,122 @@ def pull_srs_courses(cursor, term, open_data):
             logger.error(
                 f"- ERROR: Failed to add or update course {course_code} ({error})"
             )
+    update_course_relations(courses, logger, {term})
     logger.info("FINISHED")
 
 
-def get_subject_object(subject, course_code, crosslist=False):
-    try:
+class ReferenceData:
+    """
+    Subjects, Schools and Activities for one sync, loaded once.
+
+    Missing Subjects and Activities are created and remembered; the Open Data
+    school lookup used to place a new Subject is only made once per subject.
+    """
+
+    def __init__(self, open_data=None, logger=logger):
+        self.open_data = open_data
+        self.logger = logger
+        self.schools = {
+            school.open_data_abbreviation: school for school in School.objects.all()
+        }
+        self.subjects = {
+            subject.abbreviation: subject
+            for subject in Subject.objects.select_related("schools")
+        }
+        self.activities = {
+            activity.abbr: activity for activity in Activity.objects.all()
+        }
+        self.open_data_schools = dict()
+
+    def get_school_by_subject(self, subject):
+        if subject not in self.open_data_schools:
+            self.open_data = self.open_data or OpenData()
+            try:
+                school_code = self.open_data.get_school_by_subject(subject)
+            except Exception:
+                school_code = None
+            self.open_data_schools[subject] = self.schools.get(school_code)
+        school = self.open_data_schools[subject]
+        if not school:
+            raise School.DoesNotExist(f"No school found for subject {subject}")
+        return school
+
+    def get_subject(self, subject, course_code, crosslist=False):
         if not subject:
             return subject
-        return Subject.objects.get(abbreviation=subject)
-    except Exception:
+        if subject in self.subjects:
+            return self.subjects[subject]
         try:
-            school_code = OpenData().get_school_by_subject(subject)
-            school = School.objects.get(open_data_abbreviation=school_code)
-            return Subject.objects.create(
+            school = self.get_school_by_subject(subject)
+            self.subjects[subject] = Subject.objects.create(
                 abbreviation=subject, name=subject, schools=school
             )
+            return self.subjects[subject]
         except Exception as error:
-            logger.error(
+            self.logger.error(
                 f"{course_code}:"
                 f" {'Primary subject' if crosslist else 'Subject'} {subject} not found"
                 f" ({error})"
             )
             return ""
 
-
-def get_schedule_type_object(schedule_type, course_code):
-    try:
-        return Activity.objects.get(abbr=schedule_type)
-    except Exception:
+    def get_activity(self, activity, course_code):
+        if activity in self.activities:
+            return self.activities[activity]
         try:
-            return Activity.objects.create(abbr=schedule_type, name=schedule_type)
+            self.activities[activity] = Activity.objects.create(
+                abbr=activity, name=activity
+            )
+            return self.activities[activity]
         except Exception:
-            logger.error(f"{course_code}: Activity {schedule_type} not found")
+            self.logger.error(f"{course_code}: Activity {activity} not found")
             return ""
 
 
 def get_instructors(section_id, term):
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            instructor.instructor_first_name,
-            instructor.instructor_last_name,
-            instructor.instructor_penn_id,
-            employee.pennkey,
-            instructor.instructor_email
-        FROM dwngss_ps.crse_sect_instructor instructor
-        JOIN employee_general_v employee
-        ON instructor.instructor_penn_id = employee.penn_id
-        WHERE section_id = :section_id
-        AND term = :term
-        """,
-        section_id=section_id,
-        term=term,
-    )
-    instructors = list()
-    for first_name, last_name, penn_id, penn_key, email in cursor:
-        instructor = Instructor(first_name, last_name, penn_id, penn_key, email)
-        instructors.append(instructor)
-    return instructors
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                instructor.instructor_first_name,
+                instructor.instructor_last_name,
+                instructor.instructor_penn_id,
+                employee.pennkey,
+                instructor.instructor_email
+            FROM dwngss_ps.crse_sect_instructor instructor
+            JOIN employee_general_v employee
+            ON instructor.instructor_penn_id = employee.penn_id
+            WHERE section_id = :section_id
+            AND term = :term
+            """,
+            section_id=section_id,
+            term=term,
+        )
+        instructors = list()
+        for first_name, last_name, penn_id, penn_key, email in cursor:
+            instructor = Instructor(first_name, last_name, penn_id, penn_key, email)
+            instructors.append(instructor)
+        return instructors
 
 
 def get_school_codes_and_descriptions():
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            school_code,
-            legacy_school_code,
-            school_desc_long
-        FROM dwngss.v_school_v
-        """
-    )
-    schools = dict()
-    for school_code, legacy_school_code, school_desc_long in cursor:
-        schools[school_code] = dict()
-        schools[school_code]["school_code"] = school_code
-        schools[school_code]["legacy_school_code"] = legacy_school_code
-        schools[school_code]["school_desc_long"] = school_desc_long
-    return schools
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                school_code,
+                legacy_school_code,
+                school_desc_long
+            FROM dwngss.v_school_v
+            """
+        )
+        schools = dict()
+        for school_code, legacy_school_code, school_desc_long in cursor:
+            schools[school_code] = dict()
+            schools[school_code]["school_code"] = school_code
+            schools[school_code]["legacy_school_code"] = legacy_school_code
+            schools[school_code]["school_desc_long"] = school_desc_long
+        return schools
 
 
 @dataclass(frozen=True)
@@ -705,275 +764,638 @@ class Instructor:
     email: str
 
 
-@lru_cache(maxsize=128)
-def get_instructor_object(instructor: Instructor):
-    try:
-        instructor_object = User.objects.update_or_create(
-            username=instructor.penn_key,
-            defaults={
-                "first_name": instructor.first_name,
-                "last_name": instructor.last_name,
-                "email": instructor.email or "",
-            },
-        )[0]
-        try:
-            Profile.objects.get(user=instructor_object, penn_id=instructor.penn_id)
-        except Exception:
-            Profile.objects.create(user=instructor_object, penn_id=instructor.penn_id)
-        return instructor_object
-    except Exception as error:
-        logger.error(
-            "- ERROR: Failed to create User object for instructor"
-            f" {instructor.first_name} {instructor.last_name} ({instructor.penn_id})"
-            f" -- {error}"
+class InstructorMap:
+    """
+    Users and Profiles for the instructors of one sync, keyed by pennkey.
+
+    `load` reads the existing Users and Profiles of the instructors it is
+    given (by pennkey and penn id, in batches, each only once), then creates
+    the missing ones and updates only the Users whose name or email changed.
+    """
+
+    user_fields = ("first_name", "last_name", "email")
+
+    def __init__(self, logger=logger):
+        self.logger = logger
+        self.users = dict()
+        self.profiles = dict()
+        self.users_with_profiles = set()
+        self.users_by_penn_id = dict()
+        self.loaded_penn_keys = set()
+        self.loaded_penn_ids = set()
+
+    def get_users(self, **filters):
+        return User.objects.filter(**filters).only("id", "username", *self.user_fields)
+
+    def preload(self, instructors):
+        penn_keys = {instructor.penn_key for instructor in instructors}
+        penn_keys -= self.loaded_penn_keys
+        penn_ids = {
+            str(instructor.penn_id) for instructor in instructors if instructor.penn_id
+        }
+        penn_ids -= self.loaded_penn_ids
+        self.loaded_penn_keys.update(penn_keys)
+        self.loaded_penn_ids.update(penn_ids)
+        users = list()
+        for batch in get_batches(penn_keys):
+            users.extend(self.get_users(username__in=batch))
+        profiles = list()
+        for batch in get_batches(penn_ids):
+            profiles.extend(
+                Profile.objects.filter(penn_id__in=batch).values_list(
+                    "penn_id", "user_id"
+                )
+            )
+        for batch in get_batches([user.pk for user in users]):
+            profiles.extend(
+                Profile.objects.filter(user_id__in=batch).values_list(
+                    "penn_id", "user_id"
+                )
+            )
+        users_by_id = {user.pk: user for user in self.users.values()}
+        users_by_id.update({user.pk: user for user in users})
+        missing_user_ids = {user_id for penn_id, user_id in profiles} - set(users_by_id)
+        for batch in get_batches(missing_user_ids):
+            for user in self.get_users(pk__in=batch):
+                users.append(user)
+                users_by_id[user.pk] = user
+        self.users.update({user.username: user for user in users})
+        for penn_id, user_id in profiles:
+            self.profiles[penn_id] = user_id
+            self.users_with_profiles.add(user_id)
+            self.users_by_penn_id[penn_id] = users_by_id.get(user_id)
+
+    def get_user(self, instructor):
+        return self.users.get(instructor.penn_key) or self.users_by_penn_id.get(
+            str(instructor.penn_id)
         )
-        return None
 
+    def get_user_values(self, instructor):
+        return {
+            "first_name": instructor.first_name or "",
+            "last_name": instructor.last_name or "",
+            "email": instructor.email or "",
+        }
 
-def update_or_create_course(cursor):
-    courses_response = list()
-    for (
-        course_code,
-        subject,
-        primary_subject,
-        course_number,
-        section_number,
-        year_and_term,
-        schedule_type,
-        school,
-        title,
-        section_id,
-        primary_section_code,
-        section_status,
-    ) in cursor:
-        response = {
-            "course_code": course_code,
-            "subject": subject,
-            "primary_subject": primary_subject,
-            "course_number": course_number,
-            "section_number": section_number,
-            "year_and_term": year_and_term,
-            "schedule_type": schedule_type,
-            "school": school,
-            "title": title,
-            "section_id": section_id,
-            "primary_section_code": primary_section_code,
-            "section_status": section_status,
+    def load(self, instructors):
+        instructors = {
+            instructor.penn_key: instructor
+            for instructor in instructors
+            if self.has_penn_key(instructor)
         }
-        courses_response.append(response)
-        subject = get_subject_object(subject, course_code)
-        primary_subject = get_subject_object(primary_subject, course_code)
-        year, term = split_year_and_term(year_and_term)
-        schedule_type = get_schedule_type_object(schedule_type, course_code)
-        title = format_title(title)
-        if primary_section_code != course_code:
-            primary_crosslist = primary_section_code
+        self.preload(instructors.values())
+        new_users = list()
+        changed_users = list()
+        for penn_key, instructor in instructors.items():
+            user = self.get_user(instructor)
+            values = self.get_user_values(instructor)
+            if user is None:
+                new_users.append(User(username=penn_key, **values))
+            elif any(getattr(user, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(user, field, value)
+                changed_users.append(user)
+        with transaction.atomic():
+            created_users = bulk_create_or_get(User, new_users, ["username"])
+            bulk_update(User, changed_users, self.user_fields)
+            for batch in get_batches([user.username for user in new_users]):
+                for user in User.objects.filter(username__in=batch):
+                    self.users[user.username] = user
+            new_profiles = self.get_new_profiles(instructors.values())
+            created_profiles = bulk_create_or_get(Profile, new_profiles, ["user_id"])
+        self.logger.info(
+            f"- Created {len(created_users)} and updated {len(changed_users)}"
+            f" instructor accounts; created {len(created_profiles)} profiles"
+        )
+
+    def has_penn_key(self, instructor):
+        if not instructor.penn_key:
+            self.logger.error(
+                "- ERROR: Failed to create User object for instructor"
+                f" {instructor.first_name} {instructor.last_name}"
+                f" ({instructor.penn_id}) -- missing pennkey"
+            )
+        return bool(instructor.penn_key)
+
+    def get_new_profiles(self, instructors):
+        new_profiles = list()
+        for instructor in instructors:
+            user = self.get_user(instructor)
+            penn_id = str(instructor.penn_id) if instructor.penn_id else None
+            if not user or not penn_id or user.pk in self.users_with_profiles:
+                continue
+            if penn_id in self.profiles:
+                self.logger.error(
+                    f"- ERROR: Failed to create Profile for {user.username} (penn id"
+                    f" {penn_id} already belongs to another user)"
+                )
+                continue
+            new_profiles.append(Profile(user=user, penn_id=penn_id))
+            self.profiles[penn_id] = user.pk
+            self.users_by_penn_id[penn_id] = user
+            self.users_with_profiles.add(user.pk)
+        return new_profiles
+
+
+BANNER_SECTION_COLUMNS = (
+    "course_code",
+    "subject",
+    "primary_subject",
+    "course_number",
+    "section_number",
+    "year_and_term",
+    "schedule_type",
+    "school",
+    "title",
+    "section_id",
+    "primary_section_code",
+    "section_status",
+)
+COURSE_SYNC_CHUNK_SIZE = 500
+TERM_INSTRUCTORS_MINIMUM_SECTIONS = 50
+FULL_RECONCILE_INTERVAL = timedelta(days=7)
+COURSE_SYNC_FIELDS = [
+    "course_term",
+    "course_activity",
+    "course_subject",
+    "course_primary_subject",
+    "primary_crosslist",
+    "course_schools",
+    "course_number",
+    "course_section",
+    "course_name",
+    "year",
+]
+
+
+def get_cursor_chunks(cursor, chunk_size=COURSE_SYNC_CHUNK_SIZE):
+    cursor.arraysize = chunk_size
+    rows = cursor.fetchmany(chunk_size)
+    while rows:
+        yield rows
+        rows = cursor.fetchmany(chunk_size)
+
+
+def get_course_values(section, reference_data):
+    course_code = section["course_code"]
+    subject = reference_data.get_subject(section["subject"], course_code)
+    primary_subject = reference_data.get_subject(
+        section["primary_subject"], course_code, crosslist=True
+    )
+    schedule_type = reference_data.get_activity(section["schedule_type"], course_code)
+    if not subject or not schedule_type:
+        return None, None
+    school = primary_subject.schools if primary_subject else subject.schools
+    if not school:
+        logger.error(
+            f"- ERROR: Failed to add or update course {course_code} (school not found)"
+        )
+        return None, None
+    primary_subject = primary_subject or subject
+    primary_crosslist = (
+        section["primary_section_code"]
+        if section["primary_section_code"] != course_code
+        else ""
+    )
+    year, term = split_year_and_term(section["year_and_term"])
+    crf_course_code = Course.get_course_code(
+        subject.abbreviation,
+        section["course_number"],
+        section["section_number"],
+        year,
+        term,
+    )
+    return crf_course_code, {
+        "course_term": term,
+        "course_activity_id": schedule_type.pk,
+        "course_subject_id": subject.pk,
+        "course_primary_subject_id": primary_subject.pk,
+        "primary_crosslist": primary_crosslist,
+        "course_schools_id": school.pk,
+        "course_number": section["course_number"],
+        "course_section": section["section_number"],
+        "course_name": format_title(section["title"]),
+        "year": year,
+    }
+
+
+def bulk_write_courses(course_values, logger=logger):
+    existing_courses = Course.objects.in_bulk(list(course_values))
+    new_courses = list()
+    changed_courses = list()
+    now = timezone.now()
+    for course_code, values in course_values.items():
+        course = existing_courses.get(course_code)
+        if course is None:
+            new_courses.append(Course(course_code=course_code, owner=OWNER, **values))
+            logger.info(f"- Added course {course_code}")
+        elif any(getattr(course, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(course, field, value)
+            course.updated = now
+            changed_courses.append(course)
+            logger.info(f"- Updated course {course_code}")
+    with transaction.atomic():
+        Course.objects.bulk_create(new_courses)
+        bulk_update(Course, changed_courses, COURSE_SYNC_FIELDS + ["updated"])
+    existing_courses.update({course.course_code: course for course in new_courses})
+    return existing_courses, new_courses, changed_courses
+
+
+def get_term_instructors(year_and_term):
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                instructor.section_id,
+                instructor.instructor_first_name,
+                instructor.instructor_last_name,
+                instructor.instructor_penn_id,
+                employee.pennkey,
+                instructor.instructor_email
+            FROM dwngss_ps.crse_sect_instructor instructor
+            JOIN employee_general_v employee
+            ON instructor.instructor_penn_id = employee.penn_id
+            WHERE instructor.term = :term
+            """,
+            term=year_and_term,
+        )
+        instructors = defaultdict(list)
+        for rows in get_cursor_chunks(cursor):
+            for section_id, first_name, last_name, penn_id, penn_key, email in rows:
+                instructor = Instructor(first_name, last_name, penn_id, penn_key, email)
+                instructors[section_id].append(instructor)
+        return instructors
+
+
+def update_course_instructors(courses, logger=logger, term_instructors=None):
+    sections_by_term = defaultdict(dict)
+    for (section_id, year_and_term), course in courses.items():
+        sections_by_term[year_and_term][section_id] = course
+    course_instructors = dict()
+    try:
+        instructor_map = InstructorMap(logger)
+        for year_and_term, sections in sections_by_term.items():
+            if term_instructors and year_and_term in term_instructors:
+                instructors = term_instructors[year_and_term]
+            elif len(sections) >= TERM_INSTRUCTORS_MINIMUM_SECTIONS:
+                logger.info(f") Pulling instructors for {year_and_term}...")
+                instructors = get_term_instructors(year_and_term)
+            else:
+                instructors = {
+                    section_id: get_instructors(section_id, year_and_term)
+                    for section_id in sections
+                }
+            instructor_map.load(
+                instructor
+                for section_id in sections
+                for instructor in instructors.get(section_id, [])
+            )
+            for section_id, course in sections.items():
+                section_instructors = [
+                    instructor_map.get_user(instructor)
+                    for instructor in instructors.get(section_id, [])
+                ]
+                section_instructors = {
+                    instructor.pk for instructor in section_instructors if instructor
+                }
+                if section_instructors:
+                    course_instructors[course.course_code] = section_instructors
+        added, removed = bulk_set_many_to_many(
+            Course, "instructors", course_instructors
+        )
+        logger.info(
+            f"- Updated instructors for {len(course_instructors)} courses ({added}"
+            f" added, {removed} removed)"
+        )
+        return True
+    except Exception as error:
+        message = f"Failed to add new instructor(s) to courses ({error})"
+        logger.error(message)
+        return False
+
+
+def update_course_relations(courses, logger=logger, terms=None):
+    logger.info(f") Updating sections and crosslistings for {len(courses)} courses...")
+    try:
+        if terms:
+            for year_and_term in terms:
+                resolve_term_sections(year_and_term)
         else:
-            primary_crosslist = ""
-        school = primary_subject.schools if primary_subject else subject.schools
-        primary_subject = primary_subject or subject
-        try:
-            course, created = Course.objects.update_or_create(
-                course_code=course_code,
-                defaults={
-                    "owner": OWNER,
-                    "course_term": term,
-                    "course_activity": schedule_type,
-                    "course_subject": subject,
-                    "course_primary_subject": primary_subject,
-                    "primary_crosslist": primary_crosslist,
-                    "course_schools": school,
-                    "course_number": course_number,
-                    "course_section": section_number,
-                    "course_name": title,
-                    "year": year,
-                },
+            resolve_sections(courses)
+    except Exception as error:
+        logger.error(f"- ERROR: Failed to update sections ({error})")
+    try:
+        if terms:
+            for year_and_term in terms:
+                resolve_term_crosslistings(year_and_term)
+        else:
+            resolve_crosslistings(courses)
+    except Exception as error:
+        logger.error(f"- ERROR: Failed to update crosslistings ({error})")
+
+
+class SectionWatermarks:
+    """
+    Content hashes of a term's sections as of the last sync.
+
+    A section is only written again when the hash of its warehouse row and
+    instructors changes, except during a full reconcile, which happens when
+    the term has never been synced or was last reconciled more than
+    FULL_RECONCILE_INTERVAL ago.
+    """
+
+    def __init__(self, year_and_term, logger=logger, instructors=None):
+        self.year_and_term = year_and_term
+        self.logger = logger
+        watermarks = SectionWatermark.objects.filter(year_and_term=year_and_term)
+        self.hashes = dict(watermarks.values_list("course_code", "content_hash"))
+        last_reconciled = watermarks.aggregate(Min("reconciled"))["reconciled__min"]
+        self.full_reconcile = (
+            not last_reconciled
+            or timezone.now() - last_reconciled > FULL_RECONCILE_INTERVAL
+        )
+        self.instructors = (
+            get_term_instructors(year_and_term) if instructors is None else instructors
+        )
+        self.changed = dict()
+        self.seen = set()
+        self.logger.info(
+            f") {'Full' if self.full_reconcile else 'Incremental'} sync of"
+            f" {year_and_term} ({len(self.hashes)} known sections)..."
+        )
+
+    def get_hash(self, section):
+        instructors = sorted(
+            (
+                str(instructor.penn_id),
+                instructor.penn_key or "",
+                instructor.first_name or "",
+                instructor.last_name or "",
+                instructor.email or "",
             )
-            logger.info(
-                f"- Added course {course_code}"
-                if created
-                else f"- Updated course {course_code}"
+            for instructor in self.instructors.get(section["section_id"], [])
+        )
+        content = dumps([section, instructors], sort_keys=True, default=str)
+        return sha256(content.encode()).hexdigest()
+
+    def has_changed(self, section):
+        course_code = section["course_code"]
+        content_hash = self.get_hash(section)
+        self.seen.add(course_code)
+        if not self.full_reconcile and self.hashes.get(course_code) == content_hash:
+            return False
+        self.changed[course_code] = content_hash
+        return True
+
+    def discard(self, course_code):
+        self.changed.pop(course_code, None)
+
+    def save(self):
+        now = timezone.now()
+        new_watermarks = list()
+        changed_watermarks = list()
+        for course_code, content_hash in self.changed.items():
+            watermark = SectionWatermark(
+                course_code=course_code,
+                year_and_term=self.year_and_term,
+                content_hash=content_hash,
+                reconciled=now,
+                updated=now,
             )
-        except Exception as error:
-            course = None
-            logger.error(
-                f"- ERROR: Failed to add or update course {course_code} ({error})"
+            if course_code in self.hashes:
+                changed_watermarks.append(watermark)
+            else:
+                new_watermarks.append(watermark)
+        with transaction.atomic():
+            SectionWatermark.objects.bulk_create(new_watermarks)
+            bulk_update(
+                SectionWatermark,
+                changed_watermarks,
+                ["content_hash", "reconciled", "updated"],
             )
-        if course:
-            try:
-                instructors = get_instructors(section_id, year_and_term)
-                instructors = [
-                    get_instructor_object(instructor) for instructor in instructors
-                ]
-                instructors = [instructor for instructor in instructors if instructor]
-                if instructors:
-                    course.instructors.clear()
-                    for instructor in instructors:
-                        course.instructors.add(instructor)
-                        logger.info(
-                            f"- Updated course {course_code} with instructor:"
-                            f" {instructor.username}"
-                        )
-                    course.save()
-            except Exception as error:
-                message = f"Failed to add new instructor(s) to course ({error})"
-                logger.error(message)
-            course.get_crosslisted()
-        if section_status != "A":
-            delete_data_warehouse_canceled_courses(
-                term, query=False, course=course_code
+            if self.full_reconcile:
+                stale = set(self.hashes) - self.seen
+                for batch in get_batches(stale):
+                    SectionWatermark.objects.filter(course_code__in=batch).delete()
+        self.logger.info(
+            f"- {len(self.changed)} changed and {len(self.seen) - len(self.changed)}"
+            f" unchanged sections in {self.year_and_term}"
+        )
+
+
+def update_or_create_course(cursor, logger=logger, watermarks=None, full_term=False):
+    courses_response = list()
+    added_or_updated = list()
+    section_courses = dict()
+    canceled_courses = list()
+    reference_data = ReferenceData(logger=logger)
+    term_instructors = (
+        {watermarks.year_and_term: watermarks.instructors} if watermarks else None
+    )
+    for rows in get_cursor_chunks(cursor):
+        sections = [dict(zip(BANNER_SECTION_COLUMNS, row)) for row in rows]
+        courses_response.extend(sections)
+        if watermarks:
+            sections = [
+                section for section in sections if watermarks.has_changed(section)
+            ]
+        course_codes = dict()
+        course_values = dict()
+        for section in sections:
+            course_code, values = get_course_values(section, reference_data)
+            if course_code:
+                course_codes[section["course_code"]] = course_code
+                course_values[course_code] = values
+        try:
+            courses, new_courses, changed_courses = bulk_write_courses(
+                course_values, logger
             )
+        except Exception as error:
+            courses, new_courses, changed_courses = dict(), list(), list()
+            logger.error(f"- ERROR: Failed to add or update courses ({error})")
+        added_or_updated.extend(new_courses + changed_courses)
+        for section in sections:
+            course_code = course_codes.get(section["course_code"])
+            course = courses.get(course_code)
+            if course:
+                section_courses[
+                    (section["section_id"], section["year_and_term"])
+                ] = course
+            elif watermarks:
+                watermarks.discard(section["course_code"])
+            if section["section_status"] != "A":
+                term = split_year_and_term(section["year_and_term"])[1]
+                canceled_courses.append((term, course_code or section["course_code"]))
+    instructors_updated = update_course_instructors(
+        section_courses, logger, term_instructors
+    )
+    terms = (
+        {section["year_and_term"] for section in courses_response}
+        if full_term and (not watermarks or watermarks.full_reconcile)
+        else None
+    )
+    update_course_relations(added_or_updated, logger, terms)
+    for term, course_code in canceled_courses:
+        delete_data_warehouse_canceled_courses(term, query=False, course=course_code)
+    if watermarks and instructors_updated:
+        watermarks.save()
     logger.info("FINISHED")
     return courses_response
 
 
-def get_data_warehouse_courses(term=CURRENT_YEAR_AND_TERM, logger=logger):
+def get_data_warehouse_courses(
+    term=CURRENT_YEAR_AND_TERM, logger=logger, incremental=False
+):
     logger.info(") Pulling courses from the Data Warehouse...")
     term = term.upper()
     open_data = OpenData()
-    cursor = get_cursor()
     old_term = next((character for character in term if character.isalpha()), None)
-    if old_term:
-        pull_srs_courses(cursor, term, open_data)
-    else:
-        cursor.execute(
-            """
-            SELECT
-                section_id || term,
-                trim(subject),
-                primary_subject,
-                course_num,
-                section_num,
-                term,
-                schedule_type,
-                school,
-                trim(title),
-                section_id,
-                primary_section_id || term,
-                section_status
-            FROM
-                dwngss_ps.crse_section
-            WHERE schedule_type NOT IN (
-                'MED',
-                'DIS',
-                'FLD',
-                'F01',
-                'F02',
-                'F03',
-                'F04',
-                'IND',
-                'I01',
-                'I02',
-                'I03',
-                'I04',
-                'MST',
-                'SRT'
+    watermarks = (
+        SectionWatermarks(term, logger) if incremental and not old_term else None
+    )
+    with get_cursor() as cursor:
+        if old_term:
+            pull_srs_courses(cursor, term, open_data)
+        else:
+            cursor.execute(
+                """
+                SELECT
+                    section_id || term,
+                    trim(subject),
+                    primary_subject,
+                    course_num,
+                    section_num,
+                    term,
+                    schedule_type,
+                    school,
+                    trim(title),
+                    section_id,
+                    primary_section_id || term,
+                    section_status
+                FROM
+                    dwngss_ps.crse_section
+                WHERE schedule_type NOT IN (
+                    'MED',
+                    'DIS',
+                    'FLD',
+                    'F01',
+                    'F02',
+                    'F03',
+                    'F04',
+                    'IND',
+                    'I01',
+                    'I02',
+                    'I03',
+                    'I04',
+                    'MST',
+                    'SRT'
+                )
+                AND school NOT IN ('W', 'L')
+                AND term = :term
+                """,
+                term=term,
             )
-            AND school NOT IN ('W', 'L')
-            AND term = :term
-            """,
-            term=term,
-        )
-        update_or_create_course(cursor)
+            update_or_create_course(cursor, logger, watermarks, full_term=True)
 
 
 def get_data_warehouse_instructors(term=CURRENT_YEAR_AND_TERM, logger=logger):
     logger.info(") Pulling instructors...")
     term = term.upper()
-    cursor = get_cursor()
-    cursor.execute(
-        """
-        SELECT
-            employee.first_name,
-            employee.last_name,
-            employee.pennkey,
-            employee.penn_id,
-            employee.email_address,
-            instructor.section_id
-        FROM dwadmin.employee_general_v employee
-        INNER JOIN dwadmin.course_section_instructor instructor
-        ON employee.penn_id = instructor.instructor_penn_id
-        AND instructor.term = :term
-        INNER JOIN dwadmin.course_section section
-        ON instructor.section_id = section.section_id
-        WHERE section.activity
-        IN (
-                'LEC',
-                'REC',
-                'LAB',
-                'SEM',
-                'CLN',
-                'CRT',
-                'PRE',
-                'STU',
-                'ONL',
-                'HYB'
-            )
-        AND section.tuition_school NOT IN ('WH', 'LW')
-        AND section.status in ('O')
-        AND section.term = :term
-        """,
-        term=term,
-    )
-    NEW_INSTRUCTOR_VALUES = dict()
-    for first_name, last_name, pennkey, penn_id, email, section_id in cursor:
-        course_code = (section_id + term).replace(" ", "")
-        if not pennkey:
-            message = (
-                f"(section: {section_id}) Failed to create account for"
-                f" {first_name} {last_name} (missing pennkey)"
-            )
-            logger.error(message)
-        else:
-            try:
-                course = Course.objects.get(course_code=course_code)
-                if not course.requested:
-                    error_message = ""
-                    try:
-                        instructor = User.objects.get(username=pennkey)
-                    except Exception:
-                        try:
-                            first_name = first_name.title()
-                            last_name = last_name.title()
-                            instructor = User.objects.create_user(
-                                username=pennkey,
-                                first_name=first_name,
-                                last_name=last_name,
-                                email=email,
-                            )
-                            Profile.objects.create(user=instructor, penn_id=penn_id)
-                        except Exception as error:
-                            error_message = error
-                            instructor = None
-                    if instructor:
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                employee.first_name,
+                employee.last_name,
+                employee.pennkey,
+                employee.penn_id,
+                employee.email_address,
+                instructor.section_id
+            FROM dwadmin.employee_general_v employee
+            INNER JOIN dwadmin.course_section_instructor instructor
+            ON employee.penn_id = instructor.instructor_penn_id
+            AND instructor.term = :term
+            INNER JOIN dwadmin.course_section section
+            ON instructor.section_id = section.section_id
+            WHERE section.activity
+            IN (
+                    'LEC',
+                    'REC',
+                    'LAB',
+                    'SEM',
+                    'CLN',
+                    'CRT',
+                    'PRE',
+                    'STU',
+                    'ONL',
+                    'HYB'
+                )
+            AND section.tuition_school NOT IN ('WH', 'LW')
+            AND section.status in ('O')
+            AND section.term = :term
+            """,
+            term=term,
+        )
+        NEW_INSTRUCTOR_VALUES = dict()
+        for first_name, last_name, pennkey, penn_id, email, section_id in cursor:
+            course_code = (section_id + term).replace(" ", "")
+            if not pennkey:
+                message = (
+                    f"(section: {section_id}) Failed to create account for"
+                    f" {first_name} {last_name} (missing pennkey)"
+                )
+                logger.error(message)
+            else:
+                try:
+                    course = Course.objects.get(course_code=course_code)
+                    if not course.requested:
+                        error_message = ""
                         try:
-                            NEW_INSTRUCTOR_VALUES[course_code].append(instructor)
+                            instructor = User.objects.get(username=pennkey)
                         except Exception:
-                            NEW_INSTRUCTOR_VALUES[course_code] = [instructor]
-                    else:
-                        message = (
-                            f"(section: {section_id}) Failed to create account"
-                            f" for: {first_name} {last_name} ({error_message})"
-                        )
-                        logger.error(message)
-            except Exception:
-                message = f"Failed to find course {course_code}"
+                            try:
+                                first_name = first_name.title()
+                                last_name = last_name.title()
+                                instructor = User.objects.create_user(
+                                    username=pennkey,
+                                    first_name=first_name,
+                                    last_name=last_name,
+                                    email=email,
+                                )
+                                Profile.objects.create(user=instructor, penn_id=penn_id)
+                            except Exception as error:
+                                error_message = error
+                                instructor = None
+                        if instructor:
+                            try:
+                                NEW_INSTRUCTOR_VALUES[course_code].append(instructor)
+                            except Exception:
+                                NEW_INSTRUCTOR_VALUES[course_code] = [instructor]
+                        else:
+                            message = (
+                                f"(section: {section_id}) Failed to create account"
+                                f" for: {first_name} {last_name} ({error_message})"
+                            )
+                            logger.error(message)
+                except Exception:
+                    message = f"Failed to find course {course_code}"
+                    logger.error(message)
+        for course_code, instructors in NEW_INSTRUCTOR_VALUES.items():
+            try:
+                course = Course.objects.get(course_code=course_code)
+                course.instructors.clear()
+                for instructor in instructors:
+                    course.instructors.add(instructor)
+                course.save()
+                logger.info(
+                    f"- Updated course {course_code} with instructors:"
+                    f" {', '.join([instructor.username for instructor in instructors])}"
+                )
+            except Exception as error:
+                message = f"Failed to add new instructor(s) to course ({error})"
                 logger.error(message)
-    for course_code, instructors in NEW_INSTRUCTOR_VALUES.items():
-        try:
-            course = Course.objects.get(course_code=course_code)
-            course.instructors.clear()
-            for instructor in instructors:
-                course.instructors.add(instructor)
-            course.save()
-            logger.info(
-                f"- Updated course {course_code} with instructors:"
-                f" {', '.join([instructor.username for instructor in instructors])}"
-            )
-        except Exception as error:
-            message = f"Failed to add new instructor(s) to course ({error})"
-            logger.error(message)
-    logger.info("FINISHED")
+        logger.info("FINISHED")
 
 
 def delete_canceled_course(course_code, log, logger):
@@ -1018,33 +1440,33 @@ def delete_data_warehouse_canceled_courses(
     with open(log_path, "a") as log:
         log.write(f"-----{start}-----\n")
         if query:
-            cursor = get_cursor()
-            cursor.execute(
-                """
-                SELECT
-                    section_id || term section,
-                    subject_area subject_id,
-                    xlist_primary
-                FROM dwadmin.course_section
-                WHERE activity IN (
-                        'LEC',
-                        'REC',
-                        'LAB',
-                        'SEM',
-                        'CLN',
-                        'CRT',
-                        'PRE',
-                        'STU',
-                        'ONL',
-                        'HYB'
-                    )
-                AND status IN ('X')
-                AND tuition_school NOT IN ('WH', 'LW')
-                AND term = :term
-                """,
-                term=term,
-            )
-            for course_code, term in cursor:
-                delete_canceled_course(course_code, log, logger)
+            with get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT
+                        section_id || term section,
+                        subject_area subject_id,
+                        xlist_primary
+                    FROM dwadmin.course_section
+                    WHERE activity IN (
+                            'LEC',
+                            'REC',
+                            'LAB',
+                            'SEM',
+                            'CLN',
+                            'CRT',
+                            'PRE',
+                            'STU',
+                            'ONL',
+                            'HYB'
+                        )
+                    AND status IN ('X')
+                    AND tuition_school NOT IN ('WH', 'LW')
+                    AND term = :term
+                    """,
+                    term=term,
+                )
+                for course_code, term in cursor:
+                    delete_canceled_course(course_code, log, logger)
         elif course:
             delete_canceled_course(course, log, logger)
@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+from logging import getLogger
+from threading import Condition
+from time import monotonic
+
+logger = getLogger(__name__)
+
+
+class SessionPool:
+    """
+    Process-wide pool of long-lived database connections.
+
+    `connect` is any callable returning a DB-API connection (cx_Oracle's
+    `connect` in production). Idle connections that have not been used for
+    `ping_interval` seconds are pinged before being handed out again, and
+    broken ones are replaced transparently.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=4, timeout=30, ping_interval=60):
+        if min_size > max_size:
+            raise ValueError("min_size cannot be greater than max_size")
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.idle = list()
+        self.busy = 0
+        self.condition = Condition()
+        self.counters = {
+            "created": 0,
+            "acquired": 0,
+            "released": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "peak_busy": 0,
+        }
+        for _ in range(min_size):
+            self.idle.append((self.create_connection(), monotonic()))
+
+    @property
+    def size(self):
+        return len(self.idle) + self.busy
+
+    def create_connection(self):
+        connection = self.connect()
+        self.counters["created"] += 1
+        return connection
+
+    def close_connection(self, connection):
+        self.counters["discarded"] += 1
+        try:
+            connection.close()
+        except Exception as error:
+            logger.warning(f"- Failed to close pooled connection ({error})")
+
+    @staticmethod
+    def is_healthy(connection):
+        try:
+            connection.ping()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = monotonic() + timeout
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise TimeoutError(
+                        f"Timed out after {timeout}s waiting for a pooled connection"
+                        f" ({self.busy}/{self.max_size} busy)"
+                    )
+                self.condition.wait(remaining)
+            connection, last_used = self.idle.pop() if self.idle else (None, None)
+            self.busy += 1
+            self.counters["acquired"] += 1
+            self.counters["peak_busy"] = max(self.counters["peak_busy"], self.busy)
+        try:
+            if connection is None:
+                connection = self.create_connection()
+            elif monotonic() - last_used > self.ping_interval and not self.is_healthy(
+                connection
+            ):
+                logger.warning("- Replacing unhealthy pooled connection...")
+                self.close_connection(connection)
+                connection = self.create_connection()
+        except Exception:
+            with self.condition:
+                self.busy -= 1
+                self.condition.notify()
+            raise
+        return connection
+
+    def release(self, connection, discard=False):
+        with self.condition:
+            self.busy -= 1
+            self.counters["released"] += 1
+            if discard:
+                self.close_connection(connection)
+            else:
+                self.idle.append((connection, monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def cursor(self, timeout=None):
+        connection = self.acquire(timeout)
+        discard = False
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            yield cursor
+        except Exception:
+            discard = not self.is_healthy(connection)
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    discard = discard or not self.is_healthy(connection)
+            self.release(connection, discard=discard)
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                connection = self.idle.pop()[0]
+                self.close_connection(connection)
+
+    def metrics(self):
+        with self.condition:
+            return {
+                "size": self.size,
+                "busy": self.busy,
+                "idle": len(self.idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self.counters,
+            }
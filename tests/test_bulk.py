@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from course.bulk import bulk_add_many_to_many, bulk_update
+from course.models import CanvasSite, School, Subject, User
+
+
+class BulkTest(TestCase):
+    def setUp(self):
+        School.objects.create(name="School", abbreviation="SCH")
+        for abbreviation in ["ONE", "TWO", "THREE"]:
+            Subject.objects.create(name=abbreviation, abbreviation=abbreviation)
+
+    def test_bulk_update(self):
+        school = School.objects.get(abbreviation="SCH")
+        subjects = list(Subject.objects.exclude(abbreviation="THREE"))
+        for subject in subjects:
+            subject.name = f"{subject.abbreviation} (updated)"
+            subject.schools = school
+        with self.assertNumQueries(1):
+            updated = bulk_update(Subject, subjects, ["name", "schools"], batch_size=5)
+        self.assertEqual(updated, 2)
+        for subject in Subject.objects.exclude(abbreviation="THREE"):
+            self.assertEqual(subject.name, f"{subject.abbreviation} (updated)")
+            self.assertEqual(subject.schools, school)
+        untouched = Subject.objects.get(abbreviation="THREE")
+        self.assertEqual(untouched.name, "THREE")
+        self.assertIsNone(untouched.schools)
+
+    def test_bulk_add_many_to_many(self):
+        first_user = User.objects.create(username="first")
+        second_user = User.objects.create(username="second")
+        canvas_site = CanvasSite.objects.create(
+            canvas_id="1", name="Site", workflow_state="available"
+        )
+        canvas_site.owners.add(first_user)
+        added = bulk_add_many_to_many(
+            CanvasSite, "owners", {canvas_site.pk: {second_user.pk}}
+        )
+        self.assertEqual(added, 1)
+        self.assertEqual(
+            set(canvas_site.owners.values_list("username", flat=True)),
+            {"first", "second"},
+        )
+        self.assertEqual(
+            bulk_add_many_to_many(
+                CanvasSite, "owners", {canvas_site.pk: {second_user.pk}}
+            ),
+            0,
+        )
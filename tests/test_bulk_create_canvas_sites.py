@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from canvasapi.exceptions import CanvasException
+from django.test import TestCase
+
+from canvas.bulk_create_canvas_sites import (
+    create_bulk_creation_run,
+    enable_tools_for_sites,
+    get_provisioning_report,
+    process_bulk_creation_run,
+    resume_bulk_creation_run,
+    should_request,
+)
+from course.models import Activity, BulkCreationItem, Course, School, Subject, User
+
+
+class BulkCreationRunTest(TestCase):
+    def setUp(self):
+        school = School.objects.create(name="School", abbreviation="SCH")
+        subject = Subject.objects.create(name="Subject", abbreviation="SUBJ")
+        activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        owner = User.objects.create(username="owner")
+        courses = [
+            Course.objects.create(
+                course_subject=subject,
+                course_primary_subject=subject,
+                course_number=course_number,
+                course_section="001",
+                year="2022",
+                course_term="10",
+                course_activity=activity,
+                course_schools=school,
+                owner=owner,
+            )
+            for course_number in ["100", "200"]
+        ]
+        self.run = create_bulk_creation_run(
+            courses, "202210", "SCH", False, False, [], False, False, True
+        )
+
+    def test_resume_retries_failed_items(self):
+        failed = (BulkCreationItem.FAILED, None, "Request incomplete.")
+        completed = (BulkCreationItem.COMPLETED, "1", "")
+        with patch(
+            "canvas.bulk_create_canvas_sites.create_item_site",
+            side_effect=[completed, failed],
+        ):
+            process_bulk_creation_run(self.run)
+        self.run.refresh_from_db()
+        self.assertIsNone(self.run.finished)
+        with patch(
+            "canvas.bulk_create_canvas_sites.create_item_site",
+            return_value=completed,
+        ) as create_item_site:
+            run = resume_bulk_creation_run()
+        self.assertEqual(run, self.run)
+        self.assertEqual(create_item_site.call_count, 1)
+        self.assertEqual(create_item_site.call_args[0][1].index, 1)
+        self.run.refresh_from_db()
+        self.assertIsNotNone(self.run.finished)
+        self.assertFalse(
+            self.run.items.exclude(state=BulkCreationItem.COMPLETED).exists()
+        )
+
+    def test_process_enables_tools(self):
+        self.run.tools = '["Zoom", "Panopto"]'
+        self.run.save()
+        completed = (BulkCreationItem.COMPLETED, "1", "")
+        failed = (BulkCreationItem.FAILED, None, "Request incomplete.")
+        with patch(
+            "canvas.bulk_create_canvas_sites.create_item_site",
+            side_effect=[completed, failed],
+        ), patch(
+            "canvas.bulk_create_canvas_sites.enable_tools_for_sites",
+            return_value={"1": {"Zoom": "enabled", "Panopto": "not found"}},
+        ) as enable_tools_for_sites:
+            process_bulk_creation_run(self.run)
+        enable_tools_for_sites.assert_called_once_with(
+            ["1"], ["Zoom", "Panopto"], False, True
+        )
+        self.assertEqual(
+            list(self.run.items.values_list("notes", flat=True)),
+            ["Zoom: enabled, Panopto: not found", "Request incomplete."],
+        )
+
+
+class StandInTab:
+    def __init__(self, label, visibility):
+        self.label = label
+        self.id = label.lower()
+        self.visibility = visibility
+        self.updates = list()
+
+    def update(self, **kwargs):
+        self.updates.append(kwargs)
+        self.visibility = "public"
+
+
+class StandInCanvasCourse:
+    tab_listings = list()
+
+    def __init__(self, requester, attributes):
+        self.id = attributes["id"]
+
+    def get_tabs(self):
+        self.tab_listings.append(self.id)
+        return [StandInTab("Zoom", "none"), StandInTab("Panopto", "public")]
+
+
+class EnableToolsTest(TestCase):
+    def test_enable_tools_for_sites(self):
+        StandInCanvasCourse.tab_listings = list()
+        canvas = SimpleNamespace(_Canvas__requester=None)
+        with patch(
+            "canvas.bulk_create_canvas_sites.get_canvas", return_value=canvas
+        ), patch("canvas.bulk_create_canvas_sites.CanvasCourse", StandInCanvasCourse):
+            results = enable_tools_for_sites(
+                ["1", "2", "3"], ["Zoom", "Panopto", "Missing"], max_workers=2
+            )
+        self.assertEqual(sorted(StandInCanvasCourse.tab_listings), ["1", "2", "3"])
+        self.assertEqual(
+            results,
+            {
+                canvas_id: {
+                    "Zoom": "enabled",
+                    "Panopto": "already enabled",
+                    "Missing": "not found",
+                }
+                for canvas_id in ["1", "2", "3"]
+            },
+        )
+
+
+class StandInResponse:
+    def __init__(self, data=None, content=b""):
+        self.data = data
+        self.content = content
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+class StandInSession:
+    def __init__(self, content):
+        self.content = content
+        self.urls = list()
+
+    def get(self, url):
+        self.urls.append(url)
+        return StandInResponse(content=self.content)
+
+
+class StandInRequester:
+    def __init__(self, report, content):
+        self.report = report
+        self._session = StandInSession(content)
+        self.parameters = list()
+
+    def request(self, method, path, _kwargs=None):
+        self.parameters.append(dict(_kwargs or []))
+        return StandInResponse(self.report)
+
+
+class StandInCanvas:
+    def __init__(self, section_ids):
+        self.section_ids = section_ids
+
+    def get_section(self, section_id, use_sis_id=False):
+        if section_id not in self.section_ids:
+            raise CanvasException("Not Found")
+        return SimpleNamespace(sis_section_id=section_id)
+
+
+class SiteIndexTest(TestCase):
+    def test_get_provisioning_report(self):
+        report = {
+            "id": 1,
+            "status": "complete",
+            "attachment": {"url": "https://canvas.example.edu/files/1/download"},
+        }
+        requester = StandInRequester(report, b"section_id,name\nSRS_1,One\n")
+        account = SimpleNamespace(id=1, _requester=requester)
+        rows = list(get_provisioning_report(account))
+        self.assertEqual([row["section_id"] for row in rows], ["SRS_1"])
+        self.assertNotIn("parameters[enrollment_term_id]", requester.parameters[0])
+        self.assertEqual(
+            requester._session.urls, ["https://canvas.example.edu/files/1/download"]
+        )
+
+    def test_should_request(self):
+        canvas = StandInCanvas({"SRS_MOVED"})
+        site_index = {"SRS_INDEXED"}
+        with patch("canvas.bulk_create_canvas_sites.get_canvas", return_value=canvas):
+            self.assertFalse(should_request("SRS_INDEXED", site_index=site_index))
+            self.assertTrue(should_request("SRS_MOVED", site_index=site_index))
+            self.assertFalse(should_request("SRS_MOVED"))
+            self.assertTrue(should_request("SRS_NEW"))
@@ -1,16 +1,25 @@
 from datetime import datetime
+from threading import BoundedSemaphore, Lock
+from time import sleep
+from types import SimpleNamespace
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 
 from canvas.api import (
     MAIN_ACCOUNT_ID,
+    claim_request,
+    create_canvas_sites,
     create_canvas_user,
     get_canvas_account,
+    get_in_flight_migrations,
     get_term_id,
     get_user_by_sis,
     get_user_courses,
+    is_zoom_event,
 )
 from config.config import USERNAME
+from course.models import Activity, CanvasSite, Course, Request, School, Subject, User
 
 
 class CanvasAPITest(TestCase):
@@ -45,3 +54,139 @@ class CanvasAPITest(TestCase):
         none_term_id = get_term_id(self.none_account_id, year_and_term)
         self.assertTrue(term_id)
         self.assertIsNone(none_term_id)
+
+    def test_is_zoom_event(self):
+        zoom_event = SimpleNamespace(
+            location_name=None, description="Join on Zoom", title="Lecture"
+        )
+        other_event = SimpleNamespace(
+            location_name="Room 101", description=None, title="Lecture"
+        )
+        self.assertTrue(is_zoom_event(zoom_event))
+        self.assertFalse(is_zoom_event(other_event))
+
+    def test_get_in_flight_migrations(self):
+        school = School.objects.create(name="School", abbreviation="SCH")
+        subject = Subject.objects.create(name="Subject", abbreviation="SUBJ")
+        activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        owner = User.objects.create(username="owner")
+        for course_number, migration_test in [("100", False), ("200", True)]:
+            course = Course.objects.create(
+                course_subject=subject,
+                course_primary_subject=subject,
+                course_number=course_number,
+                course_section="001",
+                year="2022",
+                course_term="10",
+                course_activity=activity,
+                course_schools=school,
+                owner=owner,
+            )
+            Request.objects.create(
+                course_requested=course,
+                owner=owner,
+                canvas_instance=CanvasSite.objects.create(
+                    canvas_id=course_number, name="Site", workflow_state="unpublished"
+                ),
+                migration_progress_id=course_number,
+                migration_state="running",
+                migration_test=migration_test,
+            )
+        self.assertEqual(
+            [
+                request.migration_progress_id
+                for request in get_in_flight_migrations(False)
+            ],
+            ["100"],
+        )
+        self.assertEqual(
+            [
+                request.migration_progress_id
+                for request in get_in_flight_migrations(True)
+            ],
+            ["200"],
+        )
+
+
+class ProvisioningTest(TransactionTestCase):
+    # Requests are claimed from worker threads, which only see committed rows.
+
+    def setUp(self):
+        school = School.objects.create(name="School", abbreviation="SCH")
+        subject = Subject.objects.create(name="Subject", abbreviation="SUBJ")
+        activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        owner = User.objects.create(username="owner")
+        self.requests = [
+            Request.objects.create(
+                course_requested=Course.objects.create(
+                    course_subject=subject,
+                    course_primary_subject=subject,
+                    course_number=course_number,
+                    course_section="001",
+                    year="2022",
+                    course_term="10",
+                    course_activity=activity,
+                    course_schools=school,
+                    owner=owner,
+                ),
+                owner=owner,
+                status=status,
+            )
+            for course_number, status in [("100", "APPROVED"), ("200", "SUBMITTED")]
+        ]
+
+    def test_create_canvas_sites_without_requests(self):
+        with patch("canvas.api.create_canvas_site") as create_canvas_site:
+            for requested_courses in [False, []]:
+                self.assertIsNone(create_canvas_sites(requested_courses))
+        create_canvas_site.assert_not_called()
+
+    def test_claim_request(self):
+        approved = self.requests[0]
+        stale = Request.objects.get(pk=approved.pk)
+        self.assertTrue(claim_request(approved))
+        self.assertEqual(approved.status, "IN_PROCESS")
+        self.assertFalse(claim_request(stale))
+        self.assertEqual(Request.objects.get(pk=approved.pk).status, "IN_PROCESS")
+
+    def test_create_canvas_sites_skips_unclaimed(self):
+        approved, submitted = self.requests
+        with patch(
+            "canvas.api.create_canvas_site", return_value=False
+        ) as create_canvas_site, self.assertLogs("canvas.api", "WARNING") as logs:
+            create_canvas_sites(
+                [approved, submitted, Request.objects.get(pk=approved.pk)],
+                max_workers=1,
+                enrollment_mode="",
+            )
+        self.assertEqual(
+            [call[0][0].pk for call in create_canvas_site.call_args_list],
+            [approved.pk],
+        )
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("status SUBMITTED", logs.output[0])
+        self.assertIn("status IN_PROCESS", logs.output[1])
+
+    def test_create_canvas_sites_provisioning_slots(self):
+        lock = Lock()
+        provisioning = list()
+        most_provisioning = list()
+
+        def create_canvas_site(request, sections, test, enrollments):
+            with lock:
+                provisioning.append(request)
+                most_provisioning.append(len(provisioning))
+            sleep(0.05)
+            with lock:
+                provisioning.remove(request)
+            return False
+
+        requests = [SimpleNamespace(pk=index) for index in range(6)]
+        with patch("canvas.api.claim_request", return_value=True), patch(
+            "canvas.api.create_canvas_site", create_canvas_site
+        ), patch("canvas.api.PROVISIONING_SLOTS", BoundedSemaphore(2)):
+            self.assertFalse(
+                create_canvas_sites(requests, max_workers=6, enrollment_mode="")
+            )
+        self.assertEqual(len(most_provisioning), 6)
+        self.assertEqual(max(most_provisioning), 2)
@@ -0,0 +1,76 @@
+from django.test import TestCase
+
+from canvas.client import (
+    get_client,
+    get_client_metrics,
+    get_rate_limit_remaining,
+    get_throttle_hook,
+    is_throttled,
+)
+
+
+class StandInRequest:
+    method = "GET"
+    url = "https://canvas.example.edu/api/v1/courses/1"
+
+
+class StandInResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or dict()
+        self.request = StandInRequest()
+
+    def close(self):
+        pass
+
+
+class StandInSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = 0
+
+    def get_adapter(self, url):
+        return self
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        return self.responses.pop(0)
+
+
+class CanvasClientTest(TestCase):
+    def test_get_client(self):
+        canvas = get_client("client-test", "https://canvas.example.edu", "key")
+        self.assertIs(
+            get_client("client-test", "https://canvas.example.edu", "key"), canvas
+        )
+        session = canvas._Canvas__requester._session
+        retry = session.get_adapter("https://").max_retries
+        self.assertEqual(retry.total, 5)
+        self.assertEqual(retry.status, 5)
+        self.assertEqual(retry.connect, 1)
+        self.assertEqual(retry.read, 0)
+
+    def test_is_throttled(self):
+        self.assertTrue(is_throttled(StandInResponse(429)))
+        self.assertTrue(is_throttled(StandInResponse(403, b"403 Rate Limit Exceeded")))
+        self.assertFalse(is_throttled(StandInResponse(403, b"unauthorized")))
+        self.assertFalse(is_throttled(StandInResponse(200)))
+
+    def test_get_rate_limit_remaining(self):
+        response = StandInResponse(200, headers={"X-Rate-Limit-Remaining": "42.5"})
+        self.assertEqual(get_rate_limit_remaining(response), 42.5)
+        self.assertIsNone(get_rate_limit_remaining(StandInResponse(200)))
+
+    def test_throttle_hook_resends(self):
+        success = StandInResponse(200, headers={"X-Rate-Limit-Remaining": "700"})
+        session = StandInSession(
+            [StandInResponse(429, headers={"Retry-After": "0"}), success]
+        )
+        throttled = get_client_metrics().get("throttled", 0)
+        response = get_throttle_hook(session)(
+            StandInResponse(429, headers={"Retry-After": "0"})
+        )
+        self.assertIs(response, success)
+        self.assertEqual(session.sent, 2)
+        self.assertEqual(get_client_metrics()["throttled"], throttled + 2)
@@ -1,18 +1,37 @@
 from os import remove
 from pathlib import Path
+from unittest.mock import patch
 
 from django.test import TestCase
 
 from config.config import EMAIL, USERNAME
-from course.models import User
+from course.models import (
+    Activity,
+    Course,
+    Profile,
+    School,
+    SectionWatermark,
+    Subject,
+    User,
+)
 from course.terms import CURRENT_YEAR_AND_TERM
 from data_warehouse.data_warehouse import (
+    TERM_INSTRUCTORS_MINIMUM_SECTIONS,
+    Instructor,
+    InstructorMap,
+    ReferenceData,
+    SectionWatermarks,
     delete_data_warehouse_canceled_courses,
     format_title,
     get_course,
+    get_cursor_chunks,
     get_instructor,
     get_staff_account,
+    get_term_instructors,
     get_user_by_pennkey,
+    pull_srs_courses,
+    update_course_instructors,
+    update_or_create_course,
 )
 from open_data.open_data import OpenData
 
@@ -71,3 +90,350 @@ class DataWarehouseTest(TestCase):
             lines = log.readlines()
             self.assertIsNotNone(lines)
         remove(log_path)
+
+
+class InstructorMapTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(
+            username="existing", first_name="Old", last_name="Name", email=EMAIL
+        )
+        Profile.objects.create(user=user, penn_id="1")
+        User.objects.create(username="unchanged", first_name="Same", last_name="Name")
+
+    def test_load(self):
+        instructors = [
+            Instructor("New", "Name", "1", "existing", EMAIL),
+            Instructor("Same", "Name", "2", "unchanged", None),
+            Instructor("Brand", "New", "3", "new", None),
+            Instructor("No", "Pennkey", "4", None, None),
+        ]
+        instructor_map = InstructorMap()
+        instructor_map.load(instructors)
+        existing = User.objects.get(username="existing")
+        self.assertEqual(existing.first_name, "New")
+        self.assertEqual(instructor_map.get_user(instructors[0]), existing)
+        new = User.objects.get(username="new")
+        self.assertEqual(new.profile.penn_id, "3")
+        self.assertEqual(User.objects.get(username="unchanged").profile.penn_id, "2")
+        self.assertIsNone(instructor_map.get_user(instructors[3]))
+        self.assertFalse(Profile.objects.filter(penn_id="4").exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(instructor_map.get_user(instructors[2]), new)
+
+    def test_load_queries(self):
+        for index in range(20):
+            User.objects.create(username=f"unrelated{index}")
+        instructors = [
+            Instructor("New", "Name", "1", "existing", EMAIL),
+            Instructor("Same", "Name", "2", "unchanged", None),
+        ]
+        with self.assertNumQueries(0):
+            instructor_map = InstructorMap()
+        instructor_map.preload(instructors)
+        self.assertEqual(set(instructor_map.users), {"existing", "unchanged"})
+        self.assertEqual(
+            instructor_map.profiles, {"1": instructor_map.users["existing"].pk}
+        )
+        with self.assertNumQueries(0):
+            instructor_map.preload(instructors)
+
+    def test_load_concurrent_insert(self):
+        instructors = [
+            Instructor("Brand", "New", "3", "new", None),
+            Instructor("Other", "New", "5", "other", None),
+        ]
+        instructor_map = InstructorMap()
+        instructor_map.preload(instructors)
+        other_sync = User.objects.create(username="new")
+        Profile.objects.create(user=other_sync, penn_id="3")
+        instructor_map.load(instructors)
+        self.assertEqual(
+            instructor_map.get_user(Instructor("", "", "3", "new", "")), other_sync
+        )
+        self.assertEqual(User.objects.filter(username="new").count(), 1)
+        self.assertEqual(User.objects.get(username="other").profile.penn_id, "5")
+
+
+class PullSRSCoursesTest(TestCase):
+    class StandInCursor:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def execute(self, query, **parameters):
+            pass
+
+        def __iter__(self):
+            return iter(self.rows)
+
+    def setUp(self):
+        school = School.objects.create(
+            name="School", abbreviation="SCH", open_data_abbreviation="AS"
+        )
+        Subject.objects.create(name="Subject", abbreviation="SUBJ", schools=school)
+        Activity.objects.create(name="Lecture", abbr="LEC")
+        Activity.objects.create(name="Recitation", abbr="REC")
+
+    def test_pull_srs_courses_resolves_sections(self):
+        rows = [
+            ("SUBJ 100001 2019A", "2019A", "SUBJ", "AS", None, None, "LEC", "Title"),
+            ("SUBJ 100201 2019A", "2019A", "SUBJ", "AS", None, None, "REC", "Title"),
+        ]
+        pull_srs_courses(self.StandInCursor(rows), "2019A", None)
+        lecture = Course.objects.get(course_code="SUBJ1000012019A")
+        recitation = Course.objects.get(course_code="SUBJ1002012019A")
+        self.assertEqual(list(lecture.sections.all()), [recitation])
+
+
+class StandInCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.arraysize = 1
+        self.executions = list()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, **parameters):
+        self.executions.append(parameters)
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class UpdateOrCreateCourseTest(TestCase):
+    year_and_term = "202210"
+
+    def setUp(self):
+        school = School.objects.create(
+            name="School", abbreviation="SCH", open_data_abbreviation="AS"
+        )
+        self.subject = Subject.objects.create(
+            name="Subject", abbreviation="SUBJ", schools=school
+        )
+        self.activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        self.owner = User.objects.create(username="owner")
+        self.old_instructor = User.objects.create(username="old")
+        for course_number, title in [("101", "Old Title"), ("102", "Same Title")]:
+            course = self.create_course(course_number, title)
+            course.instructors.add(self.old_instructor)
+
+    def create_course(self, course_number, title):
+        return Course.objects.create(
+            course_subject=self.subject,
+            course_primary_subject=self.subject,
+            course_number=course_number,
+            course_section="001",
+            year="2022",
+            course_term="10",
+            course_activity=self.activity,
+            course_schools=self.subject.schools,
+            course_name=title,
+            owner=self.owner,
+        )
+
+    def get_row(self, course_number, title):
+        return (
+            f"SUBJ{course_number}001{self.year_and_term}",
+            "SUBJ",
+            "SUBJ",
+            course_number,
+            "001",
+            self.year_and_term,
+            "LEC",
+            "AS",
+            title,
+            course_number,
+            f"SUBJ{course_number}001{self.year_and_term}",
+            "A",
+        )
+
+    def get_instructors(self, section_id, term):
+        return [Instructor("First", "Last", section_id, f"teacher{section_id}", "")]
+
+    def test_update_or_create_course(self):
+        rows = [
+            self.get_row(course_number, title)
+            for course_number, title in [
+                ("100", "New Title"),
+                ("101", "New Title"),
+                ("102", "Same Title"),
+                ("103", "New Title"),
+                ("104", "New Title"),
+            ]
+        ]
+        unchanged = Course.objects.get(course_number="102")
+        with patch(
+            "data_warehouse.data_warehouse.get_cursor_chunks",
+            lambda cursor: get_cursor_chunks(cursor, 2),
+        ), patch("data_warehouse.data_warehouse.get_instructors", self.get_instructors):
+            sections = update_or_create_course(StandInCursor(rows))
+        self.assertEqual(len(sections), 5)
+        courses = {course.course_number: course for course in Course.objects.all()}
+        self.assertEqual(set(courses), {"100", "101", "102", "103", "104"})
+        self.assertEqual(courses["100"].course_code, f"SUBJ100001{self.year_and_term}")
+        self.assertEqual(courses["101"].course_name, format_title("New Title"))
+        self.assertEqual(courses["104"].course_name, format_title("New Title"))
+        self.assertEqual(courses["102"].updated, unchanged.updated)
+        for course_number, course in courses.items():
+            self.assertEqual(
+                [instructor.username for instructor in course.instructors.all()],
+                [f"teacher{course_number}"],
+            )
+        self.assertFalse(self.old_instructor.courses.exists())
+
+
+class TermInstructorsTest(TestCase):
+    year_and_term = "202210"
+
+    def setUp(self):
+        school = School.objects.create(name="School", abbreviation="SCH")
+        subject = Subject.objects.create(
+            name="Subject", abbreviation="SUBJ", schools=school
+        )
+        activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        owner = User.objects.create(username="owner")
+        self.courses = {
+            (str(index), self.year_and_term): Course.objects.create(
+                course_subject=subject,
+                course_primary_subject=subject,
+                course_number=str(100 + index),
+                course_section="001",
+                year="2022",
+                course_term="10",
+                course_activity=activity,
+                course_schools=school,
+                owner=owner,
+            )
+            for index in range(TERM_INSTRUCTORS_MINIMUM_SECTIONS)
+        }
+
+    def test_get_term_instructors(self):
+        rows = [
+            (section_id, "First", "Last", penn_id, f"teacher{penn_id}", "")
+            for section_id, penn_id in [("1", "10"), ("1", "11"), ("2", "10")]
+        ]
+        cursor = StandInCursor(rows)
+        with patch("data_warehouse.data_warehouse.get_cursor", lambda: cursor):
+            instructors = get_term_instructors(self.year_and_term)
+        self.assertEqual(cursor.executions, [{"term": self.year_and_term}])
+        self.assertEqual(
+            {
+                section_id: [instructor.penn_key for instructor in section]
+                for section_id, section in instructors.items()
+            },
+            {"1": ["teacher10", "teacher11"], "2": ["teacher10"]},
+        )
+
+    def update_course_instructors(self, courses):
+        section_calls = list()
+        term_calls = list()
+        instructor = Instructor("First", "Last", "10", "teacher10", "")
+
+        def get_section_instructors(section_id, term):
+            section_calls.append(section_id)
+            return [instructor]
+
+        def get_all_term_instructors(year_and_term):
+            term_calls.append(year_and_term)
+            return {section_id: [instructor] for section_id, term in courses}
+
+        with patch(
+            "data_warehouse.data_warehouse.get_instructors", get_section_instructors
+        ), patch(
+            "data_warehouse.data_warehouse.get_term_instructors",
+            get_all_term_instructors,
+        ):
+            self.assertTrue(update_course_instructors(courses))
+        return section_calls, term_calls
+
+    def test_update_course_instructors_by_term(self):
+        section_calls, term_calls = self.update_course_instructors(self.courses)
+        self.assertEqual(section_calls, [])
+        self.assertEqual(term_calls, [self.year_and_term])
+        self.assertEqual(
+            User.objects.get(username="teacher10").courses.count(), len(self.courses)
+        )
+
+    def test_update_course_instructors_by_section(self):
+        courses = dict(list(self.courses.items())[:2])
+        section_calls, term_calls = self.update_course_instructors(courses)
+        self.assertEqual(sorted(section_calls), ["0", "1"])
+        self.assertEqual(term_calls, [])
+        self.assertEqual(User.objects.get(username="teacher10").courses.count(), 2)
+
+
+class SectionWatermarksTest(TestCase):
+    year_and_term = "202210"
+
+    def sync(self, section):
+        watermarks = SectionWatermarks(self.year_and_term, instructors=dict())
+        changed = watermarks.has_changed(section)
+        watermarks.save()
+        return watermarks, changed
+
+    def test_save(self):
+        section = {"course_code": "SUBJ100001", "section_id": "1", "title": "Old"}
+        watermarks, changed = self.sync(section)
+        self.assertTrue(watermarks.full_reconcile)
+        self.assertTrue(changed)
+        first_hash = SectionWatermark.objects.get(course_code="SUBJ100001").content_hash
+        watermarks, changed = self.sync(section)
+        self.assertFalse(watermarks.full_reconcile)
+        self.assertFalse(changed)
+        section["title"] = "New"
+        watermarks, changed = self.sync(section)
+        self.assertTrue(changed)
+        watermark = SectionWatermark.objects.get(course_code="SUBJ100001")
+        self.assertNotEqual(watermark.content_hash, first_hash)
+        self.assertIsNotNone(watermark.updated)
+
+
+class ReferenceDataTest(TestCase):
+    class StandInOpenData:
+        def __init__(self):
+            self.calls = 0
+
+        def get_school_by_subject(self, subject):
+            self.calls += 1
+            if subject == "UNKN":
+                raise IndexError("list index out of range")
+            return "AS"
+
+    def setUp(self):
+        school = School.objects.create(
+            name="School", abbreviation="SCH", open_data_abbreviation="AS"
+        )
+        Subject.objects.create(name="Subject", abbreviation="SUBJ", schools=school)
+        Activity.objects.create(name="Lecture", abbr="LEC")
+        self.open_data = self.StandInOpenData()
+        self.reference_data = ReferenceData(self.open_data)
+
+    def test_get_existing(self):
+        with self.assertNumQueries(0):
+            subject = self.reference_data.get_subject("SUBJ", "SUBJ1000012022A")
+            self.assertEqual(subject.schools.abbreviation, "SCH")
+            activity = self.reference_data.get_activity("LEC", "SUBJ1000012022A")
+            self.assertEqual(activity.name, "Lecture")
+        self.assertEqual(self.open_data.calls, 0)
+
+    def test_get_new(self):
+        subject = self.reference_data.get_subject("NEW", "NEW1000012022A")
+        self.assertEqual(subject, Subject.objects.get(abbreviation="NEW"))
+        self.assertEqual(subject.schools.abbreviation, "SCH")
+        activity = self.reference_data.get_activity("SEM", "NEW1000012022A")
+        self.assertEqual(activity, Activity.objects.get(abbr="SEM"))
+        with self.assertNumQueries(0):
+            self.reference_data.get_subject("NEW", "NEW1000022022A")
+            self.reference_data.get_activity("SEM", "NEW1000022022A")
+
+    def test_get_unknown_subject(self):
+        for _ in range(3):
+            self.assertEqual(
+                self.reference_data.get_subject("UNKN", "UNKN1000012022A"), ""
+            )
+        self.assertEqual(self.open_data.calls, 1)
+        self.assertFalse(Subject.objects.filter(abbreviation="UNKN").exists())
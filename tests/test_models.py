@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from config.config import USERNAME
 from course.models import (
@@ -11,6 +13,8 @@ from course.models import (
     School,
     Subject,
     User,
+    get_hidden_schools,
+    get_hidden_subjects,
 )
 from course.terms import CURRENT_YEAR, get_current_term
 
@@ -217,6 +221,22 @@ class SchoolTest(TestCase):
         self.assertFalse(school.visible)
         self.assertFalse(subject.visible)
 
+    def test_save_unchanged_visibility(self):
+        school = School.objects.get(name=SCHOOL_NAME)
+        school.name = "Renamed"
+        with CaptureQueriesContext(connection) as queries:
+            school.save()
+        self.assertEqual(len(queries), 1)
+
+    def test_hidden_schools_and_subjects(self):
+        school = School.objects.get(name=SCHOOL_NAME)
+        self.assertEqual(get_hidden_schools(), set())
+        self.assertEqual(get_hidden_subjects(), set())
+        school.visible = False
+        school.save()
+        self.assertEqual(get_hidden_schools(), {SCHOOL_ABBREVIATION})
+        self.assertEqual(get_hidden_subjects(), {SCHOOL_ABBREVIATION})
+
 
 class SubjectTest(TestCase):
     def setUp(self):
@@ -0,0 +1,200 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from course.models import Activity, Course, Request, School, Subject, User
+from course.resolvers import (
+    resolve_crosslistings,
+    resolve_requested,
+    resolve_sections,
+    resolve_term_crosslistings,
+    resolve_term_sections,
+)
+
+YEAR = "2022"
+TERM = "10"
+
+
+class ResolversTest(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="School", abbreviation="SCH")
+        self.subject = Subject.objects.create(name="Subject", abbreviation="SUBJ")
+        self.activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        self.owner = User.objects.create(username="owner")
+
+    def create_course(
+        self, course_section, course_number="100", subject=None, primary_crosslist=""
+    ):
+        return Course.objects.create(
+            course_subject=subject or self.subject,
+            course_primary_subject=self.subject,
+            primary_crosslist=primary_crosslist,
+            course_number=course_number,
+            course_section=course_section,
+            year=YEAR,
+            course_term=TERM,
+            course_activity=self.activity,
+            course_schools=self.school,
+            owner=self.owner,
+        )
+
+    def get_requested(self, course):
+        return Course.objects.get(course_code=course.course_code).requested
+
+    def test_save_is_single_update(self):
+        course = self.create_course("001")
+        course.course_name = "Course"
+        with CaptureQueriesContext(connection) as queries:
+            course.save()
+        self.assertEqual(len(queries), 1)
+
+    def test_request_signals(self):
+        course = self.create_course("001")
+        crosslisted = self.create_course("002")
+        course.crosslisted.add(crosslisted)
+        request = Request.objects.create(course_requested=course, owner=self.owner)
+        self.assertTrue(self.get_requested(course))
+        self.assertTrue(self.get_requested(crosslisted))
+        crosslisted = Course.objects.get(course_code=crosslisted.course_code)
+        self.assertEqual(crosslisted.crosslisted_request, request)
+        Request.objects.filter(pk=request.pk).delete()
+        self.assertFalse(self.get_requested(course))
+        self.assertFalse(self.get_requested(crosslisted))
+
+    def test_resolve_request_crosslisted_sibling(self):
+        course = self.create_course("001")
+        sibling = self.create_course("002")
+        other_course = self.create_course("003")
+        claimed_sibling = self.create_course("004")
+        course.crosslisted.add(sibling, claimed_sibling)
+        other_request = Request.objects.create(
+            course_requested=other_course, owner=self.owner
+        )
+        Course.objects.filter(course_code=claimed_sibling.course_code).update(
+            crosslisted_request=other_request
+        )
+        request = Request.objects.create(course_requested=course, owner=self.owner)
+        sibling = Course.objects.get(course_code=sibling.course_code)
+        claimed_sibling = Course.objects.get(course_code=claimed_sibling.course_code)
+        self.assertEqual(sibling.crosslisted_request, request)
+        self.assertTrue(sibling.requested)
+        self.assertEqual(sibling.get_request(), request)
+        self.assertEqual(claimed_sibling.crosslisted_request, other_request)
+
+    def test_resolve_requested(self):
+        course = self.create_course("001")
+        Course.objects.filter(course_code=course.course_code).update(
+            requested_override=True
+        )
+        resolve_requested([course.course_code])
+        self.assertTrue(self.get_requested(course))
+        Course.objects.filter(course_code=course.course_code).update(
+            requested_override=False
+        )
+        resolve_requested([course.course_code])
+        self.assertFalse(self.get_requested(course))
+
+    def test_resolve_sections(self):
+        lecture = self.create_course("001")
+        recitation = self.create_course("201")
+        independent_study = self.create_course("301")
+        other = self.create_course("001", course_number="200")
+        resolve_sections([lecture])
+        self.assertEqual(list(lecture.sections.all()), [recitation])
+        self.assertEqual(list(recitation.sections.all()), [lecture])
+        self.assertFalse(independent_study.sections.exists())
+        self.assertFalse(other.sections.exists())
+
+    def test_resolve_term_sections(self):
+        lecture = self.create_course("001")
+        recitation = self.create_course("201")
+        lab = self.create_course("401")
+        independent_study = self.create_course("301")
+        other = self.create_course("001", course_number="200")
+        lecture.sections.add(independent_study)
+        with CaptureQueriesContext(connection) as queries:
+            resolve_term_sections(f"{YEAR}{TERM}")
+        resolved_queries = len(queries)
+        self.assertEqual(set(lecture.sections.all()), {recitation, lab})
+        self.assertEqual(set(lab.sections.all()), {lecture, recitation})
+        self.assertFalse(independent_study.sections.exists())
+        self.assertFalse(other.sections.exists())
+        for course_number in range(500, 520):
+            self.create_course("001", course_number=str(course_number))
+            self.create_course("201", course_number=str(course_number))
+        with CaptureQueriesContext(connection) as queries:
+            resolve_term_sections(f"{YEAR}{TERM}")
+        self.assertLessEqual(len(queries), resolved_queries)
+
+    def test_find_sections(self):
+        lecture = self.create_course("001")
+        recitation = self.create_course("201")
+        independent_study = self.create_course("301")
+        self.create_course("302")
+        self.assertEqual(lecture.find_sections(), [recitation])
+        self.assertEqual(independent_study.find_sections(), [])
+
+    def test_resolve_term_crosslistings(self):
+        other_subject = Subject.objects.create(name="Other", abbreviation="OTHR")
+        primary = self.create_course("001")
+        same_primary_subject = self.create_course("001", subject=other_subject)
+        primary_crosslist = self.create_course(
+            "001", course_number="200", primary_crosslist="SUBJ100001"
+        )
+        crosslisted = self.create_course("001", course_number="300")
+        primary_crosslist.crosslisted.add(crosslisted)
+        alone = self.create_course("001", course_number="400")
+        alone.crosslisted.add(alone)
+        resolve_term_crosslistings(f"{YEAR}{TERM}")
+        family = {primary, same_primary_subject, primary_crosslist, crosslisted}
+        for course in family:
+            self.assertEqual(set(course.crosslisted.all()), family - {course})
+        self.assertFalse(alone.crosslisted.exists())
+
+    def test_resolve_crosslistings(self):
+        other_subject = Subject.objects.create(name="Other", abbreviation="OTHR")
+        primary = self.create_course("001")
+        same_primary_subject = self.create_course("001", subject=other_subject)
+        primary_crosslist = self.create_course(
+            "001", course_number="200", primary_crosslist="SUBJ100001"
+        )
+        untouched = self.create_course("001", course_number="400")
+        untouched.crosslisted.add(untouched)
+        resolve_crosslistings([primary])
+        family = {primary, same_primary_subject, primary_crosslist}
+        for course in family:
+            self.assertEqual(set(course.crosslisted.all()), family - {course})
+        self.assertEqual(list(untouched.crosslisted.all()), [untouched])
+
+    def create_requests(self, start, total, status="CANCELED"):
+        for course_number in range(start, start + total):
+            course = self.create_course("001", course_number=str(course_number))
+            section = self.create_course("201", course_number=str(course_number))
+            request = Request.objects.create(
+                course_requested=course, owner=self.owner, status=status
+            )
+            section.multisection_request = request
+            section.save()
+
+    def delete_canceled_requests(self):
+        with CaptureQueriesContext(connection) as queries:
+            Request.objects.filter(status="CANCELED").delete()
+        return len(queries)
+
+    def test_delete_requests(self):
+        self.create_requests(100, 2)
+        self.create_requests(200, 1, status="SUBMITTED")
+        few_queries = self.delete_canceled_requests()
+        self.assertEqual(Request.objects.count(), 1)
+        self.assertEqual(
+            set(Course.objects.filter(requested=True).values_list("course_number")),
+            {("200",)},
+        )
+        self.assertFalse(
+            Course.objects.filter(multisection_request__isnull=False)
+            .exclude(course_number="200")
+            .exists()
+        )
+        self.create_requests(300, 20)
+        self.assertEqual(self.delete_canceled_requests(), few_queries)
+        self.assertEqual(Course.objects.filter(requested=True).count(), 2)
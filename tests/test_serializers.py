@@ -0,0 +1,129 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from course.models import Activity, Course, Request, School, Subject, User
+from course.serializers import (
+    CourseSerializer,
+    RequestListSerializer,
+    RequestSerializer,
+)
+
+YEAR = "2022"
+TERM = "10"
+
+
+class SerializerTest(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="School", abbreviation="SCH")
+        self.subject = Subject.objects.create(name="Subject", abbreviation="SUBJ")
+        self.lecture = Activity.objects.create(name="Lecture", abbr="LEC")
+        self.recitation = Activity.objects.create(name="Recitation", abbr="REC")
+        self.owner = User.objects.create(username="owner")
+
+    def create_course(self, course_number, course_section, activity):
+        return Course.objects.create(
+            course_subject=self.subject,
+            course_primary_subject=self.subject,
+            course_number=course_number,
+            course_section=course_section,
+            year=YEAR,
+            course_term=TERM,
+            course_activity=activity,
+            course_schools=self.school,
+            owner=self.owner,
+        )
+
+    def create_courses(self, start, total):
+        for course_number in range(start, start + total):
+            course = self.create_course(str(course_number), "001", self.lecture)
+            section = self.create_course(str(course_number), "201", self.recitation)
+            course.sections.add(section)
+            course.crosslisted.add(section)
+            course.instructors.add(
+                User.objects.create(username=f"instructor{course_number}")
+            )
+            Request.objects.create(course_requested=course, owner=self.owner)
+            section.multisection_request = course.request
+            section.save()
+
+
+class CourseSerializerTest(SerializerTest):
+    def serialize_courses(self):
+        courses = CourseSerializer.setup_eager_loading(Course.objects.all())
+        with CaptureQueriesContext(connection) as queries:
+            data = CourseSerializer(courses, many=True).data
+        return data, len(queries)
+
+    def test_setup_eager_loading_query_count_is_constant(self):
+        self.create_courses(100, 2)
+        few_courses, few_queries = self.serialize_courses()
+        self.create_courses(200, 13)
+        many_courses, many_queries = self.serialize_courses()
+        self.assertEqual(len(few_courses), 4)
+        self.assertEqual(len(many_courses), 30)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_update_crosslisted_resolves_requested(self):
+        course = self.create_course("100", "001", self.lecture)
+        crosslisted = self.create_course("100", "002", self.lecture)
+        Course.objects.filter(pk=course.pk).update(requested=True)
+        CourseSerializer().update(
+            Course.objects.get(pk=course.pk), {"crosslisted": [crosslisted]}
+        )
+        self.assertFalse(Course.objects.get(pk=course.pk).requested)
+        self.assertEqual(list(course.crosslisted.all()), [crosslisted])
+
+    def test_associated_request(self):
+        self.create_courses(100, 1)
+        data, queries = self.serialize_courses()
+        courses = {course["course_code"]: course for course in data}
+        course_code = f"SUBJ100001{YEAR}{TERM}"
+        section_code = f"SUBJ100201{YEAR}{TERM}"
+        self.assertEqual(courses[course_code]["associated_request"], course_code)
+        self.assertEqual(courses[section_code]["associated_request"], course_code)
+        self.assertEqual(
+            courses[course_code]["sections"], [(section_code, "REC", True)]
+        )
+
+
+class RequestSerializerTest(SerializerTest):
+    def serialize_requests(self, serializer_class):
+        requests = serializer_class.setup_eager_loading(Request.objects.all())
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer_class(requests, many=True).data
+        return data, len(queries)
+
+    def assert_query_count_is_constant(self, serializer_class):
+        self.create_courses(100, 2)
+        few_requests, few_queries = self.serialize_requests(serializer_class)
+        self.create_courses(200, 13)
+        many_requests, many_queries = self.serialize_requests(serializer_class)
+        self.assertEqual(len(few_requests), 2)
+        self.assertEqual(len(many_requests), 15)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.assert_query_count_is_constant(RequestListSerializer)
+
+    def test_detail_query_count_is_constant(self):
+        self.assert_query_count_is_constant(RequestSerializer)
+
+    def test_update_resolves_removed_sections(self):
+        self.create_courses(100, 1)
+        request = Request.objects.get()
+        requested_section = self.create_course("100", "202", self.recitation)
+        Request.objects.create(course_requested=requested_section, owner=self.owner)
+        requested_section.multisection_request = request
+        requested_section.save()
+        RequestSerializer().update(request, {"additional_sections": []})
+        section = Course.objects.get(course_code=f"SUBJ100201{YEAR}{TERM}")
+        self.assertFalse(section.requested)
+        self.assertTrue(Course.objects.get(pk=requested_section.pk).requested)
+
+    def test_list_course_info(self):
+        self.create_courses(100, 1)
+        data, queries = self.serialize_requests(RequestListSerializer)
+        self.assertEqual(data[0]["course_requested"], f"SUBJ100001{YEAR}{TERM}")
+        self.assertEqual(data[0]["course_info"]["course_number"], "100")
+        self.assertEqual(data[0]["owner"], "owner")
@@ -0,0 +1,102 @@
+from django.test import TestCase
+
+from data_warehouse.session_pool import SessionPool
+
+
+class StandInCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.closed = False
+
+    def execute(self, statement, **parameters):
+        if not self.connection.healthy:
+            raise ConnectionError("connection lost")
+
+    def close(self):
+        self.closed = True
+
+
+class StandInConnection:
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+        self.pings = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def ping(self):
+        self.pings += 1
+        if not self.healthy:
+            raise ConnectionError("connection lost")
+
+    def close(self):
+        self.closed = True
+
+
+class SessionPoolTest(TestCase):
+    def get_pool(self, **kwargs):
+        self.connections = list()
+
+        def connect():
+            connection = StandInConnection()
+            self.connections.append(connection)
+            return connection
+
+        return SessionPool(connect, **kwargs)
+
+    def test_min_size(self):
+        pool = self.get_pool(min_size=2, max_size=3)
+        metrics = pool.metrics()
+        self.assertEqual(metrics["size"], 2)
+        self.assertEqual(metrics["idle"], 2)
+        self.assertEqual(metrics["created"], 2)
+        self.assertRaises(ValueError, self.get_pool, min_size=3, max_size=2)
+
+    def test_cursor_reuses_connection(self):
+        pool = self.get_pool(min_size=1, max_size=2)
+        for _ in range(5):
+            with pool.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM dual")
+                self.assertEqual(pool.metrics()["busy"], 1)
+            self.assertTrue(cursor.closed)
+        metrics = pool.metrics()
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(metrics["acquired"], 5)
+        self.assertEqual(metrics["released"], 5)
+        self.assertEqual(metrics["busy"], 0)
+
+    def test_acquire_timeout(self):
+        pool = self.get_pool(min_size=0, max_size=1)
+        connection = pool.acquire()
+        self.assertRaises(TimeoutError, pool.acquire, 0)
+        self.assertEqual(pool.metrics()["timeouts"], 1)
+        pool.release(connection)
+        self.assertIs(pool.acquire(0), connection)
+
+    def test_unhealthy_connection_is_replaced(self):
+        pool = self.get_pool(min_size=1, max_size=1, ping_interval=0)
+        stale_connection = self.connections[0]
+        stale_connection.healthy = False
+        with pool.cursor() as cursor:
+            self.assertIsNot(cursor.connection, stale_connection)
+        self.assertTrue(stale_connection.closed)
+        self.assertEqual(pool.metrics()["discarded"], 1)
+
+    def test_broken_connection_is_discarded(self):
+        pool = self.get_pool(min_size=1, max_size=1)
+        connection = self.connections[0]
+        with self.assertRaises(ConnectionError):
+            with pool.cursor() as cursor:
+                connection.healthy = False
+                cursor.execute("SELECT 1 FROM dual")
+        metrics = pool.metrics()
+        self.assertTrue(connection.closed)
+        self.assertEqual(metrics["size"], 0)
+        self.assertEqual(metrics["busy"], 0)
+
+    def test_close(self):
+        pool = self.get_pool(min_size=2, max_size=2)
+        pool.close()
+        self.assertTrue(all(connection.closed for connection in self.connections))
+        self.assertEqual(pool.metrics()["idle"], 0)
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+from zipfile import ZipFile
+
+from django.test import TestCase
+
+from canvas.sis_import import EnrollmentBatch, poll_enrollment_import
+from course.models import EnrollmentImport, Profile, User
+
+
+class StandInAccount:
+    def __init__(self, sis_import):
+        self.sis_import = sis_import
+        self.attachments = list()
+
+    def create_sis_import(self, attachment, **kwargs):
+        self.attachments.append(attachment)
+        return self.sis_import
+
+    def get_sis_import(self, sis_import_id):
+        return self.sis_import
+
+
+class EnrollmentBatchTest(TestCase):
+    def setUp(self):
+        for username, penn_id in [
+            ("teacher", "10000001"),
+            ("ta", "10000002"),
+            ("designer", "10000003"),
+        ]:
+            user = User.objects.create(username=username, first_name=username)
+            Profile.objects.create(user=user, penn_id=penn_id)
+        self.first_request = SimpleNamespace(pk="FIRST")
+        self.second_request = SimpleNamespace(pk="SECOND")
+        self.enrollments = EnrollmentBatch(
+            lambda login_id: 1 if login_id == "designer" else None
+        )
+        self.enrollments.add(
+            self.first_request,
+            User.objects.get(username="teacher"),
+            "TeacherEnrollment",
+            section_id="BAN_SECTION_1",
+            course_id="BAN_COURSE_1",
+        )
+        self.enrollments.add(
+            self.second_request, "ta", "TaEnrollment", course_id="BAN_COURSE_2"
+        )
+        self.enrollments.add(
+            self.second_request,
+            "designer",
+            "DesignerEnrollment",
+            course_id="BAN_COURSE_2",
+        )
+
+    def test_get_attachment(self):
+        with ZipFile(self.enrollments.get_attachment()) as archive:
+            users = archive.read("users.csv").decode().splitlines()
+            enrollments = archive.read("enrollments.csv").decode().splitlines()
+        self.assertEqual(
+            [user.split(",")[0] for user in users[1:]], ["10000001", "10000002"]
+        )
+        self.assertEqual(
+            enrollments[1:],
+            [
+                ",BAN_SECTION_1,10000001,teacher,,active",
+                "BAN_COURSE_2,,10000002,ta,,active",
+                "BAN_COURSE_2,,10000003,designer,,active",
+            ],
+        )
+
+    def test_get_attachment_existing_users(self):
+        enrollments = EnrollmentBatch(lambda login_id: 1)
+        enrollments.add(
+            self.first_request, "teacher", "TeacherEnrollment", course_id="BAN_1"
+        )
+        with ZipFile(enrollments.get_attachment()) as archive:
+            self.assertEqual(archive.namelist(), ["enrollments.csv"])
+
+    def test_submit(self):
+        sis_import = SimpleNamespace(id=1, workflow_state="created")
+        account = StandInAccount(sis_import)
+        self.assertEqual(self.enrollments.submit(account, test=True), 1)
+        enrollment_import = EnrollmentImport.objects.get()
+        self.assertEqual(enrollment_import.import_id, "1")
+        self.assertTrue(enrollment_import.test)
+        self.assertIsNone(enrollment_import.finished)
+        self.assertEqual(poll_enrollment_import(enrollment_import, account), None)
+        sis_import.workflow_state = "imported_with_messages"
+        sis_import.processing_errors = [
+            [
+                "enrollments.csv",
+                "Neither course nor section existed for user enrollment (Course"
+                " ID: BAN_COURSE_2, Section ID: , User ID: 10000002)",
+            ]
+        ]
+        notes = poll_enrollment_import(enrollment_import, account)
+        self.assertEqual(list(notes), ["SECOND"])
+        self.assertIn("BAN_COURSE_2", notes["SECOND"][0])
+        enrollment_import = EnrollmentImport.objects.get()
+        self.assertEqual(enrollment_import.workflow_state, "imported_with_messages")
+        self.assertIsNotNone(enrollment_import.finished)
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+from celery import current_app
+from django.test import TestCase
+
+from course.models import UpdateLog
+from course.tasks import sync_all
+
+SYNC_FUNCTIONS = [
+    "get_data_warehouse_schools",
+    "get_data_warehouse_subjects",
+    "get_open_data_courses",
+    "get_data_warehouse_courses",
+    "get_data_warehouse_instructors",
+    "delete_data_warehouse_canceled_courses",
+    "sync_crf_canvas_sites",
+    "update_all_users_courses",
+]
+
+
+class SyncAllTest(TestCase):
+    def setUp(self):
+        self.always_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        self.calls = list()
+        for function in SYNC_FUNCTIONS:
+            patcher = patch(
+                f"course.tasks.{function}", self.get_stand_in_function(function)
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        current_app.conf.task_always_eager = self.always_eager
+
+    def get_stand_in_function(self, function):
+        def record(*args, **kwargs):
+            self.calls.append((function, args[0] if args else None))
+
+        return record
+
+    def get_stages(self):
+        return [
+            (update_log.stage, update_log.term)
+            for update_log in UpdateLog.objects.order_by("pk")
+        ]
+
+    def test_sync_all(self):
+        sync_all(["202210", "202220"], use_logger=False)
+        self.assertEqual(
+            self.get_stages(),
+            [
+                ("schools_and_subjects", ""),
+                ("courses", "202210"),
+                ("courses", "202220"),
+                ("canvas_sites", "202210"),
+                ("canvas_sites", "202220"),
+                ("users_courses", ""),
+                ("canceled_requests", ""),
+            ],
+        )
+        self.assertFalse(UpdateLog.objects.filter(finished__isnull=True).exists())
+        self.assertEqual(
+            self.calls,
+            [
+                ("get_data_warehouse_schools", None),
+                ("get_data_warehouse_subjects", None),
+                ("get_data_warehouse_courses", "202210"),
+                ("get_data_warehouse_courses", "202220"),
+                ("sync_crf_canvas_sites", "202210"),
+                ("sync_crf_canvas_sites", "202220"),
+                ("update_all_users_courses", None),
+            ],
+        )
+
+    def test_sync_all_old_term(self):
+        sync_all("2019A", use_logger=False)
+        self.assertEqual(
+            self.get_stages(),
+            [
+                ("schools_and_subjects", ""),
+                ("courses", "2019A"),
+                ("instructors", "2019A"),
+                ("canceled_courses", "2019A"),
+                ("canvas_sites", "2019A"),
+                ("users_courses", ""),
+                ("canceled_requests", ""),
+            ],
+        )
+        self.assertEqual(
+            [function for function, term in self.calls if term == "2019A"],
+            [
+                "get_open_data_courses",
+                "get_data_warehouse_courses",
+                "get_data_warehouse_instructors",
+                "delete_data_warehouse_canceled_courses",
+                "sync_crf_canvas_sites",
+            ],
+        )
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from canvas.user_cache import MISSING, CanvasUserCache
+
+
+class CanvasUserCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user_cache = CanvasUserCache("cache-test", max_size=2)
+
+    def test_get_and_set(self):
+        self.assertIs(self.user_cache.get("teacher"), MISSING)
+        self.user_cache.set("teacher", 1234)
+        self.user_cache.set("missing", None)
+        self.assertEqual(self.user_cache.get("teacher"), 1234)
+        self.assertIsNone(self.user_cache.get("missing"))
+
+    def test_shared_through_django_cache(self):
+        self.user_cache.set("teacher", 1234)
+        other_process = CanvasUserCache("cache-test")
+        self.assertEqual(other_process.get("teacher"), 1234)
+
+    def test_lru_eviction(self):
+        for index, login_id in enumerate(["first", "second", "third"]):
+            self.user_cache.set(login_id, index + 1)
+        self.assertEqual(list(self.user_cache.entries), ["second", "third"])
+        self.assertEqual(self.user_cache.get("first"), 1)
+
+    def test_expiry(self):
+        user_cache = CanvasUserCache("cache-test", ttl=0)
+        user_cache.remember("teacher", 1234)
+        self.assertIs(user_cache.get("teacher"), MISSING)
+
+    def test_delete(self):
+        self.user_cache.set("teacher", 1234)
+        self.user_cache.delete("teacher")
+        self.assertIs(self.user_cache.get("teacher"), MISSING)
+        self.assertIs(CanvasUserCache("cache-test").get("teacher"), MISSING)
@@ -1,11 +1,14 @@
 from datetime import datetime
 from pathlib import Path
 from shutil import rmtree
+from types import SimpleNamespace
+from unittest.mock import patch
 
-from coruse.terms import split_year_and_term
 from django.test import TestCase
 
-from course.utils import get_data_directory
+from course.models import Activity, CanvasSite, Course, Request, School, Subject, User
+from course.terms import split_year_and_term
+from course.utils import get_data_directory, sync_crf_canvas_sites, write_users_courses
 
 
 class UtilsTest(TestCase):
@@ -25,3 +28,119 @@ class UtilsTest(TestCase):
         data_directory = get_data_directory(self.data_directory)
         self.assertTrue(data_directory.exists())
         rmtree(data_directory)
+
+    def test_write_users_courses(self):
+        user = User.objects.create(username="user")
+        CanvasSite.objects.create(
+            canvas_id="1", name="Old name", workflow_state="available"
+        )
+        site_values = [
+            {
+                "canvas_id": canvas_id,
+                "workflow_state": "available",
+                "sis_course_id": None,
+                "name": "Site",
+            }
+            for canvas_id in ["1", "2"]
+        ]
+        created, updated, added_owners = write_users_courses({user.pk: site_values})
+        self.assertEqual((created, updated, added_owners), (1, 1, 2))
+        self.assertEqual(CanvasSite.objects.get(canvas_id="1").name, "Site")
+        self.assertEqual(user.canvas_sites.count(), 2)
+        self.assertEqual(write_users_courses({user.pk: site_values}), (0, 0, 0))
+
+
+class SyncCRFCanvasSitesTest(TestCase):
+    year_and_term = "202210"
+
+    def setUp(self):
+        self.school = School.objects.create(name="School", abbreviation="SCH")
+        self.subject = Subject.objects.create(name="Subject", abbreviation="SUBJ")
+        self.activity = Activity.objects.create(name="Lecture", abbr="LEC")
+        self.owner = User.objects.create(username="owner")
+        for canvas_id, course_term, status in [
+            ("1", "10", "COMPLETED"),
+            ("2", "10", "COMPLETED"),
+            ("3", "10", "COMPLETED"),
+            ("4", "10", "COMPLETED"),
+            ("5", "10", "IN_PROCESS"),
+            ("6", "20", "COMPLETED"),
+        ]:
+            self.create_request(canvas_id, course_term, status)
+
+    def create_request(self, canvas_id, course_term, status):
+        course = Course.objects.create(
+            course_subject=self.subject,
+            course_primary_subject=self.subject,
+            course_number=f"10{canvas_id}",
+            course_section="001",
+            year="2022",
+            course_term=course_term,
+            course_activity=self.activity,
+            course_schools=self.school,
+            owner=self.owner,
+        )
+        Request.objects.create(
+            course_requested=course,
+            owner=self.owner,
+            status=status,
+            canvas_instance=CanvasSite.objects.create(
+                canvas_id=canvas_id,
+                name=f"Site {canvas_id}",
+                sis_course_id=f"SRS_{canvas_id}",
+                workflow_state="unpublished",
+            ),
+        )
+
+    def get_canvas_course(self, canvas_id, name=None, workflow_state="unpublished"):
+        return SimpleNamespace(
+            id=int(canvas_id),
+            name=name or f"Site {canvas_id}",
+            workflow_state=workflow_state,
+        )
+
+    def test_sync_crf_canvas_sites(self):
+        term_courses = {
+            "1": self.get_canvas_course("1"),
+            "2": self.get_canvas_course("2", name="Renamed"),
+            "5": self.get_canvas_course("5", workflow_state="available"),
+        }
+        fetched_courses = {
+            "3": self.get_canvas_course("3", workflow_state="available"),
+            "4": None,
+        }
+        with patch(
+            "course.utils.get_term_canvas_courses", return_value=term_courses
+        ), patch(
+            "course.utils.get_canvas_courses",
+            lambda canvas_ids: {
+                canvas_id: fetched_courses[canvas_id] for canvas_id in canvas_ids
+            },
+        ):
+            sync_crf_canvas_sites(self.year_and_term)
+        self.assertEqual(
+            {
+                canvas_site.canvas_id: (canvas_site.name, canvas_site.workflow_state)
+                for canvas_site in CanvasSite.objects.all()
+            },
+            {
+                "1": ("Site 1", "unpublished"),
+                "2": ("Renamed", "unpublished"),
+                "3": ("Site 3", "available"),
+                "4": ("Site 4", "deleted"),
+                "5": ("Site 5", "unpublished"),
+                "6": ("Site 6", "unpublished"),
+            },
+        )
+        self.assertEqual(
+            dict(Request.objects.values_list("canvas_instance_id", "status")),
+            {
+                "1": "COMPLETED",
+                "2": "COMPLETED",
+                "3": "COMPLETED",
+                "4": "COMPLETED",
+                "5": "IN_PROCESS",
+                "6": "COMPLETED",
+            },
+        )
+        self.assertFalse(Course.objects.filter(requested=False).exists())